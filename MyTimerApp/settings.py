@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.WorkspaceTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -131,3 +132,51 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Cached reports and fragments, and the data version counters that invalidate
+# them (see core/versions.py), must be shared by every process: a counter
+# bumped by a management command or another worker has to reach the one
+# serving the request. Point this at Redis or Memcached when running on
+# more than one host.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            # Reports and fragments are cached per filter, project and data
+            # version, and stale ones stay until they expire; the default 300
+            # entries would cull live ones, and the version counters with them
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Tests run against a per-process LocMemCache instead of the on-disk cache
+# (see MyTimerApp/test_runner.py)
+TEST_RUNNER = 'MyTimerApp.test_runner.LocMemCacheTestRunner'
+
+
+# Audit log durability: 'sync' writes each record immediately, 'on_commit'
+# bulk inserts a transaction's records when it commits, and 'buffered' bulk
+# inserts from a background thread (see timetracker/audit.py)
+AUDIT_LOG_MODE = 'sync'
+AUDIT_LOG_BATCH_SIZE = 500
+AUDIT_LOG_FLUSH_INTERVAL = 2.0
+
+# 'compact' stores only changed fields plus a full snapshot every
+# AUDIT_LOG_SNAPSHOT_INTERVAL records per time entry; 'full' stores complete
+# before/after copies on every record
+AUDIT_LOG_STORAGE = 'compact'
+AUDIT_LOG_SNAPSHOT_INTERVAL = 20
+
+# Closed months of audit logs are moved here by the archive_audit_logs command
+AUDIT_ARCHIVE_DIR = BASE_DIR / 'audit_archive'
+
+# Saved report results are cached for this many seconds, and dropped sooner
+# whenever the time they summarise changes (see reporting/engine.py)
+REPORT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Rendered project and task tables are cached for this many seconds, and
+# dropped sooner whenever the rows they show change (see core/fragments.py)
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
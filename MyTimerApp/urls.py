@@ -6,6 +6,7 @@ urlpatterns = [
     path('', home, name='home'),
     path('admin/', admin.site.urls),
     path('tracker/', include('timetracker.urls')),
+    path('reports/', include('reporting.urls')),
     path('', include('core.urls')),
     path('', include('projects.urls')),  # Add this line
 ]
\ No newline at end of file
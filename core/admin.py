@@ -1,4 +1,5 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from invoicing.services import generate_invoices, previous_month
 from .models import Workspace, Client
 
 @admin.register(Workspace)
@@ -6,8 +7,19 @@ class WorkspaceAdmin(admin.ModelAdmin):
     list_display = ("id", "name")
     search_fields = ("name",)
 
+@admin.action(description="Invoice unbilled time of last month")
+def invoice_last_month(modeladmin, request, queryset):
+    date_from, date_to = previous_month()
+    invoices = generate_invoices(date_from, date_to, clients=queryset)
+    modeladmin.message_user(
+        request,
+        f"Created {len(invoices)} invoices for {date_from:%B %Y}.",
+        messages.SUCCESS if invoices else messages.WARNING,
+    )
+
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "workspace", "email", "company")
     list_filter = ("workspace",)
     search_fields = ("name", "email", "company")
+    actions = [invoice_last_month]
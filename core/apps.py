@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core.models import Workspace
+        from core.workspace import clear_workspace_cache
+
+        post_save.connect(clear_workspace_cache, sender=Workspace, dispatch_uid='core.clear_workspace_cache.save')
+        post_delete.connect(clear_workspace_cache, sender=Workspace, dispatch_uid='core.clear_workspace_cache.delete')
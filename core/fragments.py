@@ -0,0 +1,47 @@
+# core/fragments.py - Rendered HTML fragments cached across requests
+
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from core.versions import get_versions
+
+KEY_PREFIX = 'fragment:'
+
+# Rendered in place of {% csrf_token %}'s value and swapped for the visitor's
+# token on every hit, so one cached fragment serves every session
+CSRF_PLACEHOLDER = 'csrf-token-placeholder'
+
+
+def get_fragment_timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def fragment_key(template_name, versions, vary=''):
+    """Cache key of a fragment at the current data versions; equal keys render equal HTML"""
+    current = get_versions(versions)
+    return KEY_PREFIX + ':'.join([template_name, str(vary), *(f'{name}={current[name]}' for name in sorted(current))])
+
+
+def render_cached(request, template_name, versions, get_context, vary=''):
+    """
+    Render `template_name`, or serve it from the cache until one of the data
+    `versions` it shows moves. get_context() builds the template context and
+    is only called on a miss, so its queries only run then; `vary` tells
+    apart fragments rendered from different parameters at the same versions.
+    """
+    key = fragment_key(template_name, versions, vary)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(template_name, {**get_context(), 'csrf_token': CSRF_PLACEHOLDER})
+        cache.set(key, html, get_fragment_timeout())
+    if CSRF_PLACEHOLDER in html:
+        html = html.replace(CSRF_PLACEHOLDER, get_token(request))
+    return mark_safe(html)
+
+
+def fragment_etag(template_name, versions, vary=''):
+    """An ETag for a response made of one fragment, read without rendering it"""
+    return hashlib.sha1(fragment_key(template_name, versions, vary).encode()).hexdigest()
@@ -0,0 +1,18 @@
+# core/middleware.py
+
+from django.utils import timezone
+from core.workspace import get_workspace_timezone
+
+
+class WorkspaceTimezoneMiddleware:
+    """Activate the workspace timezone so templates and date lookups use local time"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timezone.activate(get_workspace_timezone())
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()
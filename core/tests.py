@@ -1,3 +1,117 @@
+from datetime import timezone as dt_timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+from django.core.cache import cache
+from django.db import transaction
 from django.test import TestCase
+from django.urls import reverse
+from core.models import Client, Workspace
+from core.versions import bump_on_commit, bump_version, get_version, get_versions
+from core.workspace import WORKSPACE_VERSION, clear_workspace_cache, get_active_workspace, get_workspace_timezone
 
-# Create your tests here.
+
+class QueryCountTests(TestCase):
+    """Client views run a fixed number of queries, whatever the amount of data"""
+
+    def seed(self, count):
+        for i in range(count):
+            workspace = Workspace.objects.create(name=f"Workspace {count}-{i}", timezone="UTC")
+            self.client_obj = Client.objects.create(
+                workspace=workspace, name=f"Client {count}-{i}", email="client@example.com", company="Company"
+            )
+
+    def assertQueryBudget(self, budget, request):
+        for size in (2, 20):
+            self.seed(size)
+            get_workspace_timezone()  # measure with a warm workspace cache
+            with self.subTest(size=size), self.assertNumQueries(budget):
+                response = request()
+            self.assertLess(response.status_code, 400)
+
+    def test_client_list(self):
+        self.assertQueryBudget(3, lambda: self.client.get(reverse('client_list')))
+
+    def test_create_client(self):
+        self.assertQueryBudget(1, lambda: self.client.post(reverse('create_client'), {
+            'name': 'New client', 'workspace_id': self.client_obj.workspace_id,
+        }))
+
+    def test_update_client(self):
+        self.assertQueryBudget(2, lambda: self.client.post(
+            reverse('update_client', args=[self.client_obj.pk]), {'name': 'Renamed', 'email': 'new@example.com'}
+        ))
+
+    def test_delete_client(self):
+        self.assertQueryBudget(5, lambda: self.client.post(reverse('delete_client', args=[self.client_obj.pk])))
+
+
+class WorkspaceCacheTests(TestCase):
+    def setUp(self):
+        clear_workspace_cache()
+        self.addCleanup(clear_workspace_cache)
+
+    def test_resolved_once_and_invalidated_on_save(self):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        with self.assertNumQueries(1):
+            self.assertEqual(get_active_workspace(), workspace)
+            self.assertEqual(get_workspace_timezone(), ZoneInfo("Europe/Berlin"))
+        with self.assertNumQueries(0):
+            get_workspace_timezone()
+
+        workspace.timezone = "America/New_York"
+        workspace.save()
+        self.assertEqual(get_workspace_timezone(), ZoneInfo("America/New_York"))
+
+    def test_other_processes_see_committed_changes(self):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        self.assertEqual(get_workspace_timezone(), ZoneInfo("Europe/Berlin"))
+
+        # Another process saves the workspace: the row changes and, on commit, the version
+        Workspace.objects.filter(pk=workspace.pk).update(timezone="Asia/Tokyo")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_workspace_timezone(), ZoneInfo("Europe/Berlin"))
+        bump_version(WORKSPACE_VERSION)
+        # The version is checked at most once per VERSION_CHECK_INTERVAL
+        self.assertEqual(get_workspace_timezone(), ZoneInfo("Europe/Berlin"))
+        with mock.patch('core.workspace.VERSION_CHECK_INTERVAL', 0):
+            self.assertEqual(get_workspace_timezone(), ZoneInfo("Asia/Tokyo"))
+
+    def test_save_bumps_the_version_on_commit(self):
+        workspace = Workspace.objects.create(name="Workspace")
+        version = get_version(WORKSPACE_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            workspace.save()
+            self.assertEqual(get_version(WORKSPACE_VERSION), version)
+        self.assertGreater(get_version(WORKSPACE_VERSION), version)
+
+    def test_unknown_timezone_falls_back_to_utc(self):
+        Workspace.objects.create(name="Workspace", timezone="Not/AZone")
+        self.assertEqual(get_workspace_timezone(), dt_timezone.utc)
+
+
+class VersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_versions_only_move_forward(self):
+        first = get_version('entries')
+        self.assertEqual(get_versions(['entries', 'tasks'])['entries'], first)
+        self.assertGreater(bump_version('entries'), first)
+        # A clock behind the stored version still moves it forward
+        with mock.patch('core.versions.time.time_ns', return_value=1):
+            bumped = bump_version('entries')
+        self.assertGreater(bumped, first)
+        self.assertEqual(get_version('entries'), bumped)
+
+    def test_bumped_once_on_commit(self):
+        with mock.patch('core.versions.bump_version', wraps=bump_version) as bump:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for _ in range(3):
+                    bump_on_commit('entries')
+                with transaction.atomic():
+                    bump_on_commit('tasks')
+                    transaction.set_rollback(True)
+                self.assertFalse(bump.called)
+        # One hook per call, but each name is bumped once and rolled back ones not at all
+        self.assertEqual(len(callbacks), 3)
+        bump.assert_called_once_with('entries')
@@ -0,0 +1,79 @@
+# core/versions.py - Data version counters for invalidating cached results
+
+import threading
+import time
+import weakref
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = 'data-version:'
+
+
+def get_version(name):
+    """
+    Return the current version of the data set `name`. Cached results are
+    keyed on it, so bumping the version invalidates all of them at once.
+    """
+    key = KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1: if the counter was evicted, an
+        # old version number could otherwise come back and revive stale results
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Move the data set `name` to a new version"""
+    # A fresh clock value rather than incr(): shared backends such as the file
+    # cache increment with a read and a write, and two processes bumping at
+    # once would both write the same number
+    version = max(time.time_ns(), (cache.get(KEY_PREFIX + name) or 0) + 1)
+    cache.set(KEY_PREFIX + name, version, timeout=None)
+    return version
+
+
+class _CommitBumps:
+    """The names one transaction bumps; its commit hooks bump each name once"""
+
+    def __init__(self):
+        self.bumped = set()
+        self.committed = False
+
+    def bump(self, name):
+        self.committed = True
+        if name not in self.bumped:
+            self.bumped.add(name)
+            bump_version(name)
+
+
+_local = threading.local()
+
+
+def bump_on_commit(name):
+    """
+    Bump the data set `name` once the current transaction commits.
+
+    A transaction that changes many rows registers the same names over and
+    over, but each is bumped once. Every call still registers its own hook,
+    so a savepoint that rolls back takes its names with it.
+    """
+    # Only the hooks hold the transaction's bumps strongly; once one of them
+    # has run, or a rollback has discarded them all, the next call starts over
+    bumps = _local.bumps() if getattr(_local, 'bumps', None) else None
+    if bumps is None or bumps.committed:
+        bumps = _CommitBumps()
+        _local.bumps = weakref.ref(bumps)
+    transaction.on_commit(partial(bumps.bump, name))
+
+
+def get_versions(names):
+    """Return {name: version} for several data sets with one cache round trip"""
+    keys = {KEY_PREFIX + name: name for name in names}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for name in set(names) - set(versions):
+        versions[name] = get_version(name)
+    return versions
@@ -1,5 +1,6 @@
 # Enhanced core/views.py - PRESERVING ALL EXISTING + ADDING NEW FEATURES
 
+from django.db.models import Count, Q
 from django.shortcuts import render, redirect, get_object_or_404
 from core.models import Client, Workspace
 
@@ -10,10 +11,15 @@ def client_list(request):
     clients = Client.objects.select_related('workspace').all()  # ADD: Optimize query
     workspaces = Workspace.objects.all()
 
-    # ADD: Statistics for enhanced UI
-    total_clients = clients.count()
-    clients_with_email = clients.exclude(email__in=['', None]).count()
-    clients_with_company = clients.exclude(company__in=['', None]).count()
+    # ADD: Statistics for enhanced UI (one aggregate query)
+    stats = Client.objects.aggregate(
+        total=Count('id'),
+        with_email=Count('id', filter=Q(email__isnull=False) & ~Q(email='')),
+        with_company=Count('id', filter=Q(company__isnull=False) & ~Q(company='')),
+    )
+    total_clients = stats['total']
+    clients_with_email = stats['with_email']
+    clients_with_company = stats['with_company']
 
     return render(request, 'clients.html', {
         'clients': clients,  # PRESERVE: Existing
@@ -0,0 +1,73 @@
+# core/workspace.py - Process-wide cache of the active workspace and its timezone
+
+import threading
+import time
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.db import transaction
+from core.versions import bump_version, get_version
+
+# Bumped when a workspace changes, so every process drops its cached copy
+WORKSPACE_VERSION = 'workspace'
+
+# Seconds between checks of that version: the timezone is read once per
+# entry in bulk paths, and each check is a round trip to the shared cache
+VERSION_CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _resolve():
+    from core.models import Workspace
+
+    workspace = Workspace.objects.order_by('id').first()
+    tz = dt_timezone.utc
+    if workspace and workspace.timezone:
+        try:
+            tz = ZoneInfo(workspace.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return {'workspace': workspace, 'timezone': tz}
+
+
+def _get(key):
+    cached = _cache.get('value')
+    checked = time.monotonic()
+    if cached is not None and checked - cached['checked'] < VERSION_CHECK_INTERVAL:
+        return cached[key]
+
+    version = get_version(WORKSPACE_VERSION)
+    if cached is None or cached['version'] != version:
+        with _lock:
+            cached = _cache.get('value')
+            if cached is None or cached['version'] != version:
+                cached = {**_resolve(), 'version': version}
+    _cache['value'] = {**cached, 'checked': checked}
+    return cached[key]
+
+
+def get_active_workspace():
+    """Return the active (first) workspace, or None; resolved once per data version"""
+    return _get('workspace')
+
+
+def get_workspace_timezone():
+    """Return the active workspace's timezone as a tzinfo, falling back to UTC"""
+    return _get('timezone')
+
+
+def _workspace_changed():
+    _cache.pop('value', None)
+    bump_version(WORKSPACE_VERSION)
+
+
+def clear_workspace_cache(**kwargs):
+    """
+    Forget the cached workspace; connected to Workspace save and delete signals.
+
+    This process re-reads it at once, and the others once the change commits
+    and bumps the shared workspace data version.
+    """
+    _cache.pop('value', None)
+    transaction.on_commit(_workspace_changed)
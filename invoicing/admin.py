@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Invoice, InvoiceItem
+from .models import Invoice, InvoiceItem, item_amount
 from import_export.admin import ExportMixin
 
 
@@ -12,15 +12,31 @@ def mark_as_paid(modeladmin, request, queryset):
 
 @admin.register(Invoice)
 class InvoiceAdmin(ExportMixin, admin.ModelAdmin):
+    # total_amount is stored, so the changelist needs no per-row items query and can sort by it
     list_display = ("id", "client", "issue_date", "due_date", "paid", "total_amount")
+    list_select_related = ("client",)
     list_filter = ("client", "paid")
     search_fields = ("client__name",)
+    readonly_fields = ("total_amount",)
     inlines = [InvoiceItemInline]
     date_hierarchy = "issue_date"
     actions = [mark_as_paid]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Inline item saves refresh the stored total; show the fresh value
+        form.instance.refresh_from_db(fields=["total_amount"])
+
 @admin.register(InvoiceItem)
 class InvoiceItemAdmin(admin.ModelAdmin):
     list_display = ("id", "invoice", "description", "hours", "rate", "amount")
+    list_select_related = ("invoice__client",)
     list_filter = ("invoice",)
     search_fields = ("description", "invoice__client__name")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(line_amount=item_amount())
+
+    @admin.display(ordering="line_amount")
+    def amount(self, obj):
+        return obj.line_amount
@@ -0,0 +1,37 @@
+# invoicing/management/commands/generate_invoices.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from invoicing.services import DEFAULT_DUE_DAYS, generate_invoices, previous_month
+
+
+class Command(BaseCommand):
+    help = "Invoice the unbilled, billable time of every client (or the given ones) for a period"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First day, YYYY-MM-DD (default: first day of last month)')
+        parser.add_argument('--date-to', help='Last day, YYYY-MM-DD (default: last day of last month)')
+        parser.add_argument('--client', type=int, action='append', dest='clients',
+                            help='Client id; repeat for several (default: all clients)')
+        parser.add_argument('--due-days', type=int, default=DEFAULT_DUE_DAYS,
+                            help='Days from today until the invoices are due')
+
+    def handle(self, *args, **options):
+        date_from, date_to = previous_month()
+        try:
+            if options['date_from']:
+                date_from = parse_date(options['date_from'])
+            if options['date_to']:
+                date_to = parse_date(options['date_to'])
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            raise CommandError("Dates must be valid YYYY-MM-DD dates")
+        if date_to < date_from:
+            raise CommandError("--date-to is before --date-from")
+
+        started = time.monotonic()
+        invoices = generate_invoices(date_from, date_to, clients=options['clients'], due_days=options['due_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(invoices)} invoices for {date_from} to {date_to} in {time.monotonic() - started:.2f}s."
+        ))
@@ -0,0 +1,18 @@
+# invoicing/management/commands/repair_invoice_totals.py
+from django.core.management.base import BaseCommand
+from invoicing.services import repair_invoice_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute stored invoice totals that no longer match the sum of their items"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of invoices checked per query')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many totals are wrong')
+
+    def handle(self, *args, **options):
+        checked, repaired = repair_invoice_totals(chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        verb = "Found" if options['dry_run'] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} invoices. {verb} {repaired} wrong totals."))
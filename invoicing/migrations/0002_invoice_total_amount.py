@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:27
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    Invoice = apps.get_model('invoicing', 'Invoice')
+    InvoiceItem = apps.get_model('invoicing', 'InvoiceItem')
+    amount = ExpressionWrapper(F('hours') * F('rate'), output_field=DecimalField(max_digits=14, decimal_places=4))
+    totals = InvoiceItem.objects.filter(invoice=OuterRef('pk')).values('invoice').annotate(
+        total=Sum(amount)
+    ).values('total')
+    Invoice.objects.update(total_amount=Coalesce(
+        Subquery(totals), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=4),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoicing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, max_digits=14),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,127 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from core.models import Client
 
+TOTAL_FIELDS = {'invoice', 'invoice_id', 'hours', 'rate'}
+
+
+def item_amount(prefix=''):
+    """hours * rate of an item as a database expression; prefix reaches the item, e.g. 'items__'"""
+    return ExpressionWrapper(
+        F(f'{prefix}hours') * F(f'{prefix}rate'),
+        output_field=DecimalField(max_digits=14, decimal_places=4),
+    )
+
+
+class InvoiceQuerySet(models.QuerySet):
+    def with_item_total(self):
+        """Annotate item_total, the sum of the items computed by the database"""
+        return self.annotate(item_total=Coalesce(
+            Sum(item_amount('items__')), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=14, decimal_places=4),
+        ))
+
+    def refresh_totals(self):
+        """Recompute the stored total_amount of these invoices with one UPDATE"""
+        totals = InvoiceItem.objects.filter(invoice=OuterRef('pk')).values('invoice').annotate(
+            total=Sum(item_amount())
+        ).values('total')
+        return self.update(total_amount=Coalesce(
+            Subquery(totals), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=4),
+        ))
+
+
+def refresh_invoice_totals(invoice_ids):
+    invoice_ids = {pk for pk in invoice_ids if pk is not None}
+    if invoice_ids:
+        Invoice.objects.filter(pk__in=invoice_ids).refresh_totals()
+
+
 class Invoice(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     issue_date = models.DateField(auto_now_add=True)
     due_date = models.DateField()
     paid = models.BooleanField(default=False)
     notes = models.TextField(blank=True, null=True)
+    # Sum of the items' amounts, kept in sync by InvoiceItem writes
+    total_amount = models.DecimalField(max_digits=14, decimal_places=4, default=0, editable=False)
 
-    def total_amount(self):
-        return sum(item.amount for item in self.items.all())
+    objects = InvoiceQuerySet.as_manager()
 
     def __str__(self):
         return f"Invoice {self.id} for {self.client.name}"
 
+
+class InvoiceItemQuerySet(models.QuerySet):
+    """Bulk writes refresh the totals of the invoices they touch"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        refresh_invoice_totals(obj.invoice_id for obj in objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if TOTAL_FIELDS & set(fields):
+            refresh_invoice_totals([
+                *(obj.invoice_id for obj in objs), *(obj._loaded_invoice_id for obj in objs),
+            ])
+        return updated
+
+    def update(self, **kwargs):
+        if not TOTAL_FIELDS & set(kwargs):
+            return super().update(**kwargs)
+        invoice_ids = set(self.values_list('invoice_id', flat=True))
+        updated = super().update(**kwargs)
+        if 'invoice' in kwargs or 'invoice_id' in kwargs:
+            invoice = kwargs.get('invoice', kwargs.get('invoice_id'))
+            invoice_ids.add(getattr(invoice, 'pk', invoice))
+        refresh_invoice_totals(invoice_ids)
+        return updated
+
+    def delete(self):
+        invoice_ids = set(self.values_list('invoice_id', flat=True))
+        deleted = super().delete()
+        refresh_invoice_totals(invoice_ids)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class InvoiceItem(models.Model):
     invoice = models.ForeignKey(Invoice, related_name='items', on_delete=models.CASCADE)
     description = models.TextField()
     hours = models.DecimalField(max_digits=6, decimal_places=2)
     rate = models.DecimalField(max_digits=8, decimal_places=2)
 
+    objects = InvoiceItemQuerySet.as_manager()
+
+    _loaded_invoice_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        # Remember the invoice the item was loaded with, to refresh both when it moves
+        item._loaded_invoice_id = item.__dict__.get('invoice_id')
+        return item
+
     @property
     def amount(self):
-        return self.hours * self.rate
\ No newline at end of file
+        return self.hours * self.rate
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or TOTAL_FIELDS & set(update_fields):
+            refresh_invoice_totals({self.invoice_id, self._loaded_invoice_id})
+        self._loaded_invoice_id = self.invoice_id
+
+    def delete(self, *args, **kwargs):
+        invoice_id = self.invoice_id
+        deleted = super().delete(*args, **kwargs)
+        refresh_invoice_totals({invoice_id})
+        return deleted
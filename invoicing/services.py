@@ -0,0 +1,137 @@
+# invoicing/services.py
+"""
+Invoice generation from unbilled, billable time entries.
+
+All selected clients are invoiced together with a constant number of
+queries: one to find what is billable, one bulk insert of the invoices, one
+UPDATE claiming the entries for their client's invoice, one aggregate of the
+claimed entries per invoice, project, task and rate, one bulk insert of the
+items and one UPDATE of the invoices' stored totals. Entries are claimed before they are aggregated, so an entry is
+never billed twice and every item matches the entries linked to its invoice.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, Count, Sum, Value, When
+from django.utils.timezone import localdate, make_aware
+from core.workspace import get_workspace_timezone
+from timetracker.models import TimeEntry
+from timetracker.rollups import AMOUNT_PRECISION
+from .models import Invoice, InvoiceItem
+
+DEFAULT_DUE_DAYS = 30
+
+HOURS_PRECISION = Decimal('0.01')
+
+
+def day_bounds(date_from, date_to):
+    """(start, end) datetimes of whole days in the workspace timezone; end is exclusive"""
+    tz = get_workspace_timezone()
+    return (
+        make_aware(datetime.combine(date_from, datetime.min.time()), tz),
+        make_aware(datetime.combine(date_to + timedelta(days=1), datetime.min.time()), tz),
+    )
+
+
+def previous_month():
+    """(first, last) day of the previous calendar month in the workspace timezone"""
+    last = localdate(timezone=get_workspace_timezone()).replace(day=1) - timedelta(days=1)
+    return last.replace(day=1), last
+
+
+def unbilled_entries(date_from, date_to):
+    """Completed, billable, live project entries starting in the period and not yet invoiced"""
+    start, end = day_bounds(date_from, date_to)
+    return TimeEntry.objects.filter(
+        invoice__isnull=True, deleted=False, billable=True, end_time__isnull=False, project__isnull=False,
+        start_time__gte=start, start_time__lt=end,
+    )
+
+
+def _item_description(row):
+    description = row['project__name'] or "No project"
+    if row['task__name']:
+        description += f" – {row['task__name']}"
+    entries = row['entries']
+    return f"{description} ({entries} {'entry' if entries == 1 else 'entries'})"
+
+
+def generate_invoices(date_from, date_to, clients=None, due_days=DEFAULT_DUE_DAYS, notes=None):
+    """
+    Invoice the unbilled time of `clients` (a queryset or iterable of clients
+    or ids; all clients when None) between two dates, inclusive. Returns the
+    new invoices; clients without unbilled time get none.
+    """
+    entries = unbilled_entries(date_from, date_to)
+    if clients is not None:
+        entries = entries.filter(project__client__in=clients)
+    if notes is None:
+        notes = f"Time from {date_from:%Y-%m-%d} to {date_to:%Y-%m-%d}"
+
+    with transaction.atomic():
+        projects = {}
+        for project_id, client_id in entries.values_list('project_id', 'project__client_id').distinct():
+            projects.setdefault(client_id, []).append(project_id)
+        if not projects:
+            return []
+
+        due_date = localdate(timezone=get_workspace_timezone()) + timedelta(days=due_days)
+        invoices = Invoice.objects.bulk_create([
+            Invoice(client_id=client_id, due_date=due_date, notes=notes) for client_id in sorted(projects)
+        ])
+
+        # Claim the entries: one UPDATE routes each project's entries to its client's invoice
+        entries.filter(project_id__in=[pk for ids in projects.values() for pk in ids]).update(invoice=Case(
+            *(When(project_id__in=projects[invoice.client_id], then=Value(invoice.pk)) for invoice in invoices),
+            default=None,
+        ))
+
+        rows = TimeEntry.objects.filter(invoice__in=invoices).values(
+            'invoice_id', 'project_id', 'project__name', 'task_id', 'task__name', 'hourly_rate',
+        ).annotate(seconds=Sum('duration_seconds'), entries=Count('id')).order_by(
+            'invoice_id', 'project__name', 'project_id', 'task__name', 'task_id', 'hourly_rate',
+        )
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(
+                invoice_id=row['invoice_id'],
+                description=_item_description(row),
+                hours=(Decimal(row['seconds']) / 3600).quantize(HOURS_PRECISION),
+                rate=row['hourly_rate'],
+            )
+            for row in rows
+        ])
+
+    return invoices
+
+
+def generate_invoice(client, date_from, date_to, due_days=DEFAULT_DUE_DAYS, notes=None):
+    """Invoice one client's unbilled time between two dates; None when there is none"""
+    invoices = generate_invoices(date_from, date_to, clients=[client], due_days=due_days, notes=notes)
+    return invoices[0] if invoices else None
+
+
+def repair_invoice_totals(chunk_size=1000, dry_run=False):
+    """
+    Compare every stored invoice total with the sum of its items, chunk_size
+    invoices per query, and refresh the ones that differ. Returns a
+    (checked, repaired) tuple; with dry_run nothing is written.
+    """
+    checked = repaired = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            Invoice.objects.filter(pk__gt=last_pk).with_item_total().order_by('pk')
+            .values_list('pk', 'total_amount', 'item_total')[:chunk_size]
+        )
+        if not chunk:
+            break
+        stale = [
+            pk for pk, stored, computed in chunk
+            if stored.quantize(AMOUNT_PRECISION) != computed.quantize(AMOUNT_PRECISION)
+        ]
+        if stale and not dry_run:
+            Invoice.objects.filter(pk__in=stale).refresh_totals()
+        checked += len(chunk)
+        repaired += len(stale)
+        last_pk = chunk[-1][0]
+    return checked, repaired
@@ -1,3 +1,174 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.models import Client, Workspace
+from core.workspace import get_workspace_timezone
+from invoicing.models import Invoice, InvoiceItem
+from invoicing.services import generate_invoice, generate_invoices, previous_month, repair_invoice_totals
+from projects.models import Project, Task
+from timetracker.models import TimeEntry
 
-# Create your tests here.
+
+class InvoiceGenerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        cls.acme = Client.objects.create(workspace=workspace, name="Acme")
+        cls.globex = Client.objects.create(workspace=workspace, name="Globex")
+        cls.website = Project.objects.create(client=cls.acme, name="Website")
+        cls.design = Task.objects.create(project=cls.website, name="Design")
+        cls.app = Project.objects.create(client=cls.globex, name="App")
+
+    def entry(self, project, day, minutes, rate=50, task=None, **fields):
+        # 09:00 in Berlin
+        start = datetime(2025, 2, day, 8, 0, tzinfo=dt_timezone.utc)
+        return TimeEntry.objects.create(
+            project=project, task=task, start_time=start, end_time=start + timedelta(minutes=minutes),
+            hourly_rate=rate, **fields
+        )
+
+    def test_groups_entries_and_links_them_once(self):
+        design = [self.entry(self.website, day, 90, task=self.design) for day in (3, 4)]
+        other_rate = self.entry(self.website, 5, 30, rate=80, task=self.design)
+        no_task = self.entry(self.website, 6, 60)
+        app = self.entry(self.app, 7, 45, rate=100)
+        skipped = [
+            self.entry(self.website, 10, 60, billable=False),
+            self.entry(self.website, 11, 60, deleted=True),
+            TimeEntry.objects.create(project=self.website, start_time=datetime(2025, 2, 12, 8, tzinfo=dt_timezone.utc)),
+            # 2025-03-01 00:30 in Berlin, outside February
+            TimeEntry.objects.create(
+                project=self.website, start_time=datetime(2025, 2, 28, 23, 30, tzinfo=dt_timezone.utc),
+                end_time=datetime(2025, 3, 1, 0, 30, tzinfo=dt_timezone.utc),
+            ),
+        ]
+
+        get_workspace_timezone()
+        # Lookup, invoices, claiming UPDATE, aggregate, items, totals, and the savepoint pair
+        with self.assertNumQueries(8):
+            invoices = generate_invoices(date(2025, 2, 1), date(2025, 2, 28))
+
+        self.assertEqual([invoice.client for invoice in invoices], [self.acme, self.globex])
+        acme, globex = invoices
+        items = [(item.description, item.hours, item.rate) for item in acme.items.order_by('id')]
+        self.assertEqual(items, [
+            ("Website (1 entry)", Decimal('1.00'), Decimal('50.00')),
+            ("Website – Design (2 entries)", Decimal('3.00'), Decimal('50.00')),
+            ("Website – Design (1 entry)", Decimal('0.50'), Decimal('80.00')),
+        ])
+        acme.refresh_from_db()
+        globex.refresh_from_db()
+        self.assertEqual(acme.total_amount, Decimal('240.0000'))
+        self.assertEqual(globex.total_amount, Decimal('75.0000'))
+
+        self.assertEqual(set(acme.time_entries.all()), {*design, other_rate, no_task})
+        self.assertEqual(list(globex.time_entries.all()), [app])
+        self.assertFalse(TimeEntry.objects.filter(pk__in=[entry.pk for entry in skipped], invoice__isnull=False))
+
+        self.assertEqual(generate_invoices(date(2025, 2, 1), date(2025, 2, 28)), [])
+        self.assertIsNone(generate_invoice(self.acme, date(2025, 2, 1), date(2025, 2, 28)))
+
+    def test_admin_action_invoices_selected_clients(self):
+        date_from, _ = previous_month()
+        start = datetime.combine(date_from, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(days=1)
+        for project in (self.website, self.app):
+            TimeEntry.objects.create(project=project, start_time=start, end_time=start + timedelta(hours=2), hourly_rate=10)
+
+        admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:core_client_changelist'), {
+            'action': 'invoice_last_month', '_selected_action': [self.acme.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Invoice.objects.values_list('client', flat=True)), [self.acme.pk])
+        self.assertEqual(TimeEntry.objects.filter(invoice__isnull=True).count(), 1)
+
+
+class InvoiceTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        cls.acme = Client.objects.create(workspace=workspace, name="Acme")
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def invoice(self, *items):
+        invoice = Invoice.objects.create(client=self.acme, due_date=date(2025, 3, 1))
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=invoice, description="Work", hours=hours, rate=rate) for hours, rate in items
+        ])
+        invoice.refresh_from_db()
+        return invoice
+
+    def assertTotal(self, invoice, total):
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.total_amount, Decimal(total))
+
+    def test_item_writes_keep_total_in_sync(self):
+        invoice, other = self.invoice(('1.50', '40'), ('2', '10')), self.invoice()
+        self.assertTotal(invoice, '80')
+
+        item = invoice.items.get(hours=2)
+        item.hours = Decimal('3')
+        item.save()
+        self.assertTotal(invoice, '90')
+        item.description = "Renamed"
+        with self.assertNumQueries(1):
+            item.save(update_fields=['description'])
+
+        invoice.items.update(rate=30)
+        self.assertTotal(invoice, '135')
+        item.rate = Decimal('10')
+        InvoiceItem.objects.bulk_update([item], ['rate'])
+        self.assertTotal(invoice, '75')
+
+        item.invoice = other
+        item.save()
+        self.assertTotal(invoice, '45')
+        self.assertTotal(other, '30')
+
+        other.items.all().delete()
+        self.assertTotal(other, '0')
+        invoice.items.get().delete()
+        self.assertTotal(invoice, '0')
+
+    def test_annotation_and_repair(self):
+        invoices = [self.invoice(('1', '10'), ('2', '5')), self.invoice(('1', '7'))]
+        Invoice.objects.filter(pk=invoices[0].pk).update(total_amount=0)
+
+        self.assertEqual(
+            dict(Invoice.objects.with_item_total().values_list('pk', 'item_total')),
+            {invoices[0].pk: Decimal('20'), invoices[1].pk: Decimal('7')},
+        )
+        self.assertEqual(repair_invoice_totals(chunk_size=1, dry_run=True), (2, 1))
+        self.assertEqual(repair_invoice_totals(chunk_size=1), (2, 1))
+        self.assertTotal(invoices[0], '20')
+        self.assertEqual(repair_invoice_totals(), (2, 0))
+
+    def test_admin_changelist_and_inline_edits(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:invoicing_invoice_changelist')
+        self.invoice(('1', '10'))
+        self.client.get(url)  # warm the per-process caches
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url, {'o': '-6'})
+        for _ in range(10):
+            self.invoice(('1', '10'), ('2', '20'))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url, {'o': '-6'})
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.context['cl'].result_list[0].total_amount, Decimal('50'))
+
+        invoice = self.invoice(('1', '10'))
+        item = invoice.items.get()
+        self.client.post(reverse('admin:invoicing_invoice_change', args=[invoice.pk]), {
+            'client': self.acme.pk, 'due_date': '2025-03-01', 'notes': '',
+            'items-TOTAL_FORMS': '2', 'items-INITIAL_FORMS': '1', 'items-MIN_NUM_FORMS': '0', 'items-MAX_NUM_FORMS': '1000',
+            'items-0-id': item.pk, 'items-0-invoice': invoice.pk, 'items-0-description': 'Work',
+            'items-0-hours': '1', 'items-0-rate': '10', 'items-0-DELETE': 'on',
+            'items-1-invoice': invoice.pk, 'items-1-description': 'New', 'items-1-hours': '4', 'items-1-rate': '25',
+        })
+        self.assertTotal(invoice, '100')
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from core.models import Client
+        from projects.models import Project, Task
+        from projects.tables import task_options_changed, tables_changed
+
+        for model in (Client, Project, Task):
+            label = model._meta.label_lower
+            post_save.connect(tables_changed, sender=model, dispatch_uid=f'projects.tables.{label}.save')
+            post_delete.connect(tables_changed, sender=model, dispatch_uid=f'projects.tables.{label}.delete')
+        post_save.connect(task_options_changed, sender=Task, dispatch_uid='projects.task_options.save')
+        post_delete.connect(task_options_changed, sender=Task, dispatch_uid='projects.task_options.delete')
@@ -1,20 +1,82 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from core.models import Client
 
-class Project(models.Model):
+
+def _tracked_seconds(**lookup):
+    """
+    Subquery of the tracked seconds matching `lookup` (an OuterRef), summed
+    from the daily rollups: a few rows per task and day instead of every entry.
+    """
+    from timetracker.models import DailyTimeRollup
+
+    tracked = DailyTimeRollup.objects.filter(**lookup).order_by().values(*lookup).annotate(
+        total=Sum('tracked_seconds')
+    ).values('total')
+    return Coalesce(Subquery(tracked), Value(0), output_field=models.BigIntegerField())
+
+
+class ProgressMixin:
+    """Tracked against estimated time, from the with_progress() annotations"""
+
+    @property
+    def tracked_minutes(self):
+        return self.tracked_seconds // 60
+
+    @property
+    def percent_complete(self):
+        """Tracked time as a whole percentage of the estimate, or None without one"""
+        if not self.estimated_minutes:
+            return None
+        return round(self.tracked_seconds * 100 / (self.estimated_minutes * 60))
+
+
+class ProjectQuerySet(models.QuerySet):
+    def with_progress(self):
+        """Annotate estimated_minutes (of the tasks) and tracked_seconds, in the same query"""
+        estimated = Task.objects.filter(project=OuterRef('pk')).order_by().values('project').annotate(
+            total=Sum('estimated_minutes')
+        ).values('total')
+        return self.annotate(
+            estimated_minutes=Coalesce(Subquery(estimated), Value(0), output_field=models.IntegerField()),
+            tracked_seconds=_tracked_seconds(project=OuterRef('pk')),
+        )
+
+
+class TaskQuerySet(models.QuerySet):
+    def with_progress(self):
+        """Annotate tracked_seconds, the completed, live time tracked on each task"""
+        return self.annotate(tracked_seconds=_tracked_seconds(task=OuterRef('pk')))
+
+
+class Project(ProgressMixin, models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     color = models.CharField(max_length=7, default="#03a9f4")
     archived = models.BooleanField(default=False)
 
+    objects = ProjectQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
-class Task(models.Model):
+class Task(ProgressMixin, models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     estimated_minutes = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
+    objects = TaskQuerySet.as_manager()
+
+    _loaded_project_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # Remember the project the task was loaded with, to refresh both when it moves
+        task._loaded_project_id = task.__dict__.get('project_id')
+        return task
+
     def __str__(self):
-        return f"{self.name} ({self.project.name})"
\ No newline at end of file
+        return f"{self.name} ({self.project.name})"
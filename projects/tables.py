@@ -0,0 +1,102 @@
+# projects/tables.py
+"""
+The project and task tables, rendered once and served from the fragment
+cache (see core.fragments) until their data changes.
+
+Each table has its own data version, bumped by model signals when a row
+it shows is saved or deleted. Tracked time changes with every stopped
+timer, so the cached rows hold a placeholder for their progress cell
+instead, and the cells of all rows are cached apart under the rollup data
+version and filled in on every request. The task dropdowns of the tracker
+are cached per project in the same way as the tables.
+"""
+import re
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+from core.fragments import fragment_key, get_fragment_timeout, render_cached
+from core.versions import bump_on_commit
+from timetracker.rollups import ROLLUP_VERSION
+from .models import Project, Task
+
+PROJECT_TABLE_VERSION = 'projects:table'
+TASK_TABLE_VERSION = 'tasks:table'
+# The task options of one project, e.g. 'tasks:project:12'
+TASK_OPTIONS_VERSION = 'tasks:project:{}'
+
+PROGRESS_TEMPLATE = 'projects/partials/progress.html'
+# Rendered by the rows in place of their progress cell when defer_progress is set
+PROGRESS_PLACEHOLDER = re.compile(r'<!-- progress:(\d+) -->')
+
+
+def tables_changed(**kwargs):
+    """
+    Signal receiver for clients, projects and tasks. Each of them shows in
+    both tables (task rows name their project and client, project rows sum
+    their tasks' estimates), so both versions move once the transaction
+    commits.
+    """
+    for version in (PROJECT_TABLE_VERSION, TASK_TABLE_VERSION):
+        bump_on_commit(version)
+
+
+def task_options_changed(sender, instance, **kwargs):
+    """
+    Signal receiver for tasks: bump the task options of the task's project,
+    and of the project it was loaded with when it moved, once the
+    transaction commits.
+    """
+    for project_id in {instance.project_id, instance._loaded_project_id} - {None}:
+        bump_on_commit(TASK_OPTIONS_VERSION.format(project_id))
+
+
+def task_options(project_id):
+    """(versions, get_context) of a project's active task options, for core.fragments"""
+    if project_id is None:
+        return [], lambda: {'tasks': []}
+    return [TASK_OPTIONS_VERSION.format(project_id)], lambda: {
+        'tasks': Task.objects.filter(project_id=project_id, is_active=True).order_by('name'),
+    }
+
+
+def fill_progress(html, vary, versions, get_items):
+    """
+    Replace the progress placeholders of a cached table with the cells of
+    get_items() (annotated with_progress()), rendered once per `versions`.
+    """
+    key = fragment_key(PROGRESS_TEMPLATE, versions, vary)
+    cells = cache.get(key)
+    if cells is None:
+        template = get_template(PROGRESS_TEMPLATE)
+        cells = {item.pk: template.render({'item': item}) for item in get_items()}
+        cache.set(key, cells, get_fragment_timeout())
+    return mark_safe(PROGRESS_PLACEHOLDER.sub(lambda match: cells.get(int(match[1]), ''), html))
+
+
+def project_table(request):
+    html = render_cached(request, 'projects/partials/project_table.html', [PROJECT_TABLE_VERSION], lambda: {
+        'projects': Project.objects.select_related('client'),
+        'defer_progress': True,
+    })
+    return fill_progress(
+        html, 'projects', [PROJECT_TABLE_VERSION, ROLLUP_VERSION],
+        lambda: Project.objects.only('pk').with_progress(),
+    )
+
+
+def task_table(request):
+    html = render_cached(request, 'projects/partials/task_table.html', [TASK_TABLE_VERSION], lambda: {
+        'tasks': Task.objects.select_related('project__client'),
+        'defer_progress': True,
+    })
+    return fill_progress(
+        html, 'tasks', [TASK_TABLE_VERSION, ROLLUP_VERSION],
+        lambda: Task.objects.only('pk', 'estimated_minutes').with_progress(),
+    )
+
+
+def task_project_options(request):
+    """The project filter options of the task list: projects with tasks"""
+    return render_cached(request, 'projects/partials/task_project_options.html', [TASK_TABLE_VERSION], lambda: {
+        'projects': Project.objects.filter(task__isnull=False).distinct().order_by('name'),
+    })
@@ -1,3 +1,151 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from core.fragments import CSRF_PLACEHOLDER
+from core.models import Client, Workspace
+from core.workspace import clear_workspace_cache, get_workspace_timezone
+from projects.models import Project, Task
+from timetracker.models import TimeEntry
+from timetracker.rollups import add_to_rollups
 
-# Create your tests here.
+
+class QueryCountTests(TestCase):
+    """Project and task views run a fixed number of queries, whatever the amount of data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+
+    def seed(self, count):
+        for i in range(count):
+            client = Client.objects.create(workspace=self.workspace, name=f"Client {count}-{i}")
+            self.project = Project.objects.create(client=client, name=f"Project {count}-{i}")
+            self.task = Task.objects.create(project=self.project, name=f"Task {count}-{i}", estimated_minutes=30)
+
+    def assertQueryBudget(self, budget, request, prepare=None):
+        for size in (2, 20):
+            self.seed(size)
+            argument = prepare() if prepare else None
+            cache.clear()  # measure with cold table fragments
+            # and a warm workspace cache, checked against the cleared version
+            # so a version check during the request finds nothing new
+            clear_workspace_cache()
+            get_workspace_timezone()
+            with self.subTest(size=size), self.assertNumQueries(budget):
+                response = request(argument) if prepare else request()
+            self.assertLess(response.status_code, 400)
+
+    def test_project_list(self):
+        # The statistics, the table rows and their progress cells
+        self.assertQueryBudget(3, lambda: self.client.get(reverse('project_list')))
+
+    def test_task_list(self):
+        # The totals, the table rows, their progress cells and the project filter options
+        self.assertQueryBudget(4, lambda: self.client.get(reverse('task_list')))
+
+    def test_project_create_modal(self):
+        self.assertQueryBudget(1, lambda: self.client.get(reverse('project_create_modal')))
+        self.assertQueryBudget(4, lambda: self.client.post(reverse('project_create_modal'), {
+            'client': self.project.client_id, 'name': 'New project', 'color': '#ffffff',
+        }))
+
+    def test_task_create_modal(self):
+        self.assertQueryBudget(1, lambda: self.client.get(reverse('task_create_modal')))
+        self.assertQueryBudget(4, lambda: self.client.post(reverse('task_create_modal'), {
+            'project': self.project.pk, 'name': 'New task', 'estimated_minutes': 15, 'is_active': 'on',
+        }))
+
+    def test_project_delete(self):
+        self.assertQueryBudget(8, lambda project: self.client.post(reverse('project_delete', args=[project.pk])),
+                               lambda: self.project)
+
+    def test_task_delete(self):
+        self.assertQueryBudget(4, lambda task: self.client.post(reverse('task_delete', args=[task.pk])),
+                               lambda: self.task)
+
+
+class ProgressTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(workspace=Workspace.objects.create(name="Workspace", timezone="UTC"), name="Acme")
+        cls.website = Project.objects.create(client=client, name="Website")
+        cls.design = Task.objects.create(project=cls.website, name="Design", estimated_minutes=120)
+        cls.copy = Task.objects.create(project=cls.website, name="Copy")
+        start = datetime(2025, 2, 3, 9, tzinfo=dt_timezone.utc)
+        for task, minutes, fields in ((cls.design, 90, {}), (cls.design, 60, {'deleted': True}), (None, 30, {})):
+            add_to_rollups(TimeEntry.objects.create(
+                project=cls.website, task=task, start_time=start, end_time=start + timedelta(minutes=minutes), **fields
+            ))
+
+    def test_task_progress(self):
+        design, copy = Task.objects.with_progress().order_by('pk')
+        self.assertEqual((design.tracked_minutes, design.percent_complete), (90, 75))
+        self.assertEqual((copy.tracked_minutes, copy.percent_complete), (0, None))
+
+        response = self.client.get(reverse('task_detail', args=[self.design.pk]))
+        self.assertEqual(response.json()['remaining_minutes'], 30)
+        self.assertEqual(response.json()['project'], {'id': self.website.pk, 'name': "Website"})
+        self.assertEqual(self.client.get(reverse('task_detail', args=[0])).status_code, 404)
+        self.assertContains(self.client.get(reverse('task_list')), "90 / 120 min")
+
+    def test_project_progress(self):
+        project = Project.objects.with_progress().get()
+        # Time without a task counts for the project; the estimate is its tasks'
+        self.assertEqual((project.tracked_minutes, project.estimated_minutes, project.percent_complete), (120, 120, 100))
+        self.assertContains(self.client.get(reverse('project_list')), "120 / 120 min")
+
+
+class TableCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(workspace=Workspace.objects.create(name="Workspace", timezone="UTC"), name="Acme")
+        cls.website = Project.objects.create(client=client, name="Website")
+        cls.design = Task.objects.create(project=cls.website, name="Design", estimated_minutes=60)
+
+    def setUp(self):
+        cache.clear()
+        clear_workspace_cache()
+        get_workspace_timezone()
+
+    def test_tables_cached_until_rows_change(self):
+        self.client.get(reverse('task_list'))
+        # Only the statistics; rows and filter options come from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('task_list'))
+        self.assertContains(response, "Design")
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        # The cached row's delete form carries this visitor's token
+        self.assertContains(response, 'name="csrfmiddlewaretoken"', count=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.design.name = "Layout"
+            self.design.save()
+        self.assertContains(self.client.get(reverse('task_list')), "Layout")
+
+        start = datetime(2025, 2, 3, 9, tzinfo=dt_timezone.utc)
+        with self.captureOnCommitCallbacks(execute=True):
+            add_to_rollups(TimeEntry.objects.create(
+                project=self.website, task=self.design, start_time=start, end_time=start + timedelta(minutes=30),
+            ))
+        # Tracked time only refreshes the progress cells; the rows stay cached
+        with self.assertNumQueries(2):
+            self.assertContains(self.client.get(reverse('task_list')), "30 / 60 min")
+        self.assertContains(self.client.get(reverse('project_list')), "30 / 60 min")
+
+    def test_create_modals_return_the_new_row(self):
+        response = self.client.post(reverse('task_create_modal'), {
+            'project': self.website.pk, 'name': 'Review', 'estimated_minutes': 15, 'is_active': 'on',
+        })
+        self.assertContains(response, '<tr class="task-row"', count=1)
+        self.assertContains(response, "Review")
+        self.assertNotContains(response, "Design")
+
+        response = self.client.post(reverse('project_create_modal'), {
+            'client': self.website.client_id, 'name': 'App', 'color': '#ffffff',
+        })
+        self.assertContains(response, '<tr class="project-row"', count=1)
+        self.assertNotContains(response, "Website")
+
+        response = self.client.post(reverse('task_create_modal'), {'name': 'No project'})
+        self.assertEqual(response['HX-Retarget'], '#modal-body')
@@ -1,59 +1,101 @@
 # Enhanced projects/views.py - PRESERVING ALL EXISTING FUNCTIONALITY
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import Count, Q, Sum
 from .models import Project, Task
 from .forms import ProjectForm, TaskForm
-from django.http import HttpResponse
+from .tables import project_table, task_project_options, task_table
+from django.http import HttpResponse, JsonResponse
 
 
 def project_list(request):
     # PRESERVE: All existing functionality
     print("project_list POST triggered:", request.POST)
-    projects = Project.objects.all()
 
-    # ADD: Statistics for new template (without changing existing logic)
-    active_projects_count = projects.filter(archived=False).count()
-    archived_projects_count = projects.filter(archived=True).count()
-    unique_clients_count = projects.values('client').distinct().count()
+    # ADD: Statistics for new template, from one conditional aggregate
+    stats = Project.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(archived=False)),
+        archived=Count('pk', filter=Q(archived=True)),
+        clients=Count('client', distinct=True),
+    )
 
     # PRESERVE: Original render call, just ADD new context
     return render(request, 'projects/project_list.html', {
-        'projects': projects,  # Keep existing
+        # The rows are rendered from the fragment cache (see projects.tables)
+        'project_table': project_table(request),
         # ADD: New context for template statistics
-        'active_projects_count': active_projects_count,
-        'archived_projects_count': archived_projects_count,
-        'unique_clients_count': unique_clients_count,
+        'projects_count': stats['total'],
+        'active_projects_count': stats['active'],
+        'archived_projects_count': stats['archived'],
+        'unique_clients_count': stats['clients'],
     })
 
 
 def task_list(request):
     # PRESERVE: All existing functionality
     print("task_list POST triggered:", request.POST)
-    tasks = Task.objects.select_related('project').all()
 
-    # ADD: Context for new template features (without changing existing logic)
-    total_estimated_minutes = sum(task.estimated_minutes for task in tasks if task.estimated_minutes)
+    # Totals come from one aggregate rather than a pass over every task
+    stats = Task.objects.with_progress().aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active=True)),
+        estimated=Sum('estimated_minutes'),
+        tracked=Sum('tracked_seconds'),
+    )
+    total_estimated_minutes = stats['estimated'] or 0
     total_estimated_hours = round(total_estimated_minutes / 60, 1) if total_estimated_minutes > 0 else 0
-    unique_projects = Project.objects.filter(task__in=tasks).distinct() if tasks else []
+    total_tracked_hours = round((stats['tracked'] or 0) / 3600, 1)
 
     # PRESERVE: Original render call, just ADD new context
     return render(request, 'projects/task_list.html', {
-        'tasks': tasks,  # Keep existing
+        # The rows and filter options are rendered from the fragment cache (see projects.tables)
+        'task_table': task_table(request),
+        'task_project_options': task_project_options(request),
         # ADD: New context for template enhancements
+        'total_tasks': stats['total'],
+        'active_tasks': stats['active'],
+        'inactive_tasks': stats['total'] - stats['active'],
         'total_estimated_time': total_estimated_hours,
-        'unique_projects': unique_projects,
+        'total_tracked_time': total_tracked_hours,
     })
 
 
+def task_detail(request, pk):
+    """A task's estimate against its tracked time, as JSON"""
+    task = get_object_or_404(Task.objects.select_related('project__client').with_progress(), pk=pk)
+    return JsonResponse({
+        'id': task.pk,
+        'name': task.name,
+        'project': {'id': task.project_id, 'name': task.project.name},
+        'client': {'id': task.project.client_id, 'name': task.project.client.name},
+        'is_active': task.is_active,
+        'estimated_minutes': task.estimated_minutes,
+        'tracked_minutes': task.tracked_minutes,
+        'remaining_minutes': max(task.estimated_minutes - task.tracked_minutes, 0),
+        'percent_complete': task.percent_complete,
+    })
+
+
+def _invalid_form(request, template, form):
+    # The form posts into the table; send the errors back into the modal instead
+    response = render(request, template, {'form': form})
+    response['HX-Retarget'] = '#modal-body'
+    response['HX-Reswap'] = 'innerHTML'
+    return response
+
+
 def project_create_modal(request):
     # PRESERVE: All existing functionality exactly as is
     print("project_create_modal POST triggered:", request.POST)
     if request.method == "POST":
         form = ProjectForm(request.POST)
         if form.is_valid():
-            form.save()
-            projects = Project.objects.all()
-            return render(request, 'projects/partials/project_table.html', {'projects': projects})
+            project = form.save()
+            # Only the new row; the page appends it to the table
+            project = Project.objects.select_related('client').with_progress().get(pk=project.pk)
+            return render(request, 'projects/partials/project_row.html', {'project': project})
+        return _invalid_form(request, 'projects/partials/project_form.html', form)
     else:
         form = ProjectForm()
     return render(request, 'projects/partials/project_form.html', {'form': form})
@@ -65,9 +107,11 @@ def task_create_modal(request):
     if request.method == "POST":
         form = TaskForm(request.POST)
         if form.is_valid():
-            form.save()
-            tasks = Task.objects.select_related('project').all()
-            return render(request, 'projects/partials/task_table.html', {'tasks': tasks})
+            task = form.save()
+            # Only the new row; the page appends it to the table
+            task = Task.objects.select_related('project__client').with_progress().get(pk=task.pk)
+            return render(request, 'projects/partials/task_row.html', {'task': task})
+        return _invalid_form(request, 'projects/partials/task_form.html', form)
     else:
         form = TaskForm()
     return render(request, 'projects/partials/task_form.html', {'form': form})
@@ -0,0 +1,381 @@
+# reporting/analytics.py
+"""
+Vectorized analytics over time entries with NumPy.
+
+Some reports need per-entry data rather than rollup sums: estimate accuracy
+per task, utilization per week and rolling averages. load_entries() reads
+completed, live entries in primary key chunks straight from the database
+cursor into preallocated NumPy columns, with timestamps already converted to
+epoch seconds by the database, and the metric functions work on whole
+columns instead of looping over entries.
+
+NumPy is an optional dependency (pip install numpy); everything here raises
+ImproperlyConfigured when it is missing, the rest of the app does not need it.
+"""
+from datetime import datetime, timezone as dt_timezone
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import BigIntegerField, Func, Max, Value
+from django.db.models.functions import Coalesce
+from core.workspace import get_workspace_timezone
+from projects.models import Project, Task
+from timetracker.models import TimeEntry
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_CHUNK_SIZE = 20000
+
+GROUPS = ('project', 'client', 'task')
+
+# Estimate accuracy buckets of actual / estimated time
+DEFAULT_ACCURACY_BINS = (0, 0.5, 0.8, 1.0, 1.2, 1.5, 2.0, float('inf'))
+
+# Grouping numbers (week, id) pairs densely while the grid stays this small
+MAX_DENSE_SPAN = 1000000
+MAX_DENSE_CELLS = 2000000
+
+SECONDS_PER_DAY = 86400
+# 1970-01-01 was a Thursday, day 3 of a Monday-based week
+EPOCH_WEEKDAY = 3
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("reporting.analytics needs NumPy; install it with pip install numpy")
+
+
+class EntryArrays:
+    """
+    Time entries as parallel columns: start and end as UTC epoch seconds,
+    project and task ids (-1 for none), hourly rate and billable flag.
+    """
+
+    columns = ('start', 'end', 'project', 'task', 'rate', 'billable')
+
+    def __init__(self, start, end, project, task, rate, billable):
+        self.start = start
+        self.end = end
+        self.project = project
+        self.task = task
+        self.rate = rate
+        self.billable = billable
+
+    @classmethod
+    def empty(cls, size):
+        require_numpy()
+        return cls(
+            np.empty(size, np.int64), np.empty(size, np.int64), np.empty(size, np.int64),
+            np.empty(size, np.int64), np.empty(size, np.float64), np.empty(size, np.bool_),
+        )
+
+    def grown(self, size):
+        """A copy with room for `size` entries"""
+        return EntryArrays(*(
+            np.concatenate([column, np.empty(size - len(column), column.dtype)])
+            for column in (getattr(self, name) for name in self.columns)
+        ))
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, index):
+        return EntryArrays(*(getattr(self, column)[index] for column in self.columns))
+
+    @property
+    def seconds(self):
+        return self.end - self.start
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, column).nbytes for column in self.columns)
+
+
+class EpochSeconds(Func):
+    """UTC epoch seconds of a datetime column, computed by the database"""
+
+    template = 'CAST(EXTRACT(EPOCH FROM %(expressions)s) AS BIGINT)'
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # %s escaped for the template and again for the cursor's parameter style
+        return self.as_sql(compiler, connection, template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='CAST(UNIX_TIMESTAMP(%(expressions)s) AS SIGNED)', **extra_context)
+
+
+def entry_rows(entries):
+    """
+    Rows of (pk, start epoch, duration, project, task, rate, billable) for a
+    TimeEntry queryset; integers straight from the cursor, with no datetime
+    parsing or None checks per row.
+    """
+    return entries.annotate(
+        start=EpochSeconds('start_time'),
+        project_key=Coalesce('project_id', Value(-1)), task_key=Coalesce('task_id', Value(-1)),
+    ).values_list('pk', 'start', 'duration_seconds', 'project_key', 'task_key', 'hourly_rate', 'billable')
+
+
+def iter_entry_chunks(entries, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream completed entries of a TimeEntry queryset as one EntryArrays per
+    chunk_size rows, in primary key order.
+    """
+    require_numpy()
+    rows = entry_rows(entries)
+    connection = connections[entries.db]
+    after = 0
+    while True:
+        sql, params = rows.filter(pk__gt=after).order_by('pk')[:chunk_size].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            chunk = cursor.fetchall()
+        if not chunk:
+            return
+        pks, starts, seconds, projects, tasks, rates, billable = zip(*chunk)
+        start = np.array(starts, np.int64)
+        yield EntryArrays(
+            start, start + np.array(seconds, np.int64), np.array(projects, np.int64),
+            np.array(tasks, np.int64), np.array(rates, np.float64), np.array(billable, np.bool_),
+        )
+        after = pks[-1]
+
+
+def load_entries(filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Load completed, live time entries into an EntryArrays.
+
+    filters is an optional timetracker.exports.ExportFilters. Entries are
+    read chunk_size rows at a time in primary key order into arrays sized
+    from one count up front, so peak memory is the arrays plus one chunk.
+    """
+    require_numpy()
+    entries = TimeEntry.objects.filter(end_time__isnull=False, deleted=False)
+    if filters is not None:
+        entries = filters.apply(entries, 'start_time')
+
+    # Rows added after counting are left out, rows removed leave the arrays short
+    last_pk = entries.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    entries = entries.filter(pk__lte=last_pk)
+    arrays = EntryArrays.empty(entries.count())
+
+    filled = 0
+    for chunk in iter_entry_chunks(entries, chunk_size):
+        if filled + len(chunk) > len(arrays):
+            # An entry was edited into the filter after counting
+            arrays = arrays.grown(filled + len(chunk))
+        window = slice(filled, filled + len(chunk))
+        for column in EntryArrays.columns:
+            getattr(arrays, column)[window] = getattr(chunk, column)
+        filled += len(chunk)
+
+    return arrays[:filled] if filled < len(arrays) else arrays
+
+
+def utc_offsets(first, count, step, tz):
+    """UTC offsets in seconds of `tz` at `count` instants `step` seconds apart from epoch second `first`"""
+    return np.fromiter(
+        (
+            datetime.fromtimestamp(first + index * step, dt_timezone.utc).astimezone(tz).utcoffset().total_seconds()
+            for index in range(count)
+        ),
+        np.int64, count,
+    )
+
+
+def local_days(epoch, tz=None):
+    """
+    Calendar day numbers (days since 1970-01-01) in the workspace timezone.
+
+    UTC offsets are looked up once per hour of the covered range and
+    broadcast, so DST changes (which fall on whole UTC hours) are honoured
+    without a per-entry conversion.
+    """
+    require_numpy()
+    tz = tz or get_workspace_timezone()
+    if not len(epoch):
+        return np.empty(0, np.int64)
+    first_hour = int(epoch.min()) // 3600
+    offsets = utc_offsets(first_hour * 3600, int(epoch.max()) // 3600 - first_hour + 1, 3600, tz)
+    # In place where possible: each temporary is as long as the whole column
+    days = epoch // 3600
+    days -= first_hour
+    days = offsets[days]
+    days += epoch
+    days //= SECONDS_PER_DAY
+    return days
+
+
+def local_weeks(epoch, tz=None):
+    """Week numbers in the workspace timezone; week 0 starts on Monday 1969-12-29"""
+    weeks = local_days(epoch, tz)
+    weeks += EPOCH_WEEKDAY
+    weeks //= 7
+    return weeks
+
+
+def week_dates(weeks):
+    """The Mondays starting the given week numbers, as datetime64[D]"""
+    return (np.asarray(weeks, np.int64) * 7 - EPOCH_WEEKDAY).astype('datetime64[D]')
+
+
+def group_ids(arrays, group):
+    """The id column for a grouping; clients are mapped from projects"""
+    if group not in GROUPS:
+        raise ValueError(f"group must be one of {GROUPS}")
+    if group == 'task':
+        return arrays.task
+    if group == 'project':
+        return arrays.project
+    projects = np.array(Project.objects.values_list('pk', 'client_id').order_by('pk'), np.int64).reshape(-1, 2)
+    return _map_ids(arrays.project, projects[:, 0], projects[:, 1])
+
+
+def _map_ids(ids, keys, values, missing=-1):
+    """Map ids through sorted keys -> values, vectorized"""
+    if not len(keys):
+        return np.full(len(ids), missing, values.dtype)
+    position = np.clip(np.searchsorted(keys, ids), 0, len(keys) - 1)
+    return np.where(keys[position] == ids, values[position], missing)
+
+
+def _codes(column, max_span=MAX_DENSE_SPAN):
+    """
+    (values, codes) numbering the distinct values of an integer column.
+    Ids and week numbers usually span a short range, which is numbered by
+    offset without sorting; sparse columns fall back to np.unique.
+    """
+    if not len(column):
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    low, high = int(column.min()), int(column.max())
+    if high - low < max_span:
+        return np.arange(low, high + 1), column - low
+    values, codes = np.unique(column, return_inverse=True)
+    return values, codes.reshape(-1)
+
+
+def _grouped_sums(first, second, *weights):
+    """Distinct (first, second) pairs present and the sum of each weight per pair"""
+    first_values, cells = _codes(first)
+    second_values, second_codes = _codes(second)
+    width = len(second_values)
+    cells *= width
+    cells += second_codes
+    grid = len(first_values) * width
+    if grid > MAX_DENSE_CELLS:
+        keys, cells = np.unique(cells, return_inverse=True)
+        cells = cells.reshape(-1)
+        sums = [np.bincount(cells, weights=weight, minlength=len(keys)) for weight in weights]
+    else:
+        keys = np.flatnonzero(np.bincount(cells, minlength=grid))
+        sums = [np.bincount(cells, weights=weight, minlength=grid)[keys] for weight in weights]
+    return first_values[keys // width], second_values[keys % width], sums
+
+
+def weekly_utilization(arrays, group='project', capacity_hours=None, tz=None):
+    """
+    Tracked and billable hours per workspace week and group.
+
+    Utilization is billable / tracked time, or tracked time / capacity_hours
+    when a weekly capacity is given. Returns a dict of equally long arrays.
+    """
+    require_numpy()
+    seconds = arrays.seconds
+    week, ids, (tracked, billable) = _grouped_sums(
+        local_weeks(arrays.start, tz), group_ids(arrays, group), seconds, seconds * arrays.billable,
+    )
+    tracked_hours, billable_hours = tracked / 3600, billable / 3600
+    if capacity_hours:
+        utilization = tracked_hours / capacity_hours
+    else:
+        utilization = np.divide(billable_hours, tracked_hours, out=np.zeros_like(tracked_hours), where=tracked_hours > 0)
+    return {
+        'week': week_dates(week),
+        group: ids,
+        'tracked_hours': tracked_hours,
+        'billable_hours': billable_hours,
+        'utilization': utilization,
+    }
+
+
+def estimate_accuracy(arrays, bins=DEFAULT_ACCURACY_BINS):
+    """
+    Actual against estimated time for every task with an estimate and
+    tracked time.
+
+    Returns the per-task arrays (task, estimated and actual hours, ratio of
+    actual to estimate), a histogram of the ratios over `bins`, and the
+    10th, 50th and 90th percentile ratios.
+    """
+    require_numpy()
+    estimates = np.array(
+        Task.objects.filter(estimated_minutes__gt=0).order_by('pk').values_list('pk', 'estimated_minutes'), np.int64,
+    ).reshape(-1, 2)
+    tasks = estimates[:, 0]
+    estimated = estimates[:, 1] * 60.0
+
+    with_task = arrays.task >= 0
+    tracked_tasks, codes = _codes(arrays.task[with_task])
+    tracked = np.bincount(codes, weights=arrays.seconds[with_task], minlength=len(tracked_tasks))
+    actual = _map_ids(tasks, tracked_tasks, tracked, missing=0)
+
+    # Tasks nobody has tracked time on say nothing about accuracy yet
+    worked = actual > 0
+    tasks, estimated, actual = tasks[worked], estimated[worked], actual[worked]
+    ratio = actual / estimated
+    counts, edges = np.histogram(ratio, bins=np.asarray(bins, np.float64))
+    return {
+        'task': tasks,
+        'estimated_hours': estimated / 3600,
+        'actual_hours': actual / 3600,
+        'ratio': ratio,
+        'histogram': {'edges': edges, 'counts': counts},
+        'percentiles': dict(zip((10, 50, 90), np.percentile(ratio, (10, 50, 90)))) if len(ratio) else {},
+    }
+
+
+def rolling_weekly_hours(arrays, window=4, group=None, tz=None):
+    """
+    Tracked hours per week and their trailing `window`-week average.
+
+    Weeks without time count as zero. With a group, 'hours' and 'average'
+    are (groups x weeks) matrices; without one they are 1-d.
+    """
+    require_numpy()
+    weeks = local_weeks(arrays.start, tz)
+    if not len(weeks):
+        return {'week': week_dates([]), 'hours': np.empty(0), 'average': np.empty(0)}
+    first = int(weeks.min())
+    weeks -= first
+    week_count = int(weeks.max()) + 1
+    hours = arrays.seconds / 3600
+
+    if group:
+        groups, cells = _codes(group_ids(arrays, group), max_span=MAX_DENSE_CELLS // week_count)
+        cells *= week_count
+        cells += weeks
+        totals = np.bincount(cells, weights=hours, minlength=len(groups) * week_count).reshape(len(groups), week_count)
+        # Dense numbering leaves rows for ids without entries in range
+        present = totals.any(axis=1)
+        groups, totals = groups[present], totals[present]
+    else:
+        groups = None
+        totals = np.bincount(weeks, weights=hours, minlength=week_count)
+
+    cumulative = np.cumsum(totals, axis=-1)
+    trailing = cumulative.copy()
+    trailing[..., window:] -= cumulative[..., :-window]
+    # The first weeks average over the weeks seen so far
+    seen = np.minimum(np.arange(1, week_count + 1), window)
+    result = {
+        'week': week_dates(first + np.arange(week_count)),
+        'hours': totals,
+        'average': trailing / seen,
+    }
+    if group:
+        result[group] = groups
+    return result
+
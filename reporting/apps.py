@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class ReportingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reporting'
+
+    def ready(self):
+        from core.models import Client
+        from projects.models import Project, Task
+        from reporting.engine import invalidate_reports
+
+        for model in (Client, Project, Task):
+            label = model._meta.label_lower
+            post_save.connect(invalidate_reports, sender=model, dispatch_uid=f'reporting.invalidate.{label}.save')
+            post_delete.connect(invalidate_reports, sender=model, dispatch_uid=f'reporting.invalidate.{label}.delete')
@@ -0,0 +1,267 @@
+# reporting/engine.py
+"""
+Execution of saved report filter specs.
+
+A spec (SavedReport.filters_json) looks like
+
+    {"date_from": "2025-01-01", "date_to": "2025-03-31",
+     "clients": [1], "projects": [], "tasks": [], "billable": true,
+     "group_by": ["month", "project"]}
+
+Every key is optional. group_by takes at most one period (day, week or
+month) and one dimension (project, client or task). Specs are normalized
+first, so equivalent specs share a cache entry, and then compiled into one
+aggregate query over the daily rollup table, whose days are already in the
+workspace timezone; group names are looked up with one more query.
+
+Results are cached under a hash of the normalized spec and the rollup data
+version, which moves whenever committed changes reach the rollups (time
+entry writes, imports, rebuilds) or a client, project or task is renamed or
+deleted; reopening a report is a cache hit until then.
+"""
+import hashlib
+import json
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum, Value
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils.dateparse import parse_date
+from django.utils.timezone import now
+from core.models import Client
+from core.versions import get_version
+from projects.models import Project, Task
+from timetracker.models import DailyTimeRollup
+from timetracker.rollups import ROLLUP_VERSION, rollups_changed
+
+
+class WeekStart(TruncWeek):
+    """TruncWeek of a date column; SQLite truncates natively instead of calling back into Python per row"""
+
+    def as_sqlite(self, compiler, connection):
+        sql, params = compiler.compile(self.lhs)
+        # Back six days, then forward to the next Monday: the Monday on or before the day
+        return f"date({sql}, '-6 days', 'weekday 1')", params
+
+
+class MonthStart(TruncMonth):
+    """TruncMonth of a date column, natively on SQLite"""
+
+    def as_sqlite(self, compiler, connection):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, 'start of month')", params
+
+
+PERIODS = {
+    'day': F('day'),
+    'week': WeekStart('day'),
+    'month': MonthStart('day'),
+}
+
+# Grouped columns, ending with the dimension's id, and the model naming it.
+# Tasks group by project too: it changes no groups but follows the rollup
+# unique index, so day x task groups without sorting.
+DIMENSIONS = {
+    'project': (('project_id',), Project),
+    'client': (('project__client_id',), Client),
+    'task': (('project_id', 'task_id'), Task),
+}
+
+CACHE_PREFIX = 'report:'
+
+
+class ReportError(ValueError):
+    """A filter spec that cannot be executed"""
+
+
+def invalidate_reports(**kwargs):
+    """Signal receiver: labels and client ownership shown in reports changed"""
+    rollups_changed()
+
+
+def get_cache_timeout():
+    return getattr(settings, 'REPORT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def _date(spec, name):
+    value = spec.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        day = parse_date(str(value))
+    except ValueError:
+        day = None
+    if day is None:
+        raise ReportError(f"{name} must be a YYYY-MM-DD date")
+    return day.isoformat()
+
+
+def _ids(spec, name):
+    value = spec.get(name) or []
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    try:
+        return sorted({int(pk) for pk in value})
+    except (TypeError, ValueError):
+        raise ReportError(f"{name} must be a list of ids")
+
+
+def _billable(spec):
+    value = spec.get('billable')
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool):
+        return value
+    value = str(value).lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ReportError("billable must be true or false")
+
+
+def normalize_filters(spec):
+    """Validate a filter spec and return it in canonical form; raises ReportError"""
+    if not isinstance(spec, dict):
+        raise ReportError("The report filters must be an object")
+
+    group_by = spec.get('group_by') or []
+    if isinstance(group_by, str):
+        group_by = [part.strip() for part in group_by.split(',') if part.strip()]
+    periods = [part for part in group_by if part in PERIODS]
+    dimensions = [part for part in group_by if part in DIMENSIONS]
+    unknown = set(group_by) - set(PERIODS) - set(DIMENSIONS)
+    if unknown:
+        raise ReportError(f"Unknown group_by {sorted(unknown)}; expected {sorted(PERIODS)} or {sorted(DIMENSIONS)}")
+    if len(periods) > 1 or len(dimensions) > 1:
+        raise ReportError("group_by takes at most one period and one dimension")
+
+    normalized = {
+        'date_from': _date(spec, 'date_from'),
+        'date_to': _date(spec, 'date_to'),
+        'clients': _ids(spec, 'clients'),
+        'projects': _ids(spec, 'projects'),
+        'tasks': _ids(spec, 'tasks'),
+        'billable': _billable(spec),
+        'period': periods[0] if periods else None,
+        'dimension': dimensions[0] if dimensions else None,
+    }
+    if normalized['date_from'] and normalized['date_to'] and normalized['date_to'] < normalized['date_from']:
+        raise ReportError("date_to is before date_from")
+    return normalized
+
+
+def compile_report(filters):
+    """
+    The aggregate rollup queryset for normalized filters: one
+    (period, dimension ids..., seconds, entries, amount) tuple per group
+    """
+    rollups = DailyTimeRollup.objects.all()
+    if filters['date_from']:
+        rollups = rollups.filter(day__gte=filters['date_from'])
+    if filters['date_to']:
+        rollups = rollups.filter(day__lte=filters['date_to'])
+    if filters['clients']:
+        rollups = rollups.filter(project__client_id__in=filters['clients'])
+    if filters['projects']:
+        rollups = rollups.filter(project_id__in=filters['projects'])
+    if filters['tasks']:
+        rollups = rollups.filter(task_id__in=filters['tasks'])
+    if filters['billable'] is not None:
+        rollups = rollups.filter(billable=filters['billable'])
+
+    # Grouping on aliases keeps GROUP BY in the ORDER BY column order, so
+    # SQLite sorts once; a constant stands in when nothing is grouped
+    group = {}
+    if filters['period']:
+        group['period'] = PERIODS[filters['period']]
+    if filters['dimension']:
+        for position, field in enumerate(DIMENSIONS[filters['dimension']][0]):
+            group[f'group_{position}'] = F(field)
+    if not group:
+        rollups = rollups.annotate(whole=Value(True)).values('whole')
+    else:
+        rollups = rollups.annotate(**group).values(*group)
+
+    return rollups.annotate(
+        seconds=Sum('tracked_seconds'),
+        entries=Sum('entry_count'),
+        amount=Sum('billable_amount'),
+    ).order_by(*group).values_list(*group, 'seconds', 'entries', 'amount')
+
+
+def columns_for(filters):
+    columns = []
+    if filters['period']:
+        columns.append('period')
+    if filters['dimension']:
+        columns.append(filters['dimension'])
+    return columns + ['hours', 'entries', 'amount']
+
+
+def _rows(filters):
+    """Yield result rows; names are resolved once per dimension rather than joined into the grouping"""
+    results = list(compile_report(filters))
+    period, dimension = filters['period'], filters['dimension']
+    names = {}
+    if dimension:
+        model = DIMENSIONS[dimension][1]
+        ids = {values[-4] for values in results}
+        names = dict(model.objects.filter(pk__in=ids).values_list('pk', 'name'))
+    cent = Decimal('0.01')
+    id_key = f'{dimension}_id'
+
+    for values in results:
+        *group, seconds, entries, amount = values
+        row = {}
+        if period:
+            day = group[0]
+            row['period'] = day.isoformat() if isinstance(day, date) else day
+        if dimension:
+            row[id_key] = group[-1]
+            row[dimension] = names.get(group[-1])
+        row['seconds'] = seconds or 0
+        row['hours'] = round(row['seconds'] / 3600, 2)
+        row['entries'] = entries or 0
+        row['amount'] = (amount or Decimal('0')).quantize(cent)
+        yield row
+
+
+def execute_report(filters):
+    """Run normalized filters against the database and return the result dict"""
+    rows = list(_rows(filters))
+    seconds = sum(row['seconds'] for row in rows)
+    return {
+        'filters': filters,
+        'columns': columns_for(filters),
+        'rows': rows,
+        'totals': {
+            'seconds': seconds,
+            'hours': round(seconds / 3600, 2),
+            'entries': sum(row['entries'] for row in rows),
+            'amount': sum((row['amount'] for row in rows), Decimal('0')),
+        },
+        'generated_at': now().isoformat(),
+    }
+
+
+def cache_key(filters):
+    digest = hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    return CACHE_PREFIX + digest
+
+
+def run_report(spec):
+    """
+    Return (result, cached) for a filter spec, serving repeated runs from the
+    cache until the rollup data version moves. Raises ReportError.
+    """
+    filters = normalize_filters(spec)
+    key = cache_key(filters)
+    version = get_version(ROLLUP_VERSION)
+    result = cache.get(key, version=version)
+    if result is not None:
+        return result, True
+    result = execute_report(filters)
+    cache.set(key, result, get_cache_timeout(), version=version)
+    return result, False
@@ -0,0 +1,159 @@
+# reporting/heatmap.py
+"""
+Hour-of-week activity heatmap: tracked seconds in 7 x 24 buckets of the
+workspace timezone (Monday first) over a date range.
+
+Entries overlapping the range are streamed in chunks of NumPy columns (see
+reporting.analytics) and clipped to it. Each interval is spread over a
+fixed grid of 15-minute UTC slots: partial first and last slots are added
+with bincount, and the whole slots between with a difference array that is
+summed once at the end. Every slot is then mapped to its local weekday and
+hour through the UTC offset at that slot. Offsets only change on quarter
+hours, so an entry crossing midnight or a DST change is split exactly, in
+one pass with no per-entry timezone conversion.
+
+Results are cached per workspace, range and filters under the data versions
+of the months in the range, which move whenever an entry touching one of
+those months is written (see timetracker.rollups.entries_changed).
+"""
+import hashlib
+import json
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.timezone import localdate
+from core.versions import get_versions
+from core.workspace import get_active_workspace, get_workspace_timezone
+from projects.models import Project
+from reporting.analytics import SECONDS_PER_DAY, EPOCH_WEEKDAY, iter_entry_chunks, np, require_numpy, utc_offsets
+from reporting.engine import ReportError, get_cache_timeout
+from timetracker.exports import ExportFilters
+from timetracker.models import TimeEntry
+from timetracker.rollups import month_versions
+
+SLOT_SECONDS = 15 * 60
+HOURS_PER_WEEK = 7 * 24
+DEFAULT_DAYS = 28
+MAX_DAYS = 366
+
+CACHE_PREFIX = 'heatmap:'
+
+
+def heatmap_filters(query):
+    """ExportFilters for heatmap query parameters, the last four weeks by default; raises ReportError"""
+    try:
+        filters = ExportFilters.from_query(query)
+    except ValueError as error:
+        raise ReportError(str(error))
+    filters.date_to = filters.date_to or localdate(timezone=get_workspace_timezone())
+    filters.date_from = filters.date_from or filters.date_to - timedelta(days=DEFAULT_DAYS - 1)
+    if filters.date_from > filters.date_to:
+        raise ReportError("date_from must not be after date_to")
+    if (filters.date_to - filters.date_from).days >= MAX_DAYS:
+        raise ReportError(f"The range can span at most {MAX_DAYS} days")
+    return filters
+
+
+def _slot_offsets(first, count, tz):
+    """
+    UTC offsets of `count` slots from epoch second `first`, looked up once
+    per hour; only the hours containing a change are looked up per slot.
+    """
+    per_hour = 3600 // SLOT_SECONDS
+    hours = -(-count // per_hour)
+    offsets = np.repeat(utc_offsets(first, hours + 1, 3600, tz), per_hour)
+    for hour in np.flatnonzero(offsets[per_hour::per_hour][:hours] != offsets[:hours * per_hour:per_hour]):
+        start = hour * per_hour
+        offsets[start:start + per_hour] = utc_offsets(first + start * SLOT_SECONDS, per_hour, SLOT_SECONDS, tz)
+    return offsets[:count]
+
+
+def bucket_seconds(chunks, start, end, tz):
+    """
+    Tracked seconds per hour of the week (168 floats, Monday 00:00 first) of
+    EntryArrays chunks, clipped to the UTC epoch seconds [start, end).
+    """
+    require_numpy()
+    first = start - start % SLOT_SECONDS
+    count = -(-(end - first) // SLOT_SECONDS)
+    # Seconds in partial slots, and +1/-1 marks around runs of whole slots
+    partial = np.zeros(count + 1)
+    runs = np.zeros(count + 1, np.int64)
+    for chunk in chunks:
+        begin = np.clip(chunk.start, start, end) - first
+        finish = np.clip(chunk.end, start, end) - first
+        head, tail = begin // SLOT_SECONDS, finish // SLOT_SECONDS
+        same = head == tail
+        partial += np.bincount(head[same], weights=finish[same] - begin[same], minlength=count + 1)
+        head, tail, begin, finish = head[~same], tail[~same], begin[~same], finish[~same]
+        partial += np.bincount(head, weights=(head + 1) * SLOT_SECONDS - begin, minlength=count + 1)
+        partial += np.bincount(tail, weights=finish - tail * SLOT_SECONDS, minlength=count + 1)
+        runs += np.bincount(head + 1, minlength=count + 1)
+        runs -= np.bincount(tail, minlength=count + 1)
+    slots = partial[:count] + np.cumsum(runs[:count]) * SLOT_SECONDS
+
+    local = first + np.arange(count, dtype=np.int64) * SLOT_SECONDS + _slot_offsets(first, count, tz)
+    weekday = (local // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7
+    hour = local % SECONDS_PER_DAY // 3600
+    return np.bincount(weekday * 24 + hour, weights=slots, minlength=HOURS_PER_WEEK)
+
+
+def build_heatmap(filters):
+    """The heatmap payload for ExportFilters with both dates set"""
+    tz = get_workspace_timezone()
+    start, end = filters.range()
+    live = TimeEntry.objects.filter(end_time__isnull=False, deleted=False)
+    # Overlapping entries start at most the longest duration before the range
+    longest = live.aggregate(longest=Max('duration_seconds'))['longest'] or 0
+    entries = live.filter(end_time__gt=start, start_time__lt=end, start_time__gte=start - timedelta(seconds=longest))
+    entries = ExportFilters(project=filters.project, client=filters.client, billable=filters.billable).apply(
+        entries, 'start_time'
+    )
+
+    seconds = bucket_seconds(
+        iter_entry_chunks(entries), int(start.timestamp()), int(end.timestamp()), tz,
+    ).round().astype(np.int64).reshape(7, 24)
+    return {
+        'timezone': str(tz),
+        'date_from': filters.date_from.isoformat(),
+        'date_to': filters.date_to.isoformat(),
+        'weekdays': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        'seconds': seconds.tolist(),
+        'totals': {
+            'seconds': int(seconds.sum()),
+            'weekday': seconds.sum(axis=1).tolist(),
+            'hour': seconds.sum(axis=0).tolist(),
+        },
+    }
+
+
+def cache_key(filters):
+    workspace = get_active_workspace()
+    parts = {
+        'workspace': workspace.pk if workspace else None,
+        'timezone': str(get_workspace_timezone()),
+        'date_from': filters.date_from.isoformat(),
+        'date_to': filters.date_to.isoformat(),
+        'project': filters.project,
+        'client': filters.client,
+        'billable': filters.billable,
+        'versions': get_versions(month_versions(filters.date_from, filters.date_to)),
+    }
+    if filters.client is not None:
+        # Projects moving between clients change a client's heatmap
+        parts['projects'] = list(Project.objects.filter(client_id=filters.client).order_by('pk').values_list('pk', flat=True))
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+    return CACHE_PREFIX + digest
+
+
+def activity_heatmap(query):
+    """Return (payload, cached) for heatmap query parameters; raises ReportError"""
+    require_numpy()
+    filters = heatmap_filters(query)
+    key = cache_key(filters)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload, True
+    payload = build_heatmap(filters)
+    cache.set(key, payload, get_cache_timeout())
+    return payload, False
@@ -0,0 +1,165 @@
+# reporting/management/commands/benchmark_analytics.py
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import localtime
+from core.models import Client, Workspace
+from core.workspace import clear_workspace_cache, get_workspace_timezone
+from projects.models import Project, Task
+from reporting import analytics
+from timetracker.models import TimeEntry
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare reporting.analytics with a pure ORM/Python baseline for weekly "
+        "utilization, estimate accuracy and rolling 4-week averages, for speed "
+        "and peak traced memory. Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=5000000)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--tasks-per-project', type=int, default=10)
+        parser.add_argument('--years', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        analytics.require_numpy()
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            clear_workspace_cache()
+
+    def seed(self, options):
+        # The first workspace's timezone applies; switching it is rolled back too
+        workspace = Workspace.objects.order_by('id').first() or Workspace(name="Benchmark")
+        workspace.timezone = "Europe/Berlin"
+        workspace.save()
+        clear_workspace_cache()
+        client = Client.objects.create(workspace=workspace, name="Benchmark client")
+        projects = Project.objects.bulk_create(
+            Project(client=client, name=f"Project {i}") for i in range(options['projects'])
+        )
+        rng = random.Random(21)
+        tasks = Task.objects.bulk_create(
+            Task(project=project, name=f"Task {i}", estimated_minutes=rng.choice((0, 60, 240, 600, 1200)))
+            for project in projects for i in range(options['tasks_per_project'])
+        )
+
+        span = options['years'] * 365 * 86400
+        first = datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+        remaining = options['entries']
+        while remaining:
+            batch = []
+            for _ in range(min(remaining, options['batch_size'])):
+                task = rng.choice(tasks)
+                start = first + timedelta(seconds=rng.randrange(span))
+                seconds = rng.randrange(300, 4 * 3600)
+                batch.append(TimeEntry(
+                    project_id=task.project_id, task=task if rng.random() < 0.9 else None,
+                    start_time=start, end_time=start + timedelta(seconds=seconds), duration_seconds=seconds,
+                    billable=rng.random() < 0.7, hourly_rate=rng.choice((50, 80, 120)),
+                ))
+            TimeEntry.objects.bulk_create(batch)
+            remaining -= len(batch)
+
+    def vectorized(self):
+        arrays = analytics.load_entries()
+        utilization = analytics.weekly_utilization(arrays, group='project')
+        accuracy = analytics.estimate_accuracy(arrays)
+        rolling = analytics.rolling_weekly_hours(arrays, window=4)
+        return {
+            'utilization': {
+                (str(week), project): (round(tracked, 6), round(billable, 6))
+                for week, project, tracked, billable in zip(
+                    utilization['week'], utilization['project'].tolist(),
+                    utilization['tracked_hours'].tolist(), utilization['billable_hours'].tolist(),
+                )
+            },
+            'ratios': sorted(round(ratio, 9) for ratio in accuracy['ratio'].tolist()),
+            'rolling': [round(value, 6) for value in rolling['average'].tolist()],
+        }
+
+    def baseline(self):
+        """The same metrics from ORM rows with Python loops"""
+        tz = get_workspace_timezone()
+        weeks = defaultdict(lambda: [0, 0])
+        actual = defaultdict(int)
+        weekly = defaultdict(int)
+        rows = TimeEntry.objects.filter(end_time__isnull=False, deleted=False).values_list(
+            'start_time', 'duration_seconds', 'project_id', 'task_id', 'billable'
+        ).iterator(chunk_size=analytics.DEFAULT_CHUNK_SIZE)
+        for start, seconds, project_id, task_id, billable in rows:
+            day = localtime(start, tz).date()
+            week = day - timedelta(days=day.weekday())
+            totals = weeks[week, -1 if project_id is None else project_id]
+            totals[0] += seconds
+            if billable:
+                totals[1] += seconds
+            if task_id is not None:
+                actual[task_id] += seconds
+            weekly[week] += seconds
+
+        estimates = dict(Task.objects.filter(estimated_minutes__gt=0).values_list('pk', 'estimated_minutes'))
+        ratios = sorted(round(actual[pk] / (minutes * 60), 9) for pk, minutes in estimates.items() if actual.get(pk))
+
+        rolling = []
+        if weekly:
+            week, last = min(weekly), max(weekly)
+            window = []
+            while week <= last:
+                window = (window + [weekly.get(week, 0) / 3600])[-4:]
+                rolling.append(round(sum(window) / len(window), 6))
+                week += timedelta(days=7)
+
+        return {
+            'utilization': {
+                (str(week), project): (round(tracked / 3600, 6), round(billable / 3600, 6))
+                for (week, project), (tracked, billable) in weeks.items()
+            },
+            'ratios': ratios,
+            'rolling': rolling,
+        }
+
+    def measure(self, func):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        # A second, traced run for peak memory; tracing slows the first down too much to time both at once
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    def run(self, options):
+        started = time.perf_counter()
+        self.seed(options)
+        self.stdout.write(f"Seeded {options['entries']} entries in {time.perf_counter() - started:.0f} s")
+
+        results = {}
+        for label, func in (("ORM/Python (before)", self.baseline), ("NumPy (after)", self.vectorized)):
+            results[label], elapsed, peak = self.measure(func)
+            self.stdout.write(f"{label:<22} {elapsed:8.2f} s  peak {peak / 2 ** 20:8.1f} MiB")
+
+        baseline, vectorized = results.values()
+        for metric in baseline:
+            if baseline[metric] != vectorized[metric]:
+                raise CommandError(f"{metric} differs between the baseline and the vectorized results")
+        self.stdout.write(
+            f"{len(vectorized['utilization'])} project-weeks, {len(vectorized['ratios'])} estimated tasks, "
+            f"{len(vectorized['rolling'])} weeks; results match"
+        )
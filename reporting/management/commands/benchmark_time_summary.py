@@ -0,0 +1,137 @@
+# reporting/management/commands/benchmark_time_summary.py
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from core.models import Client, Workspace
+from core.workspace import clear_workspace_cache, get_workspace_timezone
+from projects.models import Project, Task
+from reporting.engine import execute_report, normalize_filters
+from reporting.summary import columnar
+from timetracker.models import TimeEntry
+from timetracker.rollups import rebuild_rollups
+
+TRUNCATE = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+DIMENSIONS = {'project': 'project_id', 'client': 'project__client_id', 'task': 'task_id'}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the grouped summary API over a year of generated data, against "
+        "truncating every entry's start_time in the workspace timezone. Runs "
+        "inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=50)
+        parser.add_argument('--entries-per-day', type=int, default=6)
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--projects-per-client', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--budget-ms', type=float, default=200)
+        parser.add_argument(
+            '--budget-rows', type=int, default=10000,
+            help="Results with more rows than this (e.g. a year by day and task) are timed but not held to the budget",
+        )
+
+    def handle(self, *args, **options):
+        self.slow = []
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            clear_workspace_cache()
+        if self.slow:
+            raise CommandError(f"Over the {options['budget_ms']:.0f} ms budget: {', '.join(self.slow)}")
+
+    def seed(self, options):
+        # The first workspace's timezone applies; switching it is rolled back too
+        workspace = Workspace.objects.order_by('id').first() or Workspace(name="Benchmark")
+        workspace.timezone = "America/New_York"
+        workspace.save()
+        clients = Client.objects.bulk_create(
+            Client(workspace=workspace, name=f"Client {i}") for i in range(options['clients'])
+        )
+        projects = Project.objects.bulk_create(
+            Project(client=client, name=f"{client.name} project {i}")
+            for client in clients for i in range(options['projects_per_client'])
+        )
+        tasks = Task.objects.bulk_create(
+            Task(project=project, name=f"{project.name} task {i}") for project in projects for i in range(4)
+        )
+
+        rng = random.Random(20)
+        first_day = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        entries = []
+        for day in range(366):
+            day_start = first_day + timedelta(days=day)
+            if day_start.weekday() >= 5:
+                continue
+            for _ in range(options['people'] * options['entries_per_day']):
+                task = rng.choice(tasks)
+                # 11:00 to 06:00 UTC the next day, so evening New York time crosses UTC midnight
+                start = day_start + timedelta(hours=11, minutes=rng.randrange(19 * 60))
+                entries.append(TimeEntry(
+                    project_id=task.project_id, task=task, start_time=start,
+                    end_time=start + timedelta(minutes=rng.randrange(15, 120)),
+                    billable=rng.random() < 0.8, hourly_rate=rng.choice((50, 80, 120)),
+                ))
+        for entry in entries:
+            entry.duration_seconds = entry.compute_duration_seconds()
+        TimeEntry.objects.bulk_create(entries, batch_size=2000)
+        rebuild_rollups()
+        return len(entries)
+
+    def per_entry(self, filters):
+        """The same summary truncating each entry in SQL with the workspace tzinfo"""
+        period = TRUNCATE[filters['period']]('start_time', tzinfo=get_workspace_timezone())
+        group = ['period']
+        if filters['dimension']:
+            group.append(DIMENSIONS[filters['dimension']])
+        rows = TimeEntry.objects.filter(end_time__isnull=False, deleted=False).annotate(
+            period=period
+        ).values(*group).annotate(seconds=Sum('duration_seconds'), entries=Count('id')).order_by(*group)
+        return [(row['period'].date().isoformat(), row['seconds']) for row in rows]
+
+    def time(self, label, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, min(timings)
+
+    def run(self, options):
+        count = self.seed(options)
+        self.stdout.write(
+            f"{count} entries for {options['people']} people over 2024 in {get_workspace_timezone()}"
+        )
+        self.stdout.write(f"{'':<16} {'rows':>7} {'summary':>10} {'per-entry':>10}")
+
+        for period in ('day', 'week', 'month'):
+            for dimension in (None, 'client', 'project', 'task'):
+                label = f"{period} x {dimension or 'total'}"
+                filters = normalize_filters({'group_by': [period, dimension] if dimension else [period]})
+                summary, elapsed = self.time(label, lambda: columnar(execute_report(filters)), options['repeat'])
+                baseline, baseline_elapsed = self.time(label, lambda: self.per_entry(filters), 1)
+                if not dimension:
+                    assert list(zip(summary['data']['period'], summary['data']['seconds'])) == baseline, label
+
+                rows = len(summary['data']['period'])
+                verdict = ''
+                if rows <= options['budget_rows']:
+                    verdict = 'ok' if elapsed <= options['budget_ms'] else 'SLOW'
+                    if verdict == 'SLOW':
+                        self.slow.append(label)
+                self.stdout.write(f"{label:<16} {rows:>7} {elapsed:8.1f}ms {baseline_elapsed:8.1f}ms  {verdict}")
@@ -0,0 +1,82 @@
+# reporting/summary.py
+"""
+Grouped time summaries as a compact columnar payload.
+
+A summary is a report (see reporting.engine) with one period and at most one
+dimension, so it shares the engine's filters, its single aggregate query over
+the daily rollups and its versioned cache. Rollup days are already calendar
+days in the workspace timezone, so day, week and month buckets truncate in
+the database without any timezone conversion per row.
+"""
+from core.workspace import get_workspace_timezone
+from reporting.engine import DIMENSIONS, PERIODS, ReportError, run_report
+
+
+def summary_spec(query):
+    """Build a report spec from summary query parameters; raises ReportError"""
+    period = query.get('period') or 'day'
+    if period not in PERIODS:
+        raise ReportError(f"period must be one of {sorted(PERIODS)}")
+    group_by = query.get('group_by') or None
+    if group_by is not None and group_by not in DIMENSIONS:
+        raise ReportError(f"group_by must be one of {sorted(DIMENSIONS)}")
+
+    return {
+        'date_from': query.get('date_from'),
+        'date_to': query.get('date_to'),
+        'clients': query.getlist('client'),
+        'projects': query.getlist('project'),
+        'tasks': query.getlist('task'),
+        'billable': query.get('billable'),
+        'group_by': [period, group_by] if group_by else [period],
+    }
+
+
+def columnar(result):
+    """
+    Turn a report result into parallel arrays. Groups are listed once and
+    referenced by index, so each row costs a handful of numbers.
+    """
+    filters = result['filters']
+    dimension = filters['dimension']
+    group_index = {}
+    groups = {'id': [], 'name': []}
+    data = {'period': [], 'seconds': [], 'entries': [], 'amount': []}
+    if dimension:
+        data['group'] = []
+
+    for row in result['rows']:
+        data['period'].append(row['period'])
+        data['seconds'].append(row['seconds'])
+        data['entries'].append(row['entries'])
+        data['amount'].append(str(row['amount']))
+        if dimension:
+            key = row[f'{dimension}_id']
+            if key not in group_index:
+                group_index[key] = len(groups['id'])
+                groups['id'].append(key)
+                groups['name'].append(row[dimension])
+            data['group'].append(group_index[key])
+
+    payload = {
+        'period': filters['period'],
+        'group_by': dimension,
+        'timezone': str(get_workspace_timezone()),
+        'date_from': filters['date_from'],
+        'date_to': filters['date_to'],
+        'data': data,
+        'totals': {
+            'seconds': result['totals']['seconds'],
+            'entries': result['totals']['entries'],
+            'amount': str(result['totals']['amount']),
+        },
+    }
+    if dimension:
+        payload['groups'] = groups
+    return payload
+
+
+def time_summary(query):
+    """Return (payload, cached) for summary query parameters; raises ReportError"""
+    result, cached = run_report(summary_spec(query))
+    return columnar(result), cached
@@ -1,3 +1,291 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import QueryDict
 from django.test import TestCase
+from django.urls import reverse
+from core.models import Client, Workspace
+from core.workspace import get_workspace_timezone
+from projects.models import Project, Task
+from reporting import analytics
+from reporting.engine import ReportError, normalize_filters, run_report
+from reporting.heatmap import activity_heatmap
+from reporting.models import SavedReport
+from timetracker.exports import ExportFilters
+from timetracker.models import TimeEntry
+from timetracker.rollups import add_to_rollups, apply_rollup_change, entry_contribution
 
-# Create your tests here.
+
+class ReportEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        cls.acme = Client.objects.create(workspace=workspace, name="Acme")
+        cls.globex = Client.objects.create(workspace=workspace, name="Globex")
+        cls.website = Project.objects.create(client=cls.acme, name="Website")
+        cls.design = Task.objects.create(project=cls.website, name="Design")
+        cls.app = Project.objects.create(client=cls.globex, name="App")
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def setUp(self):
+        cache.clear()
+
+    def entry(self, project, start, minutes, rate=60, **fields):
+        entry = TimeEntry.objects.create(
+            project=project, start_time=start, end_time=start + timedelta(minutes=minutes), hourly_rate=rate, **fields
+        )
+        add_to_rollups(entry)
+        return entry
+
+    def test_normalize_filters(self):
+        self.assertEqual(
+            normalize_filters({'projects': ['3', 1, 3], 'billable': 'yes', 'group_by': 'project, month'}),
+            normalize_filters({'projects': [1, 3], 'billable': True, 'group_by': ['month', 'project']}),
+        )
+        for spec in ({'group_by': ['day', 'week']}, {'group_by': 'hour'}, {'date_from': '2025-13-01'},
+                     {'date_from': '2025-02-02', 'date_to': '2025-02-01'}, {'clients': 'acme'}, []):
+            with self.subTest(spec=spec), self.assertRaises(ReportError):
+                normalize_filters(spec)
+
+    def test_groups_by_period_and_dimension(self):
+        # 2025-02-03 is a Monday; 23:30 UTC on Feb 9 is already Feb 10 in Berlin
+        monday = datetime(2025, 2, 3, 9, tzinfo=dt_timezone.utc)
+        self.entry(self.website, monday, 60, task=self.design)
+        self.entry(self.website, monday + timedelta(days=1), 30, billable=False)
+        self.entry(self.app, datetime(2025, 2, 9, 23, 30, tzinfo=dt_timezone.utc), 90, rate=100)
+        self.entry(self.app, datetime(2025, 3, 1, 9, tzinfo=dt_timezone.utc), 60)
+
+        february = {'date_from': '2025-02-01', 'date_to': '2025-02-28'}
+        result, _ = run_report({**february, 'group_by': ['week', 'client']})
+        self.assertEqual(result['columns'], ['period', 'client', 'hours', 'entries', 'amount'])
+        self.assertEqual(
+            [(row['period'], row['client'], row['hours'], row['entries'], row['amount']) for row in result['rows']],
+            [('2025-02-03', 'Acme', 1.5, 2, Decimal('60.00')), ('2025-02-10', 'Globex', 1.5, 1, Decimal('150.00'))],
+        )
+        self.assertEqual(result['totals']['hours'], 3)
+        self.assertEqual(result['totals']['amount'], Decimal('210.00'))
+
+        result, _ = run_report({'clients': [self.acme.pk], 'billable': True, 'group_by': ['task']})
+        self.assertEqual([(row['task'], row['hours']) for row in result['rows']], [('Design', 1)])
+        result, _ = run_report({'billable': False})
+        self.assertEqual([(row['hours'], row['entries'], row['amount']) for row in result['rows']], [(0.5, 1, Decimal('0.00'))])
+        result, _ = run_report({'group_by': 'month'})
+        self.assertEqual([(row['period'], row['entries']) for row in result['rows']], [('2025-02-01', 3), ('2025-03-01', 1)])
+
+    def test_cached_until_time_changes(self):
+        start = datetime(2025, 2, 3, 9, tzinfo=dt_timezone.utc)
+        entry = self.entry(self.website, start, 60)
+        spec = {'group_by': ['project'], 'projects': [self.website.pk]}
+        get_workspace_timezone()
+
+        # The aggregate and the project names
+        with self.assertNumQueries(2):
+            result, cached = run_report(spec)
+        self.assertFalse(cached)
+        with self.assertNumQueries(0):
+            repeat, cached = run_report({'projects': [str(self.website.pk)], 'group_by': 'project'})
+        self.assertTrue(cached)
+        self.assertEqual(repeat, result)
+
+        previous = entry_contribution(entry)
+        entry.end_time = start + timedelta(minutes=90)
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+            apply_rollup_change(previous, entry_contribution(entry))
+        result, cached = run_report(spec)
+        self.assertFalse(cached)
+        self.assertEqual(result['rows'][0]['hours'], 1.5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.filter(pk=self.website.pk).get().save()
+        self.assertFalse(run_report(spec)[1])
+
+    def test_views(self):
+        self.entry(self.website, datetime(2025, 2, 3, 9, tzinfo=dt_timezone.utc), 45)
+        report = SavedReport.objects.create(name="By project", filters_json={'group_by': ['project']})
+        broken = SavedReport.objects.create(name="Broken", filters_json={'group_by': ['hour']})
+        self.client.force_login(self.admin)
+
+        response = self.client.get(reverse('report_list'))
+        self.assertContains(response, "By project")
+        response = self.client.get(reverse('report_detail', args=[report.pk]))
+        self.assertEqual(response.context['table'], [['Website', 0.75, 1, Decimal('45.00')]])
+        self.assertContains(response, "Website")
+
+        data = self.client.get(reverse('report_data', args=[report.pk, 'json'])).json()
+        self.assertTrue(data['cached'])
+        self.assertEqual(data['rows'][0]['project_id'], self.website.pk)
+        self.assertEqual(data['totals']['amount'], '45.00')
+        response = self.client.get(reverse('report_data', args=[report.pk, 'csv']))
+        self.assertEqual(response.content.decode().splitlines(), ['project,hours,entries,amount', 'Website,0.75,1,45.00'])
+
+        self.assertEqual(self.client.get(reverse('report_data', args=[report.pk, 'xml'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('report_data', args=[broken.pk, 'json'])).status_code, 400)
+        self.assertEqual(self.client.get(reverse('report_detail', args=[broken.pk])).status_code, 400)
+
+    def test_summary_api(self):
+        # Sunday 2025-02-16 belongs to the week of Monday 2025-02-10
+        self.entry(self.website, datetime(2025, 2, 16, 9, tzinfo=dt_timezone.utc), 60, task=self.design)
+        self.entry(self.app, datetime(2025, 2, 9, 23, 30, tzinfo=dt_timezone.utc), 30)
+        self.entry(self.website, datetime(2025, 2, 11, 9, tzinfo=dt_timezone.utc), 30)
+        self.client.force_login(self.admin)
+        url = reverse('summary_api')
+
+        data = self.client.get(url, {'period': 'week', 'group_by': 'project', 'date_from': '2025-02-01'}).json()
+        self.assertEqual(data['timezone'], 'Europe/Berlin')
+        self.assertEqual(data['groups'], {'id': [self.website.pk, self.app.pk], 'name': ['Website', 'App']})
+        self.assertEqual(data['data'], {
+            'period': ['2025-02-10', '2025-02-10'], 'group': [0, 1],
+            'seconds': [5400, 1800], 'entries': [2, 1], 'amount': ['90.00', '30.00'],
+        })
+        self.assertEqual(data['totals'], {'seconds': 7200, 'entries': 3, 'amount': '120.00'})
+
+        data = self.client.get(url, {'period': 'month', 'project': self.website.pk}).json()
+        self.assertNotIn('groups', data)
+        self.assertEqual((data['data']['period'], data['data']['seconds']), (['2025-02-01'], [5400]))
+        self.assertTrue(self.client.get(url, {'period': 'month', 'project': self.website.pk}).json()['cached'])
+
+        for query in ({'period': 'project'}, {'group_by': 'week'}, {'client': 'acme'}):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(url, query).status_code, 400)
+
+
+@skipUnless(analytics.np is not None, "NumPy is not installed")
+class AnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        cls.acme = Client.objects.create(workspace=workspace, name="Acme")
+        cls.globex = Client.objects.create(workspace=workspace, name="Globex")
+        cls.website = Project.objects.create(client=cls.acme, name="Website")
+        cls.app = Project.objects.create(client=cls.globex, name="App")
+        cls.design = Task.objects.create(project=cls.website, name="Design", estimated_minutes=120)
+        cls.build = Task.objects.create(project=cls.app, name="Build", estimated_minutes=60)
+        Task.objects.create(project=cls.app, name="Untouched", estimated_minutes=30)
+
+        def entry(project, start, minutes, **fields):
+            return TimeEntry.objects.create(
+                project=project, start_time=start, end_time=start + timedelta(minutes=minutes), hourly_rate=50, **fields
+            )
+
+        # Week of Monday 2025-02-03, then 23:30 UTC on Sunday Feb 9 is Monday Feb 10 in Berlin
+        cls.first = entry(cls.website, datetime(2025, 2, 3, 9, tzinfo=dt_timezone.utc), 60, task=cls.design)
+        entry(cls.website, datetime(2025, 2, 4, 9, tzinfo=dt_timezone.utc), 30, billable=False)
+        entry(cls.app, datetime(2025, 2, 9, 23, 30, tzinfo=dt_timezone.utc), 90, task=cls.build)
+        # Two weeks later, after a week without time
+        entry(cls.website, datetime(2025, 2, 25, 9, tzinfo=dt_timezone.utc), 120, task=cls.design)
+        entry(cls.website, datetime(2025, 2, 26, 9, tzinfo=dt_timezone.utc), 60, deleted=True)
+        TimeEntry.objects.create(project=cls.app, start_time=datetime(2025, 2, 27, 9, tzinfo=dt_timezone.utc))
+
+    def test_load_entries_in_chunks(self):
+        arrays = analytics.load_entries(chunk_size=2)
+        self.assertEqual(len(arrays), 4)
+        self.assertEqual(arrays.start[0], int(self.first.start_time.timestamp()))
+        self.assertEqual(arrays.seconds.tolist(), [3600, 1800, 5400, 7200])
+        self.assertEqual(arrays.task.tolist(), [self.design.pk, -1, self.build.pk, self.design.pk])
+        self.assertEqual(arrays.billable.tolist(), [True, False, True, True])
+        self.assertEqual(arrays.rate.tolist(), [50.0] * 4)
+
+        filtered = analytics.load_entries(ExportFilters(date_from='2025-02-10', client=self.acme.pk))
+        self.assertEqual(filtered.seconds.tolist(), [7200])
+
+    def test_metrics(self):
+        arrays = analytics.load_entries()
+        utilization = analytics.weekly_utilization(arrays, group='client')
+        self.assertEqual([str(week) for week in utilization['week']], ['2025-02-03', '2025-02-10', '2025-02-24'])
+        self.assertEqual(utilization['client'].tolist(), [self.acme.pk, self.globex.pk, self.acme.pk])
+        self.assertEqual(utilization['tracked_hours'].tolist(), [1.5, 1.5, 2])
+        self.assertAlmostEqual(utilization['utilization'][0], 2 / 3)
+        capacity = analytics.weekly_utilization(arrays, group='project', capacity_hours=4)
+        self.assertEqual(capacity['utilization'].tolist(), [0.375, 0.375, 0.5])
+
+        accuracy = analytics.estimate_accuracy(arrays)
+        self.assertEqual(accuracy['task'].tolist(), [self.design.pk, self.build.pk])
+        self.assertEqual(accuracy['ratio'].tolist(), [1.5, 1.5])
+        self.assertEqual(accuracy['histogram']['counts'].tolist(), [0, 0, 0, 0, 0, 2, 0])
+        self.assertEqual(accuracy['percentiles'][50], 1.5)
+
+        rolling = analytics.rolling_weekly_hours(arrays, window=2)
+        self.assertEqual([str(week) for week in rolling['week']], ['2025-02-03', '2025-02-10', '2025-02-17', '2025-02-24'])
+        self.assertEqual(rolling['hours'].tolist(), [1.5, 1.5, 0, 2])
+        self.assertEqual(rolling['average'].tolist(), [1.5, 1.5, 0.75, 1])
+        by_project = analytics.rolling_weekly_hours(arrays, window=4, group='project')
+        self.assertEqual(by_project['project'].tolist(), [self.website.pk, self.app.pk])
+        self.assertEqual(by_project['hours'].tolist(), [[1.5, 0, 0, 2], [0, 1.5, 0, 0]])
+        self.assertEqual(by_project['average'][0].tolist(), [1.5, 0.75, 0.5, 0.875])
+
+
+@skipUnless(analytics.np is not None, "NumPy is not installed")
+class HeatmapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        cls.website = Project.objects.create(client=Client.objects.create(workspace=workspace, name="Acme"), name="Website")
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def setUp(self):
+        cache.clear()
+
+    def entry(self, start, minutes):
+        entry = TimeEntry.objects.create(project=self.website, start_time=start, end_time=start + timedelta(minutes=minutes))
+        add_to_rollups(entry)
+        return entry
+
+    def test_splits_across_midnight_and_range_start(self):
+        # Sunday 23:30 to Monday 01:00 in Berlin
+        self.entry(datetime(2025, 2, 9, 22, 30, tzinfo=dt_timezone.utc), 90)
+        # Starts an hour before the range, on Sunday Feb 2 in Berlin
+        self.entry(datetime(2025, 2, 2, 22, tzinfo=dt_timezone.utc), 120)
+        payload, cached = activity_heatmap(QueryDict('date_from=2025-02-03&date_to=2025-02-16'))
+        self.assertFalse(cached)
+        self.assertEqual(payload['seconds'][6][23], 1800)
+        self.assertEqual(payload['seconds'][0][0], 3600 + 3600)
+        self.assertEqual(payload['totals']['seconds'], 9000)
+        self.assertEqual(payload['totals']['weekday'], [7200, 0, 0, 0, 0, 0, 1800])
+
+    def test_splits_across_dst_change(self):
+        # 01:30 CET to 04:00 CEST on 2025-03-30: 02:00 to 03:00 never happens
+        self.entry(datetime(2025, 3, 30, 0, 30, tzinfo=dt_timezone.utc), 90)
+        payload, _ = activity_heatmap(QueryDict('date_from=2025-03-24&date_to=2025-03-30'))
+        self.assertEqual(payload['seconds'][6][:5], [0, 1800, 0, 3600, 0])
+        self.assertEqual(payload['totals']['seconds'], 5400)
+
+    def test_cached_until_entries_in_range_change(self):
+        entry = self.entry(datetime(2025, 2, 4, 9, tzinfo=dt_timezone.utc), 60)
+        query = QueryDict('date_from=2025-02-01&date_to=2025-02-28')
+        activity_heatmap(query)
+        with self.assertNumQueries(0):
+            payload, cached = activity_heatmap(query)
+        self.assertTrue(cached)
+        self.assertEqual(payload['seconds'][1][10], 3600)
+
+        # Another month leaves February alone
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry(datetime(2025, 4, 1, 9, tzinfo=dt_timezone.utc), 60)
+        self.assertTrue(activity_heatmap(query)[1])
+
+        # Moving an entry within its day changes no rollup but does change the heatmap
+        previous = entry_contribution(entry)
+        entry.start_time += timedelta(hours=3)
+        entry.end_time += timedelta(hours=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+            apply_rollup_change(previous, entry_contribution(entry))
+        payload, cached = activity_heatmap(query)
+        self.assertFalse(cached)
+        self.assertEqual(payload['seconds'][1][10], 0)
+        self.assertEqual(payload['seconds'][1][13], 3600)
+
+    def test_heatmap_api(self):
+        self.entry(datetime(2025, 2, 4, 9, tzinfo=dt_timezone.utc), 60)
+        self.client.force_login(self.admin)
+        url = reverse('heatmap_api')
+        response = self.client.get(url, {'date_from': '2025-02-01', 'date_to': '2025-02-28', 'project': self.website.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['seconds'][1][10], 3600)
+        for query in ({'date_from': '2025-02-28', 'date_to': '2025-02-01'}, {'date_from': '2024-01-01', 'date_to': '2025-02-01'},
+                      {'billable': 'maybe'}):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(url, query).status_code, 400)
@@ -0,0 +1,11 @@
+# reporting/urls.py
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.report_list, name='report_list'),
+    path('summary.json', views.summary_api, name='summary_api'),
+    path('heatmap.json', views.heatmap_api, name='heatmap_api'),
+    path('<int:report_id>/', views.report_detail, name='report_detail'),
+    path('<int:report_id>.<str:fmt>', views.report_data, name='report_data'),
+]
@@ -1,3 +1,83 @@
-from django.shortcuts import render
+# reporting/views.py
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils.timezone import now
+from timetracker.exports import render_rows
+from reporting.engine import ReportError, run_report
+from reporting.heatmap import activity_heatmap
+from reporting.models import SavedReport
+from reporting.summary import time_summary
 
-# Create your views here.
+FORMATS = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
+
+
+@staff_member_required
+def report_list(request):
+    """List the saved reports"""
+    return render(request, 'reporting/report_list.html', {
+        'reports': SavedReport.objects.order_by('name'),
+    })
+
+
+@staff_member_required
+def report_detail(request, report_id):
+    """Show a saved report as a table"""
+    report = get_object_or_404(SavedReport, pk=report_id)
+    try:
+        result, cached = run_report(report.filters_json or {})
+    except ReportError as error:
+        return render(request, 'reporting/report_detail.html', {'report': report, 'error': str(error)}, status=400)
+
+    return render(request, 'reporting/report_detail.html', {
+        'report': report,
+        'result': result,
+        'table': [[row[column] for column in result['columns']] for row in result['rows']],
+        'cached': cached,
+    })
+
+
+@staff_member_required
+def report_data(request, report_id, fmt):
+    """Serve a saved report as JSON or CSV"""
+    if fmt not in FORMATS:
+        raise Http404(f"Unknown report format {fmt}")
+    report = get_object_or_404(SavedReport, pk=report_id)
+    try:
+        result, cached = run_report(report.filters_json or {})
+    except ReportError as error:
+        return HttpResponseBadRequest(str(error))
+
+    if fmt == 'json':
+        return JsonResponse({'report': report.name, 'cached': cached, **result}, encoder=DjangoJSONEncoder)
+
+    response = HttpResponse(render_rows(result['rows'], result['columns'], 'csv'), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="report-{report.pk}-{now():%Y%m%d-%H%M%S}.csv"'
+    return response
+
+
+@staff_member_required
+def summary_api(request):
+    """Tracked time by day, week or month, optionally grouped, as columnar JSON"""
+    try:
+        payload, cached = time_summary(request.GET)
+    except ReportError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'cached': cached, **payload})
+
+
+@staff_member_required
+def heatmap_api(request):
+    """Tracked time per hour of the week over a date range, as JSON"""
+    try:
+        payload, cached = activity_heatmap(request.GET)
+    except ReportError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    except ImproperlyConfigured as error:
+        return JsonResponse({'error': str(error)}, status=501)
+    return JsonResponse({'cached': cached, **payload})
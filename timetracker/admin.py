@@ -1,18 +1,99 @@
 # timetracker/admin.py
+import json
 from django.contrib import admin
-from .models import TimeEntry, TimeEntryAuditLog
+from django.utils.html import format_html
+from .archive import get_archived
+from .audit import get_actor_choices
+from .models import DailyTimeRollup, TimeEntry, TimeEntryAuditLog
+from .rollups import apply_rollup_change, entry_contribution, remove_from_rollups
+
+
+class DurationFilter(admin.SimpleListFilter):
+    title = "duration"
+    parameter_name = "duration"
+
+    # (value, label, min seconds, max seconds)
+    BUCKETS = [
+        ("lt15m", "Under 15 minutes", None, 15 * 60),
+        ("15m-1h", "15 minutes to 1 hour", 15 * 60, 60 * 60),
+        ("1h-4h", "1 to 4 hours", 60 * 60, 4 * 60 * 60),
+        ("gt4h", "Over 4 hours", 4 * 60 * 60, None),
+    ]
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, label, _, _ in self.BUCKETS]
+
+    def queryset(self, request, queryset):
+        for value, _, low, high in self.BUCKETS:
+            if self.value() == value:
+                if low is not None:
+                    queryset = queryset.filter(duration_seconds__gte=low)
+                if high is not None:
+                    queryset = queryset.filter(duration_seconds__lt=high)
+        return queryset
 
 
 @admin.register(TimeEntry)
 class TimeEntryAdmin(admin.ModelAdmin):
     list_display = (
         "id", "project", "task", "start_time", "end_time",
-        "billable", "hourly_rate", "duration_minutes", "deleted"
+        "billable", "hourly_rate", "duration", "deleted"
     )
-    list_filter = ("billable", "deleted", "project", "task", "start_time")
+    list_filter = ("billable", "deleted", DurationFilter, "project", "task", "start_time")
     search_fields = ("project__name", "task__name", "description")
     date_hierarchy = "start_time"
-    readonly_fields = ("deleted_at",)
+    readonly_fields = ("deleted_at", "duration_seconds")
+
+    @admin.display(description="Duration (min)", ordering="duration_seconds")
+    def duration(self, obj):
+        return obj.duration_minutes()
+
+    def save_model(self, request, obj, form, change):
+        # The change view runs in a transaction; lock the row so concurrent saves apply in turn
+        previous = TimeEntry.objects.select_for_update().filter(pk=obj.pk).first() if change else None
+        super().save_model(request, obj, form, change)
+        apply_rollup_change(entry_contribution(previous), entry_contribution(obj))
+
+    def delete_model(self, request, obj):
+        remove_from_rollups(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for entry in queryset:
+            remove_from_rollups(entry)
+        super().delete_queryset(request, queryset)
+
+
+class AuditActionFilter(admin.SimpleListFilter):
+    title = "action"
+    parameter_name = "action"
+
+    def lookups(self, request, model_admin):
+        return get_actor_choices()[1]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(action=self.value())
+        return queryset
+
+
+class AuditUserFilter(admin.SimpleListFilter):
+    title = "user"
+    parameter_name = "user"
+
+    def lookups(self, request, model_admin):
+        return [(str(user.pk), user.username) for user in get_actor_choices()[0]]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+
+def _format_values(values):
+    if values is None:
+        return "-"
+    return format_html("<pre>{}</pre>", json.dumps(values, indent=2, sort_keys=True))
 
 
 @admin.register(TimeEntryAuditLog)
@@ -20,19 +101,61 @@ class TimeEntryAuditLogAdmin(admin.ModelAdmin):
     list_display = (
         "id", "time_entry", "action", "user", "timestamp", "ip_address"
     )
-    list_filter = ("action", "timestamp", "user")
+    list_filter = (AuditActionFilter, "timestamp", AuditUserFilter)
     search_fields = ("time_entry__id", "user__username", "notes", "ip_address")
     date_hierarchy = "timestamp"
     readonly_fields = (
         "time_entry", "action", "user", "timestamp", "ip_address",
-        "user_agent", "session_key", "previous_values", "current_values",
+        "user_agent", "session_key", "changed_fields", "previous_state", "current_state",
         "notes", "created_at"
     )
+    exclude = ("previous_values", "current_values", "snapshot")
+
+    @admin.display(description="changed fields")
+    def changed_fields(self, obj):
+        return ", ".join(obj.get_changed_fields()) or "-"
+
+    @admin.display(description="previous values")
+    def previous_state(self, obj):
+        return _format_values(obj.get_previous_values())
+
+    @admin.display(description="current values")
+    def current_state(self, obj):
+        return _format_values(obj.get_current_values())
+
+    def get_object(self, request, object_id, from_field=None):
+        # Records moved to the archive are still viewable from their old URLs
+        obj = super().get_object(request, object_id, from_field)
+        if obj is None and from_field is None and str(object_id).isdigit():
+            obj = get_archived(int(object_id))
+        return obj
 
     def has_add_permission(self, request):
         # Prevent manual creation of audit logs
         return False
 
+    def has_change_permission(self, request, obj=None):
+        if obj is not None and obj.archived:
+            return False
+        return super().has_change_permission(request, obj)
+
     def has_delete_permission(self, request, obj=None):
         # Prevent deletion of audit logs for integrity
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(DailyTimeRollup)
+class DailyTimeRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "day", "project", "task", "billable", "tracked_seconds", "entry_count", "billable_amount"
+    )
+    list_filter = ("billable", "project", "day")
+    date_hierarchy = "day"
+    list_select_related = ("project", "task")
+
+    def has_add_permission(self, request):
+        # Rollups are derived data, maintained from time entries
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_delete
 
 
 class TimetrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'timetracker'
+
+    def ready(self):
+        from projects.models import Task
+        from timetracker.rollups import merge_task_rollups
+
+        pre_delete.connect(merge_task_rollups, sender=Task, dispatch_uid='timetracker.rollups.merge_task')
@@ -0,0 +1,354 @@
+# timetracker/archive.py
+"""
+Archival of closed months of audit logs into compressed segment files.
+
+Each archived month is written to AUDIT_ARCHIVE_DIR as a gzip compressed JSONL
+segment holding every record with its full before/after values, next to a
+small JSON index describing it (time and id range, and the time entries,
+users and actions it contains). Segments are append-only: archiving late
+records of a month that was already archived adds another numbered segment.
+The index is written last, so a segment without an index is incomplete; its
+records are still live and the segment is replaced on the next run.
+
+Live rows are only deleted once their segment and index are on disk.
+
+Reads walk the segments through their indexes: a page of the audit log only
+decompresses the segments whose time range can hold records for it.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import localtime, make_aware, now
+from core.versions import bump_version, get_version
+from core.workspace import get_workspace_timezone
+from .models import TimeEntryAuditLog
+from .pagination import NEXT
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.index.json'
+
+# Data version of the archive directory, bumped whenever a segment is added
+ARCHIVE_VERSION = 'audit-archive'
+HORIZON_KEY = 'audit-archive:horizon:{}'
+
+
+def get_archive_dir():
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'audit_archive'))
+
+
+def serialize_record(log):
+    """Self-contained representation of a live audit record for a segment"""
+    return {
+        'id': log.id,
+        'time_entry_id': log.time_entry_id,
+        'action': log.action,
+        'user_id': log.user_id,
+        'username': log.user.username if log.user else None,
+        'timestamp': log.timestamp.isoformat(),
+        'ip_address': log.ip_address,
+        'user_agent': log.user_agent,
+        'session_key': log.session_key,
+        'previous_values': log.get_previous_values(),
+        'current_values': log.get_current_values(),
+        'notes': log.notes,
+        'created_at': log.created_at.isoformat(),
+    }
+
+
+def deserialize_record(data):
+    """Rebuild an unsaved, read-only TimeEntryAuditLog from a segment line"""
+    log = TimeEntryAuditLog(
+        id=data['id'],
+        time_entry_id=data['time_entry_id'],
+        action=data['action'],
+        timestamp=parse_datetime(data['timestamp']),
+        ip_address=data['ip_address'],
+        user_agent=data['user_agent'],
+        session_key=data['session_key'],
+        previous_values=data['previous_values'],
+        current_values=data['current_values'],
+        notes=data['notes'],
+        created_at=parse_datetime(data['created_at']),
+    )
+    if data['user_id'] is not None:
+        log.user = User(id=data['user_id'], username=data['username'])
+    log.archived = True
+    return log
+
+
+class Segment:
+    """A complete archive segment and its index"""
+
+    def __init__(self, index_path, index):
+        self.index_path = index_path
+        self.path = index_path.with_name(index['segment'])
+        self.month = index['month']
+        self.start = parse_datetime(index['start'])
+        self.end = parse_datetime(index['end'])
+        self.min_id = index['min_id']
+        self.max_id = index['max_id']
+        self.count = index['count']
+        self.time_entry_ids = set(index['time_entry_ids'])
+        self.user_ids = set(index['user_ids'])
+        self.actions = set(index['actions'])
+
+    def matches(self, action=None, user_id=None, time_entry_id=None, start=None, end=None):
+        """Whether the index allows records matching these filters; end is exclusive"""
+        if action and action not in self.actions:
+            return False
+        if user_id and str(user_id) not in {str(pk) for pk in self.user_ids}:
+            return False
+        if time_entry_id is not None and int(time_entry_id) not in self.time_entry_ids:
+            return False
+        if start is not None and self.end < start:
+            return False
+        if end is not None and self.start >= end:
+            return False
+        return True
+
+    def read(self):
+        """Yield the raw records of the segment"""
+        with gzip.open(self.path, 'rt', encoding='utf-8') as segment:
+            for line in segment:
+                yield json.loads(line)
+
+    def records(self):
+        for data in self.read():
+            yield deserialize_record(data)
+
+    def matching(self, action=None, user_id=None, time_entry_id=None, start=None, end=None):
+        """Yield the segment's records matching the filters; end is exclusive"""
+        for log in self.records():
+            if action and log.action != action:
+                continue
+            if user_id and str(log.user_id) != str(user_id):
+                continue
+            if time_entry_id is not None and log.time_entry_id != int(time_entry_id):
+                continue
+            if (start is not None and log.timestamp < start) or (end is not None and log.timestamp >= end):
+                continue
+            yield log
+
+
+def list_segments():
+    """Complete segments, oldest month first"""
+    directory = get_archive_dir()
+    if not directory.is_dir():
+        return []
+    segments = []
+    for index_path in sorted(directory.glob(f'*{INDEX_SUFFIX}')):
+        with open(index_path, encoding='utf-8') as index_file:
+            segments.append(Segment(index_path, json.load(index_file)))
+    return segments
+
+
+def archive_horizon():
+    """
+    Latest archived timestamp, or None when nothing is archived. Cached until
+    the next segment is written, so requests do not read every index.
+    """
+    key = HORIZON_KEY.format(get_version(ARCHIVE_VERSION))
+    cached = cache.get(key)
+    if cached is None:
+        # Wrapped in a list, so an empty archive is cached too
+        cached = [max((segment.end for segment in list_segments()), default=None)]
+        cache.set(key, cached, None)
+    return cached[0]
+
+
+def read_archived(action=None, user_id=None, time_entry_id=None, start=None, end=None):
+    """Yield archived records matching the filters; end is exclusive"""
+    for segment in list_segments():
+        if segment.matches(action, user_id, time_entry_id, start, end):
+            yield from segment.matching(action, user_id, time_entry_id, start, end)
+
+
+def get_archived(pk):
+    """Return the archived record with this id, or None"""
+    for segment in list_segments():
+        if segment.min_id <= pk <= segment.max_id:
+            for data in segment.read():
+                if data['id'] == pk:
+                    return deserialize_record(data)
+    return None
+
+
+def archive_source(**filters):
+    """
+    A keyset_paginate() source reading through to archived records.
+
+    Segments are walked from the cursor outwards (newest first, or oldest
+    first for previous pages) using the time ranges in their indexes, and
+    the walk stops once `limit` records past the cursor are collected and no
+    remaining segment can hold a record closer to it.
+    """
+    def source(position, limit):
+        direction, value, pk = position or (NEXT, None, None)
+        older = direction == NEXT
+
+        def past_cursor(log):
+            if value is None:
+                return True
+            return (log.timestamp, log.pk) < (value, pk) if older else (log.timestamp, log.pk) > (value, pk)
+
+        segments = [segment for segment in list_segments() if segment.matches(**filters)]
+        if value is not None:
+            segments = [segment for segment in segments if (segment.start <= value if older else segment.end >= value)]
+        segments.sort(key=lambda segment: segment.end if older else segment.start, reverse=older)
+
+        found = []
+        for segment in segments:
+            if len(found) >= limit:
+                boundary = found[-1].timestamp
+                if (segment.end < boundary) if older else (segment.start > boundary):
+                    break
+            found.extend(log for log in segment.matching(**filters) if past_cursor(log))
+            found.sort(key=lambda log: (log.timestamp, log.pk), reverse=older)
+            del found[limit:]
+        return found
+
+    return source
+
+
+def month_start(year, month):
+    """Start of a calendar month in the workspace timezone"""
+    if month > 12:
+        year, month = year + 1, 1
+    return make_aware(datetime(year, month, 1), get_workspace_timezone())
+
+
+def _write_atomic(path, write):
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'wb') as output:
+        write(output)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temporary, path)
+
+
+def _delete_live(ids, chunk_size):
+    """
+    Delete archived live rows, newest first and chunk_size rows per transaction.
+
+    Deltas always have higher ids than their snapshot, so by the time a
+    snapshot is deleted the only rows still pointing at it are live ones from
+    outside the archived set; they are expanded into full records first.
+    """
+    deleted = 0
+    ids = sorted(ids, reverse=True)
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset:offset + chunk_size]
+        with transaction.atomic():
+            dependants = list(
+                TimeEntryAuditLog.objects.filter(snapshot_id__in=chunk).exclude(id__in=chunk).select_related('snapshot')
+            )
+            for log in dependants:
+                log.current_values = log.get_current_values()
+                log.snapshot = None
+            TimeEntryAuditLog.objects.bulk_update(dependants, ['current_values', 'snapshot'])
+            deleted += TimeEntryAuditLog.objects.filter(id__in=chunk).delete()[0]
+    return deleted
+
+
+def archive_month(start, end, label, chunk_size=2000):
+    """
+    Archive the live records with start <= timestamp < end into a new segment.
+
+    Records already present in an earlier segment of the month (left behind
+    by an interrupted run) are only deleted. Returns a (records_archived,
+    segment_path, records_deleted) tuple; segment_path is None when no new
+    segment was needed.
+    """
+    live = TimeEntryAuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if not live.exists():
+        return 0, None, 0
+
+    directory = get_archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    existing = [segment for segment in list_segments() if segment.month == label]
+    already_archived = {data['id'] for segment in existing for data in segment.read()}
+
+    name = f'audit-{label}-{len(existing) + 1:04d}'
+    segment_path = directory / f'{name}{SEGMENT_SUFFIX}'
+    index_path = directory / f'{name}{INDEX_SUFFIX}'
+
+    archived_ids = []
+    index = {
+        'segment': segment_path.name, 'month': label, 'start': None, 'end': None,
+        'min_id': None, 'max_id': None, 'count': 0,
+        'time_entry_ids': set(), 'user_ids': set(), 'actions': set(),
+    }
+
+    def write_segment(output):
+        last_pk = 0
+        with gzip.GzipFile(fileobj=output, mode='wb') as segment:
+            while True:
+                chunk = list(
+                    live.filter(pk__gt=last_pk).select_related('user', 'snapshot').order_by('pk')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                for log in chunk:
+                    if log.pk in already_archived:
+                        continue
+                    segment.write((json.dumps(serialize_record(log)) + '\n').encode('utf-8'))
+                    archived_ids.append(log.pk)
+                    if index['start'] is None or log.timestamp < index['start']:
+                        index['start'] = log.timestamp
+                    if index['end'] is None or log.timestamp > index['end']:
+                        index['end'] = log.timestamp
+                    index['time_entry_ids'].add(log.time_entry_id)
+                    index['user_ids'].add(log.user_id)
+                    index['actions'].add(log.action)
+                last_pk = chunk[-1].pk
+
+    _write_atomic(segment_path, write_segment)
+    if archived_ids:
+        index.update(
+            start=index['start'].isoformat(), end=index['end'].isoformat(),
+            min_id=min(archived_ids), max_id=max(archived_ids), count=len(archived_ids),
+            time_entry_ids=sorted(index['time_entry_ids']),
+            user_ids=sorted(index['user_ids'], key=lambda pk: (pk is not None, pk or 0)),
+            actions=sorted(index['actions']),
+        )
+        _write_atomic(index_path, lambda output: output.write(json.dumps(index, indent=2).encode('utf-8')))
+        bump_version(ARCHIVE_VERSION)
+    else:
+        segment_path.unlink()
+        segment_path = None
+
+    leftovers = set(live.filter(pk__in=already_archived).values_list('pk', flat=True)) if already_archived else set()
+    deleted = _delete_live([*archived_ids, *leftovers], chunk_size)
+    return len(archived_ids), segment_path, deleted
+
+
+def closed_months(keep_months=0):
+    """
+    Yield (start, end, 'YYYY-MM') for every month with live audit records
+    that ended before the current month, less the `keep_months` most recent.
+    """
+    oldest = TimeEntryAuditLog.objects.aggregate(oldest=Min('timestamp'))['oldest']
+    if oldest is None:
+        return
+    tz = get_workspace_timezone()
+    current = localtime(now(), tz)
+    total_months = current.year * 12 + current.month - 1 - keep_months
+    cutoff = month_start(total_months // 12, total_months % 12 + 1)
+
+    first = localtime(oldest, tz)
+    year, month = first.year, first.month
+    start = month_start(year, month)
+    while start < cutoff:
+        end = month_start(year, month + 1)
+        yield start, end, f'{year:04d}-{month:02d}'
+        year, month = end.year, end.month
+        start = end
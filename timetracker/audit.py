@@ -0,0 +1,554 @@
+# timetracker/audit.py
+"""
+Pluggable sinks that persist TimeEntryAuditLog records.
+
+The sink is chosen with the AUDIT_LOG_MODE setting:
+
+    'sync'       - every record is inserted immediately (the default)
+    'on_commit'  - records are queued and bulk inserted when the surrounding
+                   transaction commits (immediately outside a transaction)
+    'buffered'   - records are queued in memory and bulk inserted by a
+                   background thread once AUDIT_LOG_BATCH_SIZE records are
+                   waiting or AUDIT_LOG_FLUSH_INTERVAL seconds have passed.
+                   Queued records are flushed at interpreter shutdown, but
+                   are lost if the process is killed.
+
+AUDIT_LOG_STORAGE controls how the before/after values are stored:
+
+    'compact'    - each record keeps only the fields that differ from the
+                   latest full snapshot of its time entry, and its previous
+                   values only keep the fields the action changed. A record
+                   becomes a new full snapshot once the current one has
+                   AUDIT_LOG_SNAPSHOT_INTERVAL deltas (the default)
+    'full'       - every record stores complete copies of both states
+
+Either way, TimeEntryAuditLog.get_current_values() and get_previous_values()
+return the full states.
+"""
+import atexit
+import json
+import logging
+import threading
+import weakref
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import AuditLogActor, TimeEntry, TimeEntryAuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_SNAPSHOT_INTERVAL = 20
+
+STORAGE_MODES = ('compact', 'full')
+
+_MISSING = object()
+
+
+def get_storage_mode():
+    mode = getattr(settings, 'AUDIT_LOG_STORAGE', 'compact')
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown AUDIT_LOG_STORAGE {mode!r}; expected one of {list(STORAGE_MODES)}")
+    return mode
+
+
+def get_snapshot_interval():
+    return getattr(settings, 'AUDIT_LOG_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL)
+
+
+def diff_values(base, values):
+    """Return the items of `values` that are missing from or differ in `base`"""
+    return {field: value for field, value in values.items() if base.get(field, _MISSING) != value}
+
+
+def compact_records(records, snapshot_interval=None):
+    """
+    Reduce unsaved audit records to compact form, in place.
+
+    The latest snapshot of every time entry involved is fetched with a single
+    query. Records are processed in order, so a record may use an earlier
+    record of the same batch as its snapshot; bulk_insert() inserts such
+    snapshots first.
+    """
+    if snapshot_interval is None:
+        snapshot_interval = get_snapshot_interval()
+
+    entry_ids = {record.time_entry_id for record in records if record.current_values is not None}
+    bases = {}
+    if entry_ids:
+        latest_snapshot = TimeEntryAuditLog.objects.filter(
+            time_entry_id=OuterRef('time_entry_id'), snapshot__isnull=True, current_values__isnull=False,
+        ).order_by('-id').values('id')[:1]
+        snapshots = (
+            TimeEntryAuditLog.objects
+            .filter(time_entry_id__in=entry_ids, id=Subquery(latest_snapshot))
+            .only('id', 'time_entry_id', 'current_values')
+            .annotate(delta_count=Count('deltas'))
+        )
+        for snapshot in snapshots:
+            bases[snapshot.time_entry_id] = [snapshot, snapshot.delta_count]
+
+    for record in records:
+        current = record.current_values
+        if current is None:
+            continue
+        if record.previous_values is not None:
+            record.previous_values = diff_values(current, record.previous_values)
+
+        base = bases.get(record.time_entry_id)
+        if base is None or base[1] >= snapshot_interval:
+            bases[record.time_entry_id] = [record, 0]
+        else:
+            record.snapshot = base[0]
+            record.current_values = diff_values(base[0].current_values, current)
+            base[1] += 1
+    return records
+
+
+# (user_id, action) pairs known to be committed to the AuditLogActor table
+_known_actors = set()
+_actors_lock = threading.Lock()
+
+
+def _remember_actors(pairs):
+    with _actors_lock:
+        _known_actors.update(pairs)
+
+
+def clear_actor_cache(**kwargs):
+    with _actors_lock:
+        _known_actors.clear()
+
+
+def record_actors(records):
+    """
+    Add the (user, action) pairs of written records to the actor index.
+
+    Pairs already known to this process cost no query; new ones are inserted
+    with one conflict-ignoring bulk insert.
+    """
+    pairs = {(record.user_id, record.action) for record in records} - _known_actors
+    if not pairs:
+        return
+    AuditLogActor.objects.bulk_create(
+        [AuditLogActor(user_id=user_id, action=action) for user_id, action in pairs],
+        ignore_conflicts=True,
+    )
+    # A rollback would remove the rows again, so only trust committed pairs
+    transaction.on_commit(lambda: _remember_actors(pairs))
+
+
+def get_actor_choices():
+    """
+    Return the users and the (value, label) actions that appear in the audit
+    log, for filter dropdowns. Reads only the small actor index.
+    """
+    users, actions = {}, set()
+    for actor in AuditLogActor.objects.select_related('user'):
+        if actor.user is not None:
+            users[actor.user_id] = actor.user
+        actions.add(actor.action)
+    return (
+        sorted(users.values(), key=lambda user: user.username),
+        [(value, label) for value, label in TimeEntryAuditLog.ACTION_CHOICES if value in actions],
+    )
+
+
+def rebuild_actor_index():
+    """Rebuild the actor index from the live audit log and its archive"""
+    from .archive import list_segments
+
+    pairs = set(TimeEntryAuditLog.objects.values_list('user_id', 'action').distinct())
+    for segment in list_segments():
+        pairs.update((data['user_id'], data['action']) for data in segment.read())
+
+    with transaction.atomic():
+        AuditLogActor.objects.all().delete()
+        AuditLogActor.objects.bulk_create(
+            [AuditLogActor(user_id=user_id, action=action) for user_id, action in pairs]
+        )
+    clear_actor_cache()
+    return len(pairs)
+
+
+def _insert(records, batch_size):
+    snapshot_field = TimeEntryAuditLog._meta.get_field('snapshot')
+    # Deltas whose snapshot is part of this batch are inserted after it
+    pending = [
+        record for record in records
+        if snapshot_field.is_cached(record) and record.snapshot is not None and record.snapshot.pk is None
+    ]
+    pending_ids = {id(record) for record in pending}
+    try:
+        with transaction.atomic():
+            TimeEntryAuditLog.objects.bulk_create(
+                [record for record in records if id(record) not in pending_ids], batch_size=batch_size
+            )
+            if pending:
+                TimeEntryAuditLog.objects.bulk_create(pending, batch_size=batch_size)
+            record_actors(records)
+    except IntegrityError:
+        # Primary keys assigned by the rolled back inserts are void
+        for record in records:
+            record.pk = None
+            record._state.adding = True
+        for record in pending:
+            record.snapshot_id = None
+        raise
+    return records
+
+
+def bulk_insert(records, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert audit records with bulk_create.
+
+    Records whose time entry was deleted before the flush (discarded timers)
+    are dropped, just as the cascade would have removed them.
+    """
+    time_entry_field = TimeEntryAuditLog._meta.get_field('time_entry')
+    records = [
+        record for record in records
+        if not (time_entry_field.is_cached(record) and time_entry_field.get_cached_value(record).pk is None)
+    ]
+    if not records:
+        return []
+    if get_storage_mode() == 'compact':
+        compact_records(records)
+    try:
+        return _insert(records, batch_size)
+    except IntegrityError:
+        existing = set(
+            TimeEntry.objects.filter(pk__in={r.time_entry_id for r in records}).values_list('pk', flat=True)
+        )
+        records = [r for r in records if r.time_entry_id in existing]
+        return _insert(records, batch_size)
+
+
+def _json_size(*values):
+    return sum(len(json.dumps(value)) for value in values if value is not None)
+
+
+def compact_audit_history(chunk_size=500, snapshot_interval=None):
+    """
+    Rewrite stored audit records into compact form.
+
+    Records are processed chunk_size time entries at a time, each chunk in its
+    own transaction; records that are already compact are re-planned too, so
+    the command is safe to run repeatedly. Returns (rows_rewritten,
+    bytes_before, bytes_after), where the sizes are of the JSON encoded values
+    of every record.
+    """
+    if snapshot_interval is None:
+        snapshot_interval = get_snapshot_interval()
+
+    rewritten = bytes_before = bytes_after = 0
+    last_entry = 0
+    while True:
+        entry_ids = list(
+            TimeEntryAuditLog.objects.filter(time_entry_id__gt=last_entry)
+            .order_by('time_entry_id').values_list('time_entry_id', flat=True).distinct()[:chunk_size]
+        )
+        if not entry_ids:
+            break
+
+        logs = TimeEntryAuditLog.objects.filter(time_entry_id__in=entry_ids).order_by('time_entry_id', 'id').only(
+            'id', 'time_entry_id', 'previous_values', 'current_values', 'snapshot'
+        )
+        full_values = {}
+        changed = []
+        entry_id = snapshot = None
+        for log in logs:
+            if log.time_entry_id != entry_id:
+                entry_id, snapshot, deltas = log.time_entry_id, None, 0
+
+            stored = (log.previous_values, log.current_values, log.snapshot_id)
+            bytes_before += _json_size(log.previous_values, log.current_values)
+
+            current = log.current_values
+            if log.snapshot_id is not None and current is not None:
+                current = {**full_values[log.snapshot_id], **current}
+            full_values[log.id] = current
+
+            if current is not None:
+                if log.previous_values is not None:
+                    log.previous_values = diff_values(current, log.previous_values)
+                if snapshot is None or deltas >= snapshot_interval:
+                    snapshot, deltas = log, 0
+                    log.snapshot_id, log.current_values = None, current
+                else:
+                    log.snapshot_id, log.current_values = snapshot.id, diff_values(full_values[snapshot.id], current)
+                    deltas += 1
+
+            bytes_after += _json_size(log.previous_values, log.current_values)
+            if (log.previous_values, log.current_values, log.snapshot_id) != stored:
+                changed.append(log)
+
+        with transaction.atomic():
+            TimeEntryAuditLog.objects.bulk_update(
+                changed, ['previous_values', 'current_values', 'snapshot'], batch_size=DEFAULT_BATCH_SIZE
+            )
+        rewritten += len(changed)
+        last_entry = entry_ids[-1]
+
+    return rewritten, bytes_before, bytes_after
+
+
+def expand_audit_history(chunk_size=2000):
+    """
+    Rewrite compact audit records back into full copies of both states.
+
+    Works through the table in primary key order, chunk_size rows at a time.
+    Returns (rows_rewritten, bytes_before, bytes_after) like
+    compact_audit_history().
+    """
+    rewritten = bytes_before = bytes_after = 0
+    last_pk = 0
+    while True:
+        logs = list(
+            TimeEntryAuditLog.objects.filter(pk__gt=last_pk).select_related('snapshot').order_by('pk').only(
+                'id', 'previous_values', 'current_values', 'snapshot', 'snapshot__current_values'
+            )[:chunk_size]
+        )
+        if not logs:
+            break
+
+        changed = []
+        for log in logs:
+            stored = (log.previous_values, log.current_values, log.snapshot_id)
+            bytes_before += _json_size(log.previous_values, log.current_values)
+
+            if log.snapshot_id is not None and log.current_values is not None:
+                log.current_values = {**log.snapshot.current_values, **log.current_values}
+            log.snapshot = None
+            if log.previous_values is not None and log.current_values is not None:
+                log.previous_values = {**log.current_values, **log.previous_values}
+
+            bytes_after += _json_size(log.previous_values, log.current_values)
+            if (log.previous_values, log.current_values, log.snapshot_id) != stored:
+                changed.append(log)
+
+        with transaction.atomic():
+            TimeEntryAuditLog.objects.bulk_update(
+                changed, ['previous_values', 'current_values', 'snapshot'], batch_size=DEFAULT_BATCH_SIZE
+            )
+        rewritten += len(changed)
+        last_pk = logs[-1].pk
+
+    return rewritten, bytes_before, bytes_after
+
+
+class SyncAuditSink:
+    """Insert each record as soon as it is written"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def write(self, record):
+        if get_storage_mode() == 'compact':
+            compact_records([record])
+        record.save()
+        record_actors([record])
+        return record
+
+    def write_many(self, records):
+        return bulk_insert(records, self.batch_size)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _CommitHook:
+    """Commit hook of the records one savepoint added to a batch"""
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    def __call__(self):
+        self.batch.flush()
+
+
+class _CommitBatch:
+    """
+    A transaction's pending records, inserted by the first of its commit hooks
+    to run.
+
+    Each savepoint adds its records under a hook of its own, and the batch
+    holds the hooks weakly: rolling a savepoint back discards its hook, and
+    the records go with it.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.groups = []
+        self.flushed = False
+
+    def add(self, record):
+        savepoints = tuple(transaction.get_connection().savepoint_ids)
+        if self.groups:
+            hook, group_savepoints, records = self.groups[-1]
+            if group_savepoints == savepoints and hook() is not None:
+                records.append(record)
+                return
+        hook = _CommitHook(self)
+        self.groups.append((weakref.ref(hook), savepoints, [record]))
+        # Outside a transaction the hook runs, and flushes, right away
+        transaction.on_commit(hook)
+
+    def flush(self):
+        if self.flushed:
+            return
+        groups, self.groups = self.groups, []
+        self.flushed = True
+        records = [record for hook, _, group in groups if hook() is not None for record in group]
+        bulk_insert(records, self.batch_size)
+
+
+class OnCommitAuditSink:
+    """Queue records per transaction and bulk insert them when it commits"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._local = threading.local()
+
+    def write(self, record):
+        # Only the commit hooks hold the batch strongly: a rollback discards the
+        # hooks and the batch with them, and a commit flushes it, so either way
+        # the next record starts a new batch
+        batch = self._local.batch() if getattr(self._local, 'batch', None) else None
+        if batch is None or batch.flushed:
+            batch = _CommitBatch(self.batch_size)
+            self._local.batch = weakref.ref(batch)
+        batch.add(record)
+        return record
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+        return records
+
+    def flush(self):
+        # Pending records are written by their transaction's commit hook
+        pass
+
+    def close(self):
+        pass
+
+
+class BufferedAuditSink:
+    """Queue records in memory and bulk insert them from a background thread"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='audit-log-flusher', daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        with self._lock:
+            self._queue.append(record)
+            full = len(self._queue) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return record
+
+    def write_many(self, records):
+        with self._lock:
+            self._queue.extend(records)
+            full = len(self._queue) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return records
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                records, self._queue = self._queue, []
+            try:
+                bulk_insert(records, self.batch_size)
+            except Exception:
+                # Put the records back so the next flush retries them
+                with self._lock:
+                    self._queue[:0] = records
+                raise
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush audit log records")
+
+    def close(self):
+        """Stop the flusher thread and write out anything still queued"""
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+SINKS = {
+    'sync': SyncAuditSink,
+    'on_commit': OnCommitAuditSink,
+    'buffered': BufferedAuditSink,
+}
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink():
+    """Return the process-wide audit sink configured by AUDIT_LOG_MODE"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                mode = getattr(settings, 'AUDIT_LOG_MODE', 'sync')
+                if mode not in SINKS:
+                    raise ValueError(f"Unknown AUDIT_LOG_MODE {mode!r}; expected one of {sorted(SINKS)}")
+                kwargs = {'batch_size': getattr(settings, 'AUDIT_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)}
+                if mode == 'buffered':
+                    kwargs['flush_interval'] = getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+                _sink = SINKS[mode](**kwargs)
+    return _sink
+
+
+def flush_audit_log():
+    """Write out any queued audit records now"""
+    if _sink is not None:
+        _sink.flush()
+
+
+def close_audit_sink():
+    """Flush and discard the current sink; a new one is created on next use"""
+    global _sink
+    with _sink_lock:
+        sink, _sink = _sink, None
+    if sink is not None:
+        sink.close()
+
+
+atexit.register(close_audit_sink)
+
+
+@receiver(setting_changed)
+def _reset_sink(setting, **kwargs):
+    if setting.startswith('AUDIT_LOG_'):
+        close_audit_sink()
+
+
+post_delete.connect(clear_actor_cache, sender=AuditLogActor, dispatch_uid='audit_actor_cache')
@@ -0,0 +1,279 @@
+# timetracker/exports.py
+"""
+Streaming CSV and JSONL exports of time entries and audit logs.
+
+Rows are read with .iterator(chunk_size=...) as plain values, foreign key
+names are resolved once per chunk with one query per related model, and
+output is produced line by line, so memory use does not depend on the size
+of the export. Timestamps are written in the workspace timezone.
+"""
+import csv
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from django.contrib.auth.models import User
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localtime, make_aware
+from core.models import Client
+from core.workspace import get_workspace_timezone
+from projects.models import Project, Task
+from .models import TimeEntry, TimeEntryAuditLog
+from .rollups import entry_amount
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+TIME_ENTRY_COLUMNS = [
+    'id', 'date', 'start_time', 'end_time', 'duration_seconds', 'hours',
+    'client', 'project', 'task', 'description', 'billable', 'hourly_rate', 'amount',
+]
+
+AUDIT_LOG_COLUMNS = [
+    'id', 'timestamp', 'action', 'user', 'time_entry_id', 'project', 'client',
+    'ip_address', 'session_key', 'changed_fields', 'previous_values', 'current_values', 'notes',
+]
+
+
+class ExportFilters:
+    """
+    Date range, project, client and billable filters shared by the export
+    endpoints and commands. Dates are whole days in the workspace timezone.
+    """
+
+    def __init__(self, date_from=None, date_to=None, project=None, client=None, billable=None):
+        self.date_from = self._date(date_from, 'date_from')
+        self.date_to = self._date(date_to, 'date_to')
+        self.project = self._id(project, 'project')
+        self.client = self._id(client, 'client')
+        self.billable = self._bool(billable)
+
+    @classmethod
+    def from_query(cls, data):
+        return cls(**{name: data.get(name) or None for name in ('date_from', 'date_to', 'project', 'client', 'billable')})
+
+    @staticmethod
+    def _date(value, name):
+        if value is None:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValueError(f"{name} must be a valid YYYY-MM-DD date")
+        return day
+
+    @staticmethod
+    def _id(value, name):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an id")
+
+    @staticmethod
+    def _bool(value):
+        if value is None:
+            return None
+        value = str(value).lower()
+        if value in ('1', 'true', 'yes'):
+            return True
+        if value in ('0', 'false', 'no'):
+            return False
+        raise ValueError("billable must be true or false")
+
+    def range(self):
+        """(start, end) datetimes of the date range; end is exclusive, either may be None"""
+        tz = get_workspace_timezone()
+        start = end = None
+        if self.date_from:
+            start = make_aware(datetime.combine(self.date_from, datetime.min.time()), tz)
+        if self.date_to:
+            end = make_aware(datetime.combine(self.date_to + timedelta(days=1), datetime.min.time()), tz)
+        return start, end
+
+    def apply(self, queryset, time_field, entry_prefix=''):
+        """Filter `queryset`; entry_prefix reaches the time entry, e.g. 'time_entry__'"""
+        start, end = self.range()
+        if start:
+            queryset = queryset.filter(**{f'{time_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{time_field}__lt': end})
+        if self.project is not None:
+            queryset = queryset.filter(**{f'{entry_prefix}project_id': self.project})
+        if self.client is not None:
+            queryset = queryset.filter(**{f'{entry_prefix}project__client_id': self.client})
+        if self.billable is not None:
+            queryset = queryset.filter(**{f'{entry_prefix}billable': self.billable})
+        return queryset
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _NameCache:
+    """
+    id -> field value(s) lookups, filled with one query per chunk for the ids
+    not seen yet. Holds one entry per distinct related object, not per row.
+    """
+
+    def __init__(self, queryset, *fields):
+        self.queryset = queryset
+        self.fields = fields or ('name',)
+        self.values = {}
+
+    def load(self, ids):
+        missing = {pk for pk in ids if pk is not None and pk not in self.values}
+        if missing:
+            for pk, *values in self.queryset.filter(pk__in=missing).values_list('pk', *self.fields):
+                self.values[pk] = values[0] if len(values) == 1 else tuple(values)
+
+    def get(self, pk, default=None):
+        return self.values.get(pk, default)
+
+
+def _local(value, tz):
+    return localtime(value, tz).isoformat() if value else None
+
+
+def time_entry_rows(filters, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one dict per live, completed time entry matching `filters`"""
+    entries = filters.apply(
+        TimeEntry.objects.filter(deleted=False, end_time__isnull=False), 'start_time'
+    ).order_by('start_time', 'id').values_list(
+        'id', 'start_time', 'end_time', 'duration_seconds', 'project_id', 'task_id',
+        'description', 'billable', 'hourly_rate',
+    )
+    projects = _NameCache(Project.objects.all(), 'name', 'client_id')
+    clients = _NameCache(Client.objects.all())
+    tasks = _NameCache(Task.objects.all())
+    tz = get_workspace_timezone()
+
+    for chunk in _chunks(entries.iterator(chunk_size=chunk_size), chunk_size):
+        projects.load(row[4] for row in chunk)
+        clients.load(projects.get(row[4], (None, None))[1] for row in chunk)
+        tasks.load(row[5] for row in chunk)
+
+        for pk, start, end, seconds, project_id, task_id, description, billable, rate in chunk:
+            project_name, client_id = projects.get(project_id, (None, None))
+            yield {
+                'id': pk,
+                'date': localtime(start, tz).date().isoformat(),
+                'start_time': _local(start, tz),
+                'end_time': _local(end, tz),
+                'duration_seconds': seconds,
+                'hours': round(seconds / 3600, 4),
+                'client': clients.get(client_id),
+                'project': project_name,
+                'task': tasks.get(task_id),
+                'description': description,
+                'billable': billable,
+                'hourly_rate': rate,
+                'amount': entry_amount(seconds, rate, billable),
+            }
+
+
+def audit_log_rows(filters, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield one dict per live audit record matching `filters`, with the full
+    before/after values. Archived months are not included; their segments
+    already are JSONL exports.
+    """
+    logs = filters.apply(TimeEntryAuditLog.objects.all(), 'timestamp', 'time_entry__').order_by(
+        'timestamp', 'id'
+    ).values_list(
+        'id', 'timestamp', 'action', 'user_id', 'time_entry_id', 'time_entry__project_id',
+        'ip_address', 'session_key', 'previous_values', 'current_values', 'snapshot_id', 'notes',
+    )
+    users = _NameCache(User.objects.all(), 'username')
+    projects = _NameCache(Project.objects.all(), 'name', 'client_id')
+    clients = _NameCache(Client.objects.all())
+    tz = get_workspace_timezone()
+
+    for chunk in _chunks(logs.iterator(chunk_size=chunk_size), chunk_size):
+        users.load(row[3] for row in chunk)
+        projects.load(row[5] for row in chunk)
+        clients.load(projects.get(row[5], (None, None))[1] for row in chunk)
+        # Snapshots are only needed for this chunk, so they are not cached
+        snapshots = dict(
+            TimeEntryAuditLog.objects.filter(pk__in={row[10] for row in chunk if row[10]})
+            .values_list('pk', 'current_values')
+        )
+
+        for (pk, timestamp, action, user_id, entry_id, project_id, ip_address, session_key,
+             previous, current, snapshot_id, notes) in chunk:
+            if snapshot_id and current is not None:
+                current = {**snapshots[snapshot_id], **current}
+            if previous is not None:
+                previous = {**(current or {}), **previous}
+            changed = [field for field, value in (previous or {}).items() if (current or {}).get(field) != value]
+            project_name, client_id = projects.get(project_id, (None, None))
+            yield {
+                'id': pk,
+                'timestamp': _local(timestamp, tz),
+                'action': action,
+                'user': users.get(user_id),
+                'time_entry_id': entry_id,
+                'project': project_name,
+                'client': clients.get(client_id),
+                'ip_address': ip_address,
+                'session_key': session_key,
+                'changed_fields': changed,
+                'previous_values': previous,
+                'current_values': current,
+                'notes': notes,
+            }
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def render_rows(rows, columns, fmt):
+    """Yield the rows as lines of CSV (with a header) or JSONL"""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([
+                json.dumps(row[column], default=_json_default) if isinstance(row[column], (dict, list)) else row[column]
+                for column in columns
+            ])
+    else:
+        for row in rows:
+            yield json.dumps(row, default=_json_default) + '\n'
+
+
+EXPORTS = {
+    'time_entries': (time_entry_rows, TIME_ENTRY_COLUMNS),
+    'audit_logs': (audit_log_rows, AUDIT_LOG_COLUMNS),
+}
+
+
+def export_lines(kind, filters, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the lines of a `kind` export ('time_entries' or 'audit_logs')"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(FORMATS)}")
+    rows, columns = EXPORTS[kind]
+    return render_rows(rows(filters, chunk_size), columns, fmt)
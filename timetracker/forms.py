@@ -1,6 +1,7 @@
 # timetracker/forms.py
 from django import forms
 from .models import TimeEntry
+from .overlaps import validate_no_overlap
 from projects.models import Project, Task
 
 class ManualEntryForm(forms.ModelForm):
@@ -8,6 +9,15 @@ class ManualEntryForm(forms.ModelForm):
         model = TimeEntry
         fields = ['project', 'task', 'description', 'start_time', 'end_time', 'billable', 'hourly_rate']
 
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time, end_time = cleaned_data.get('start_time'), cleaned_data.get('end_time')
+        if start_time and end_time:
+            if end_time <= start_time:
+                raise forms.ValidationError("End time must be after start time.")
+            validate_no_overlap(TimeEntry(pk=self.instance.pk, start_time=start_time, end_time=end_time))
+        return cleaned_data
+
 class StopTimerForm(forms.Form):
     project = forms.ModelChoiceField(
         queryset=Project.objects.filter(archived=False),
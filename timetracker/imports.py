@@ -0,0 +1,292 @@
+# timetracker/imports.py
+"""
+Streaming import of time entries from CSV or JSONL files.
+
+The input uses the columns of the time entry export (client, project, task,
+description, start_time, end_time, billable, hourly_rate; other columns are
+ignored), so an export can be imported back. Rows are read one at a time,
+validated and inserted in batches. Only once every field of a row checks
+out are its client, project and task resolved by name, through an in-memory
+cache, and created when missing. Each chunk of rows is committed in its own
+transaction together with those names, its rollups and CREATE audit
+records, so an interrupted import keeps the chunks before it and rejected
+rows leave nothing behind.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from core.models import Client
+from core.workspace import get_active_workspace, get_workspace_timezone
+from projects.models import Project, Task
+from .models import TimeEntry
+from .rollups import add_many_to_rollups
+from .utils import log_bulk_action
+
+FORMATS = ('csv', 'jsonl')
+
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_CHUNK_SIZE = 20000
+
+NAME_MAX_LENGTH = 100
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message is the rejection reason"""
+
+
+def guess_format(path):
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, row dict) from an open text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            # Rejected by validate() with a reason, like any other bad row
+            yield line_number, row if isinstance(row, dict) else {'__invalid__': line.strip()}
+
+
+def _text(row, name):
+    value = row.get(name)
+    return '' if value is None else str(value).strip()
+
+
+class NameCache:
+    """
+    Name -> object lookups for the clients, projects and tasks of the active
+    workspace. Existing objects are loaded with one query per model up front;
+    names not seen before are created once and then served from the cache.
+    """
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.created = Counter()
+        self.clients = {
+            client.name.casefold(): client for client in Client.objects.filter(workspace=workspace).order_by('-id')
+        }
+        self.projects = {
+            (project.client_id, project.name.casefold()): project
+            for project in Project.objects.filter(client__workspace=workspace).order_by('-id')
+        }
+        self.tasks = {
+            (task.project_id, task.name.casefold()): task
+            for task in Task.objects.filter(project__client__workspace=workspace).order_by('-id')
+        }
+        # Imports without a client column match projects by name alone
+        self.projects_by_name = {}
+        for project in self.projects.values():
+            self.projects_by_name.setdefault(project.name.casefold(), project)
+
+    def client(self, name):
+        key = name.casefold()
+        if key not in self.clients:
+            self.clients[key] = Client.objects.create(workspace=self.workspace, name=name)
+            self.created['clients'] += 1
+        return self.clients[key]
+
+    def project(self, name, client_name=''):
+        if not client_name:
+            project = self.projects_by_name.get(name.casefold())
+            if project is None:
+                raise RowError('unknown project and no client given')
+            return project
+        client = self.client(client_name)
+        key = (client.id, name.casefold())
+        if key not in self.projects:
+            self.projects[key] = Project.objects.create(client=client, name=name)
+            self.projects_by_name.setdefault(name.casefold(), self.projects[key])
+            self.created['projects'] += 1
+        return self.projects[key]
+
+    def task(self, project, name):
+        key = (project.id, name.casefold())
+        if key not in self.tasks:
+            self.tasks[key] = Task.objects.create(project=project, name=name)
+            self.created['tasks'] += 1
+        return self.tasks[key]
+
+
+class TimeEntryImporter:
+    """
+    Validate and insert rows from read_rows(). Call run() with the rows; the
+    counts, rejection reasons and timings are kept on the instance.
+
+    batch_size is the number of rows per bulk_create, and chunk_size the
+    number of rows committed per transaction. on_reject, when given, is called
+    with (line_number, row, reason) for every rejected row.
+    """
+
+    def __init__(self, workspace=None, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                 source='', dry_run=False, on_reject=None, on_chunk=None):
+        self.workspace = workspace or get_active_workspace()
+        if self.workspace is None:
+            raise ValueError("Create a workspace before importing time entries")
+        self.batch_size = batch_size
+        self.chunk_size = max(chunk_size, batch_size)
+        self.source = source
+        self.dry_run = dry_run
+        self.on_reject = on_reject
+        self.on_chunk = on_chunk
+        self.timezone = get_workspace_timezone()
+        self.names = None
+        self.imported = 0
+        self.rejected = 0
+        self.reasons = Counter()
+        self.started = None
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.rejected) / self.elapsed if self.elapsed else 0.0
+
+    def _datetime(self, row, name):
+        value = _text(row, name)
+        if not value:
+            raise RowError(f'missing {name}')
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise RowError(f'invalid {name}')
+        # Naive times are wall-clock times in the workspace timezone, like the export
+        return make_aware(parsed, self.timezone) if is_naive(parsed) else parsed
+
+    @staticmethod
+    def _billable(row):
+        value = _text(row, 'billable').lower()
+        if value in ('', '1', 'true', 'yes'):
+            return True
+        if value in ('0', 'false', 'no'):
+            return False
+        raise RowError('invalid billable')
+
+    @staticmethod
+    def _rate(row):
+        value = _text(row, 'hourly_rate') or '0'
+        try:
+            rate = Decimal(value)
+        except InvalidOperation:
+            raise RowError('invalid hourly_rate')
+        if not rate.is_finite() or rate < 0 or rate >= 10 ** 6:
+            raise RowError('invalid hourly_rate')
+        return rate.quantize(Decimal('0.01'))
+
+    def validate(self, row):
+        """
+        Check every field of a row without writing anything. Return an
+        unsaved TimeEntry and the (client, project, task) names to resolve()
+        for it, or raise RowError.
+        """
+        if '__invalid__' in row:
+            raise RowError('invalid JSON')
+        start_time = self._datetime(row, 'start_time')
+        # Running timers are never imported; the running timer belongs to the tracker
+        end_time = self._datetime(row, 'end_time')
+        if end_time <= start_time:
+            raise RowError('end_time is not after start_time')
+
+        project_name = _text(row, 'project')
+        if not project_name:
+            raise RowError('missing project')
+        for name in ('client', 'project', 'task'):
+            if len(_text(row, name)) > NAME_MAX_LENGTH:
+                raise RowError(f'{name} name is too long')
+
+        entry = TimeEntry(
+            description=_text(row, 'description'),
+            start_time=start_time,
+            end_time=end_time,
+            billable=self._billable(row),
+            hourly_rate=self._rate(row),
+        )
+        # bulk_create bypasses save(), which normally sets the stored duration
+        entry.duration_seconds = entry.compute_duration_seconds()
+        return entry, (_text(row, 'client'), project_name, _text(row, 'task'))
+
+    def resolve(self, entry, names):
+        """Set the project and task of a validated entry, creating missing ones; raises RowError"""
+        client_name, project_name, task_name = names
+        entry.project = self.names.project(project_name, client_name)
+        entry.task = self.names.task(entry.project, task_name) if task_name else None
+
+    def _reject(self, line_number, row, reason):
+        self.rejected += 1
+        self.reasons[reason] += 1
+        if self.on_reject:
+            self.on_reject(line_number, row, reason)
+
+    def _validate_batch(self, rows):
+        accepted = []
+        for line_number, row in rows:
+            try:
+                accepted.append((line_number, row, *self.validate(row)))
+            except RowError as error:
+                self._reject(line_number, row, str(error))
+        return accepted
+
+    def _insert(self, accepted):
+        """Resolve the names of validated rows and insert them in one transaction; return the count"""
+        with transaction.atomic():
+            entries = []
+            for line_number, row, entry, names in accepted:
+                try:
+                    self.resolve(entry, names)
+                except RowError as error:
+                    self._reject(line_number, row, str(error))
+                else:
+                    entries.append(entry)
+            created = TimeEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+            add_many_to_rollups(created)
+            for offset in range(0, len(created), self.batch_size):
+                log_bulk_action(
+                    None, created[offset:offset + self.batch_size], 'CREATE',
+                    notes=f"Imported from {self.source}" if self.source else "Imported",
+                )
+        return len(created)
+
+    def _run(self, rows):
+        self.names = NameCache(self.workspace)
+        rows = iter(rows)
+        while True:
+            chunk = []
+            for batch in iter(lambda: list(islice(rows, self.batch_size)), []):
+                chunk.extend(self._validate_batch(batch))
+                if len(chunk) >= self.chunk_size:
+                    break
+            else:
+                if not chunk:
+                    return
+            self.imported += self._insert(chunk)
+            self.elapsed = time.monotonic() - self.started
+            if self.on_chunk:
+                self.on_chunk(self)
+
+    def run(self, rows):
+        """Import the rows and return the number imported"""
+        self.started = time.monotonic()
+        if self.dry_run:
+            # Everything, including new clients, projects and tasks, is rolled back
+            with transaction.atomic():
+                self._run(rows)
+                transaction.set_rollback(True)
+        else:
+            self._run(rows)
+        self.elapsed = time.monotonic() - self.started
+        return self.imported
@@ -0,0 +1,53 @@
+# timetracker/management/commands/_export.py
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from timetracker.exports import DEFAULT_CHUNK_SIZE, FORMATS, ExportFilters, export_lines
+
+
+class ExportCommand(BaseCommand):
+    """Shared options and streaming output of the export commands"""
+
+    kind = None
+
+    @property
+    def help(self):
+        return f"Stream {self.kind.replace('_', ' ')} as CSV or JSONL to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--date-from', help='First day to include, YYYY-MM-DD in the workspace timezone')
+        parser.add_argument('--date-to', help='Last day to include, YYYY-MM-DD in the workspace timezone')
+        parser.add_argument('--project', help='Project id')
+        parser.add_argument('--client', help='Client id')
+        parser.add_argument('--billable', help='true or false')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Number of rows read per query')
+
+    def handle(self, *args, **options):
+        try:
+            filters = ExportFilters(
+                date_from=options['date_from'], date_to=options['date_to'],
+                project=options['project'], client=options['client'], billable=options['billable'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        fmt = options['format']
+        lines = export_lines(self.kind, filters, fmt, options['chunk_size'])
+        if not options['output']:
+            self._write(lines, sys.stdout)
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            count = self._write(lines, output)
+        if fmt == 'csv':
+            count -= 1  # header
+        self.stderr.write(self.style.SUCCESS(f"Wrote {count} rows to {options['output']}."))
+
+    def _write(self, lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
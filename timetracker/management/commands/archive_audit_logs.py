@@ -0,0 +1,32 @@
+# timetracker/management/commands/archive_audit_logs.py
+from django.core.management.base import BaseCommand
+from timetracker.archive import archive_month, closed_months, get_archive_dir
+
+
+class Command(BaseCommand):
+    help = (
+        "Move audit logs of closed months into compressed segment files in "
+        "AUDIT_ARCHIVE_DIR and delete the archived rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=0,
+                            help='Number of most recent closed months to keep live')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Number of records read or deleted per query')
+
+    def handle(self, *args, **options):
+        total = 0
+        for start, end, label in closed_months(options['keep_months']):
+            archived, segment, deleted = archive_month(start, end, label, chunk_size=options['chunk_size'])
+            if not (archived or deleted):
+                continue
+            total += archived
+            if segment:
+                size = segment.stat().st_size
+                self.stdout.write(f"{label}: archived {archived} records to {segment.name} ({size} bytes), "
+                                  f"deleted {deleted} live rows")
+            else:
+                self.stdout.write(f"{label}: deleted {deleted} live rows that were already archived")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} audit records to {get_archive_dir()}."))
@@ -0,0 +1,94 @@
+# timetracker/management/commands/benchmark_audit_log.py
+import time
+from datetime import timedelta
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils.timezone import now
+from core.models import Client, Workspace
+from projects.models import Project, Task
+from timetracker.models import TimeEntry, TimeEntryAuditLog
+from timetracker.utils import log_bulk_action, log_time_entry_action
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    """Count queries without keeping them, unlike CaptureQueriesContext's capped log"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare logging an action for many time entries one by one with the "
+        "bulk audit path. Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=10000)
+        parser.add_argument('--projects', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['entries'], options['projects'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, entry_count, project_count):
+        workspace = Workspace.objects.create(name="Benchmark", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Benchmark client")
+        projects = Project.objects.bulk_create(
+            Project(client=client, name=f"Project {i}") for i in range(project_count)
+        )
+        tasks = Task.objects.bulk_create(Task(project=project, name=f"Task {project.pk}") for project in projects)
+
+        start = now() - timedelta(days=365)
+        TimeEntry.objects.bulk_create(
+            (
+                TimeEntry(
+                    project=projects[i % project_count], task=tasks[i % project_count],
+                    start_time=start + timedelta(minutes=30 * i),
+                    end_time=start + timedelta(minutes=30 * i + 25),
+                    duration_seconds=25 * 60,
+                )
+                for i in range(entry_count)
+            ),
+            batch_size=1000,
+        )
+        entry_ids = list(TimeEntry.objects.filter(project__client=client).values_list('pk', flat=True))
+
+        request = RequestFactory().post('/tracker/', HTTP_USER_AGENT='benchmark')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+
+        def per_entry():
+            for entry in TimeEntry.objects.filter(pk__in=entry_ids):
+                log_time_entry_action(request, entry, 'UPDATE', notes="Benchmark")
+
+        def bulk():
+            log_bulk_action(request, TimeEntry.objects.filter(pk__in=entry_ids), 'UPDATE', notes="Benchmark")
+
+        self.stdout.write(f"Logging {len(entry_ids)} entries across {project_count} projects")
+        for label, func in (("per-entry (before)", per_entry), ("bulk (after)", bulk)):
+            logged_before = TimeEntryAuditLog.objects.count()
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+            logged = TimeEntryAuditLog.objects.count() - logged_before
+            self.stdout.write(
+                f"{label:<20} {elapsed:8.2f} s  {queries.count:>7} queries  {logged:>7} logs"
+            )
@@ -0,0 +1,43 @@
+# timetracker/management/commands/compact_audit_log.py
+from django.core.management.base import BaseCommand
+from timetracker.audit import compact_audit_history, expand_audit_history
+
+
+def _format_bytes(size):
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite stored audit log values into compact diff form (or back to full "
+        "copies with --expand) and report the space saved"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of time entries whose records are rewritten per transaction')
+        parser.add_argument('--snapshot-interval', type=int, default=None,
+                            help='Deltas stored between full snapshots (default: AUDIT_LOG_SNAPSHOT_INTERVAL)')
+        parser.add_argument('--expand', action='store_true',
+                            help='Store full copies of both states again')
+
+    def handle(self, *args, **options):
+        if options['expand']:
+            rewritten, before, after = expand_audit_history(chunk_size=options['chunk_size'])
+        else:
+            rewritten, before, after = compact_audit_history(
+                chunk_size=options['chunk_size'],
+                snapshot_interval=options['snapshot_interval'],
+            )
+
+        saved = before - after
+        percent = saved / before * 100 if before else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Rewrote {rewritten} audit records. Stored values: {_format_bytes(before)} -> "
+            f"{_format_bytes(after)} ({_format_bytes(saved)} saved, {percent:.1f}%)."
+        ))
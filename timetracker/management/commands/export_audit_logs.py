@@ -0,0 +1,6 @@
+# timetracker/management/commands/export_audit_logs.py
+from timetracker.management.commands._export import ExportCommand
+
+
+class Command(ExportCommand):
+    kind = 'audit_logs'
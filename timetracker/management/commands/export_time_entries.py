@@ -0,0 +1,6 @@
+# timetracker/management/commands/export_time_entries.py
+from timetracker.management.commands._export import ExportCommand
+
+
+class Command(ExportCommand):
+    kind = 'time_entries'
@@ -0,0 +1,40 @@
+# timetracker/management/commands/find_overlapping_entries.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localtime
+from core.workspace import get_workspace_timezone
+from timetracker.exports import ExportFilters
+from timetracker.overlaps import DEFAULT_CHUNK_SIZE, overlapping_pairs
+
+
+class Command(BaseCommand):
+    help = "List every pair of live time entries that overlap within a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First day to check, YYYY-MM-DD in the workspace timezone')
+        parser.add_argument('--date-to', help='Last day to check, YYYY-MM-DD in the workspace timezone')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Number of rows read per query')
+
+    def handle(self, *args, **options):
+        try:
+            start, end = ExportFilters(date_from=options['date_from'], date_to=options['date_to']).range()
+        except ValueError as error:
+            raise CommandError(error)
+
+        tz = get_workspace_timezone()
+        pairs = 0
+        overlap_seconds = 0
+        for (earlier_pk, earlier_start, earlier_end), (later_pk, later_start, later_end) in overlapping_pairs(
+            start, end, chunk_size=options['chunk_size']
+        ):
+            seconds = int((min(earlier_end, later_end) - later_start).total_seconds())
+            self.stdout.write(
+                f"#{earlier_pk} ({localtime(earlier_start, tz):%Y-%m-%d %H:%M}-{localtime(earlier_end, tz):%H:%M}) "
+                f"overlaps #{later_pk} ({localtime(later_start, tz):%Y-%m-%d %H:%M}-{localtime(later_end, tz):%H:%M}) "
+                f"by {seconds // 60} minutes"
+            )
+            pairs += 1
+            overlap_seconds += seconds
+
+        style = self.style.WARNING if pairs else self.style.SUCCESS
+        self.stdout.write(style(f"Found {pairs} overlapping pairs covering {overlap_seconds // 60} minutes."))
@@ -0,0 +1,11 @@
+# timetracker/management/commands/rebuild_audit_actors.py
+from django.core.management.base import BaseCommand
+from timetracker.audit import rebuild_actor_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the index of users and actions used by the audit log filters"
+
+    def handle(self, *args, **options):
+        pairs = rebuild_actor_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {pairs} (user, action) pairs."))
@@ -0,0 +1,22 @@
+# timetracker/management/commands/rebuild_time_rollups.py
+from django.core.management.base import BaseCommand
+from timetracker.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily time rollup table from all completed time entries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Number of time entries read per query')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rollup rows inserted per query')
+
+    def handle(self, *args, **options):
+        scanned, rows = rebuild_rollups(
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rows} rollup rows from {scanned} time entries."
+        ))
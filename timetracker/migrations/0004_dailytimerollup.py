@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('timetracker', '0003_alter_timeentry_options_timeentry_deleted_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('billable', models.BooleanField(default=True)),
+                ('tracked_seconds', models.BigIntegerField(default=0)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('billable_amount', models.DecimalField(decimal_places=4, default=0, max_digits=14)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='projects.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='projects.task')),
+            ],
+            options={
+                'verbose_name': 'Daily Time Rollup',
+                'verbose_name_plural': 'Daily Time Rollups',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'project', 'task', 'billable'), name='unique_daily_time_rollup')],
+            },
+        ),
+    ]
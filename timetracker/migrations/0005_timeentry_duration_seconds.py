@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetracker', '0004_dailytimerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='duration_seconds',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
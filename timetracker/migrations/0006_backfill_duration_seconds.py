@@ -0,0 +1,35 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def backfill_duration_seconds(apps, schema_editor):
+    TimeEntry = apps.get_model('timetracker', 'TimeEntry')
+    completed = TimeEntry.objects.filter(end_time__isnull=False).order_by('pk')
+    last_pk = 0
+
+    while True:
+        chunk = list(completed.filter(pk__gt=last_pk).only('pk', 'start_time', 'end_time')[:BATCH_SIZE])
+        if not chunk:
+            break
+
+        for entry in chunk:
+            entry.duration_seconds = int((entry.end_time - entry.start_time).total_seconds())
+
+        # Commit each chunk on its own so large tables do not hold one long write lock
+        with transaction.atomic():
+            TimeEntry.objects.bulk_update(chunk, ['duration_seconds'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('timetracker', '0005_timeentry_duration_seconds'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_duration_seconds, migrations.RunPython.noop),
+    ]
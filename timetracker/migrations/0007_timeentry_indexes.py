@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('timetracker', '0006_backfill_duration_seconds'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['start_time'], name='timeentry_live_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('deleted', False), ('end_time__isnull', True)), fields=['start_time'], name='timeentry_running_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['deleted_at'], name='timeentry_deleted_at_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:48
+
+from django.db import migrations, models
+
+
+def close_extra_running_timers(apps, schema_editor):
+    """Stop all but the newest running timer so the constraint can be created"""
+    TimeEntry = apps.get_model('timetracker', 'TimeEntry')
+    running = list(
+        TimeEntry.objects.filter(end_time__isnull=True, deleted=False).order_by('-start_time')
+    )
+    # Each older timer ends when the next one was started
+    for newer, older in zip(running, running[1:]):
+        older.end_time = newer.start_time
+        older.duration_seconds = int((older.end_time - older.start_time).total_seconds())
+        older.save(update_fields=['end_time', 'duration_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('timetracker', '0007_timeentry_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_extra_running_timers, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='timeentry',
+            name='timeentry_running_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='timeentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted', False), ('end_time__isnull', True)), fields=('deleted',), name='single_running_timer', violation_error_message='Another timer is already running.'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetracker', '0008_single_running_timer'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeentryauditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db import migrations, transaction
+
+BATCH_SIZE = 500
+COMPACT_CHUNK_SIZE = 500
+EXPAND_CHUNK_SIZE = 2000
+
+_MISSING = object()
+
+
+def diff_values(base, values):
+    return {field: value for field, value in values.items() if base.get(field, _MISSING) != value}
+
+
+def compact(apps, schema_editor):
+    """
+    Store only the fields that changed: previous_values against the current
+    state, and current_values against the time entry's latest snapshot, with
+    a full snapshot every AUDIT_LOG_SNAPSHOT_INTERVAL records.
+    """
+    TimeEntryAuditLog = apps.get_model('timetracker', 'TimeEntryAuditLog')
+    snapshot_interval = getattr(settings, 'AUDIT_LOG_SNAPSHOT_INTERVAL', 20)
+    last_entry = 0
+    while True:
+        entry_ids = list(
+            TimeEntryAuditLog.objects.filter(time_entry_id__gt=last_entry)
+            .order_by('time_entry_id').values_list('time_entry_id', flat=True).distinct()[:COMPACT_CHUNK_SIZE]
+        )
+        if not entry_ids:
+            break
+
+        logs = TimeEntryAuditLog.objects.filter(time_entry_id__in=entry_ids).order_by('time_entry_id', 'id').only(
+            'id', 'time_entry_id', 'previous_values', 'current_values', 'snapshot'
+        )
+        full_values = {}
+        changed = []
+        entry_id = snapshot = None
+        for log in logs:
+            if log.time_entry_id != entry_id:
+                entry_id, snapshot, deltas = log.time_entry_id, None, 0
+
+            stored = (log.previous_values, log.current_values, log.snapshot_id)
+            current = log.current_values
+            if log.snapshot_id is not None and current is not None:
+                current = {**full_values[log.snapshot_id], **current}
+            full_values[log.id] = current
+
+            if current is not None:
+                if log.previous_values is not None:
+                    log.previous_values = diff_values(current, log.previous_values)
+                if snapshot is None or deltas >= snapshot_interval:
+                    snapshot, deltas = log, 0
+                    log.snapshot_id, log.current_values = None, current
+                else:
+                    log.snapshot_id, log.current_values = snapshot.id, diff_values(full_values[snapshot.id], current)
+                    deltas += 1
+
+            if (log.previous_values, log.current_values, log.snapshot_id) != stored:
+                changed.append(log)
+
+        with transaction.atomic():
+            TimeEntryAuditLog.objects.bulk_update(
+                changed, ['previous_values', 'current_values', 'snapshot'], batch_size=BATCH_SIZE
+            )
+        last_entry = entry_ids[-1]
+
+
+def expand(apps, schema_editor):
+    """Rewrite compact records back into full copies of both states"""
+    TimeEntryAuditLog = apps.get_model('timetracker', 'TimeEntryAuditLog')
+    last_pk = 0
+    while True:
+        logs = list(
+            TimeEntryAuditLog.objects.filter(pk__gt=last_pk).select_related('snapshot').order_by('pk').only(
+                'id', 'previous_values', 'current_values', 'snapshot', 'snapshot__current_values'
+            )[:EXPAND_CHUNK_SIZE]
+        )
+        if not logs:
+            break
+
+        changed = []
+        for log in logs:
+            stored = (log.previous_values, log.current_values, log.snapshot_id)
+            if log.snapshot_id is not None and log.current_values is not None:
+                log.current_values = {**log.snapshot.current_values, **log.current_values}
+            log.snapshot = None
+            if log.previous_values is not None and log.current_values is not None:
+                log.previous_values = {**log.current_values, **log.previous_values}
+
+            if (log.previous_values, log.current_values, log.snapshot_id) != stored:
+                changed.append(log)
+
+        with transaction.atomic():
+            TimeEntryAuditLog.objects.bulk_update(
+                changed, ['previous_values', 'current_values', 'snapshot'], batch_size=BATCH_SIZE
+            )
+        last_pk = logs[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Each chunk is committed on its own so large audit tables are not
+    # rewritten in one long transaction
+    atomic = False
+
+    dependencies = [
+        ('timetracker', '0010_auditlog_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact, expand),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetracker', '0011_compact_audit_values'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='timeentryauditlog',
+            options={'ordering': ['-timestamp', '-id'], 'verbose_name': 'Time Entry Audit Log', 'verbose_name_plural': 'Time Entry Audit Logs'},
+        ),
+        migrations.AddIndex(
+            model_name='timeentryauditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentryauditlog',
+            index=models.Index(fields=['action', 'timestamp', 'id'], name='auditlog_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentryauditlog',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='auditlog_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentryauditlog',
+            index=models.Index(fields=['user', 'action', 'timestamp', 'id'], name='auditlog_user_action_ts_idx'),
+        ),
+    ]
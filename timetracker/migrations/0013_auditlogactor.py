@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_actors(apps, schema_editor):
+    TimeEntryAuditLog = apps.get_model('timetracker', 'TimeEntryAuditLog')
+    AuditLogActor = apps.get_model('timetracker', 'AuditLogActor')
+    pairs = TimeEntryAuditLog.objects.values_list('user_id', 'action').distinct()
+    AuditLogActor.objects.bulk_create(
+        [AuditLogActor(user_id=user_id, action=action) for user_id, action in pairs],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetracker', '0012_auditlog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('CREATE', 'Created'), ('UPDATE', 'Updated'), ('DELETE', 'Deleted'), ('RESTORE', 'Restored'), ('START_TIMER', 'Started Timer'), ('STOP_TIMER', 'Stopped Timer'), ('CONTINUE', 'Continued Entry'), ('DUPLICATE', 'Duplicated Entry')], max_length=20)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Audit Log Actor',
+                'verbose_name_plural': 'Audit Log Actors',
+                'constraints': [models.UniqueConstraint(fields=('user', 'action'), name='unique_audit_log_actor'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('action',), name='unique_anonymous_audit_log_actor')],
+            },
+        ),
+        migrations.RunPython(backfill_actors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('timetracker', '0013_auditlogactor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['duration_seconds'], name='timeentry_live_duration_idx'),
+        ),
+    ]
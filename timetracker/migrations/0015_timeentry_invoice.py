@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoicing', '0001_initial'),
+        ('timetracker', '0014_timeentry_duration_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='invoice',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='time_entries', to='invoicing.invoice'),
+        ),
+    ]
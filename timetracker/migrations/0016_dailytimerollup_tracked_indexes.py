@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('timetracker', '0015_timeentry_invoice'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailytimerollup',
+            index=models.Index(fields=['task', 'tracked_seconds'], name='rollup_task_tracked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailytimerollup',
+            index=models.Index(fields=['project', 'tracked_seconds'], name='rollup_project_tracked_idx'),
+        ),
+    ]
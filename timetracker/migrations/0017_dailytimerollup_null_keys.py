@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Fold rows that share a key with a NULL in it into the first of them"""
+    DailyTimeRollup = apps.get_model('timetracker', 'DailyTimeRollup')
+    first = {}
+    for rollup in DailyTimeRollup.objects.filter(
+        models.Q(project__isnull=True) | models.Q(task__isnull=True)
+    ).order_by('pk'):
+        key = (rollup.day, rollup.project_id, rollup.task_id, rollup.billable)
+        kept = first.setdefault(key, rollup)
+        if kept is rollup:
+            continue
+        kept.tracked_seconds += rollup.tracked_seconds
+        kept.entry_count += rollup.entry_count
+        kept.billable_amount += rollup.billable_amount
+        kept.save(update_fields=['tracked_seconds', 'entry_count', 'billable_amount'])
+        rollup.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('timetracker', '0016_dailytimerollup_tracked_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dailytimerollup',
+            name='task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='projects.task'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytimerollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('project__isnull', False), ('task__isnull', True)), fields=('day', 'project', 'billable'), name='unique_daily_time_rollup_no_task'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytimerollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('project__isnull', True), ('task__isnull', False)), fields=('day', 'task', 'billable'), name='unique_daily_time_rollup_no_project'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytimerollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('project__isnull', True), ('task__isnull', True)), fields=('day', 'billable'), name='unique_daily_time_rollup_unassigned'),
+        ),
+    ]
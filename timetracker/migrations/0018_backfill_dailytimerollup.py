@@ -0,0 +1,78 @@
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.core.cache import cache
+from django.db import migrations, transaction
+
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+
+
+def workspace_timezone(apps):
+    Workspace = apps.get_model('core', 'Workspace')
+    workspace = Workspace.objects.order_by('id').first()
+    if workspace and workspace.timezone:
+        try:
+            return ZoneInfo(workspace.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return dt_timezone.utc
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Build the rollup table from the existing entries, as rebuild_time_rollups
+    does; 0004 created it empty, so edits of older entries wrote negative rows.
+    """
+    TimeEntry = apps.get_model('timetracker', 'TimeEntry')
+    DailyTimeRollup = apps.get_model('timetracker', 'DailyTimeRollup')
+    completed = TimeEntry.objects.filter(end_time__isnull=False, deleted=False).order_by('pk')
+    tz = workspace_timezone(apps)
+    totals = {}
+    last_pk = 0
+
+    while True:
+        chunk = list(
+            completed.filter(pk__gt=last_pk).values_list(
+                'pk', 'start_time', 'duration_seconds', 'project_id', 'task_id', 'billable', 'hourly_rate'
+            )[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+
+        for pk, start_time, seconds, project_id, task_id, billable, hourly_rate in chunk:
+            key = (start_time.astimezone(tz).date(), project_id, task_id, billable)
+            row = totals.setdefault(key, [0, 0, Decimal('0')])
+            row[0] += seconds
+            row[1] += 1
+            if billable:
+                row[2] += (Decimal(seconds) * Decimal(str(hourly_rate)) / 3600).quantize(Decimal('0.0001'))
+        last_pk = chunk[-1][0]
+
+    with transaction.atomic():
+        DailyTimeRollup.objects.all().delete()
+        DailyTimeRollup.objects.bulk_create([
+            DailyTimeRollup(
+                day=day, project_id=project_id, task_id=task_id, billable=billable,
+                tracked_seconds=seconds, entry_count=count, billable_amount=amount,
+            )
+            for (day, project_id, task_id, billable), (seconds, count, amount) in totals.items()
+        ], batch_size=BATCH_SIZE)
+
+    # Results cached from the empty table are keyed on the rollup data version;
+    # dropping the counter restarts it from the clock (see core.versions)
+    cache.delete('data-version:rollups')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_workspace_timezone'),
+        ('timetracker', '0017_dailytimerollup_null_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
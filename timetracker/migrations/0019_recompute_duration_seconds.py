@@ -0,0 +1,100 @@
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.core.cache import cache
+from django.db import migrations, transaction
+
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+
+
+def workspace_timezone(apps):
+    Workspace = apps.get_model('core', 'Workspace')
+    workspace = Workspace.objects.order_by('id').first()
+    if workspace and workspace.timezone:
+        try:
+            return ZoneInfo(workspace.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return dt_timezone.utc
+
+
+def recompute_durations(apps, schema_editor):
+    """
+    Entries saved from local wall-clock times across a DST change stored
+    durations an hour off; recompute them from the stored UTC times.
+    """
+    TimeEntry = apps.get_model('timetracker', 'TimeEntry')
+    completed = TimeEntry.objects.filter(end_time__isnull=False).order_by('pk')
+    last_pk = 0
+
+    while True:
+        chunk = list(completed.filter(pk__gt=last_pk).only('pk', 'start_time', 'end_time', 'duration_seconds')[:CHUNK_SIZE])
+        if not chunk:
+            break
+
+        changed = []
+        for entry in chunk:
+            seconds = int(entry.end_time.timestamp() - entry.start_time.timestamp())
+            if entry.duration_seconds != seconds:
+                entry.duration_seconds = seconds
+                changed.append(entry)
+        with transaction.atomic():
+            TimeEntry.objects.bulk_update(changed, ['duration_seconds'], batch_size=BATCH_SIZE)
+        last_pk = chunk[-1].pk
+
+
+def rebuild_rollups(apps, schema_editor):
+    """Rebuild the rollup table from the corrected durations, as rebuild_time_rollups does"""
+    TimeEntry = apps.get_model('timetracker', 'TimeEntry')
+    DailyTimeRollup = apps.get_model('timetracker', 'DailyTimeRollup')
+    completed = TimeEntry.objects.filter(end_time__isnull=False, deleted=False).order_by('pk')
+    tz = workspace_timezone(apps)
+    totals = {}
+    last_pk = 0
+
+    while True:
+        chunk = list(
+            completed.filter(pk__gt=last_pk).values_list(
+                'pk', 'start_time', 'duration_seconds', 'project_id', 'task_id', 'billable', 'hourly_rate'
+            )[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+
+        for pk, start_time, seconds, project_id, task_id, billable, hourly_rate in chunk:
+            key = (start_time.astimezone(tz).date(), project_id, task_id, billable)
+            row = totals.setdefault(key, [0, 0, Decimal('0')])
+            row[0] += seconds
+            row[1] += 1
+            if billable:
+                row[2] += (Decimal(seconds) * Decimal(str(hourly_rate)) / 3600).quantize(Decimal('0.0001'))
+        last_pk = chunk[-1][0]
+
+    with transaction.atomic():
+        DailyTimeRollup.objects.all().delete()
+        DailyTimeRollup.objects.bulk_create([
+            DailyTimeRollup(
+                day=day, project_id=project_id, task_id=task_id, billable=billable,
+                tracked_seconds=seconds, entry_count=count, billable_amount=amount,
+            )
+            for (day, project_id, task_id, billable), (seconds, count, amount) in totals.items()
+        ], batch_size=BATCH_SIZE)
+
+    # Results cached from the old totals are keyed on the rollup data version;
+    # dropping the counter restarts it from the clock (see core.versions)
+    cache.delete('data-version:rollups')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('timetracker', '0018_backfill_dailytimerollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_durations, migrations.RunPython.noop),
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 # timetracker/models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from projects.models import Project, Task
 
@@ -14,18 +15,69 @@ class TimeEntry(models.Model):
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
     deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.IntegerField(default=0, editable=False)
+    # Set when the entry is billed, so it cannot be invoiced twice
+    invoice = models.ForeignKey(
+        'invoicing.Invoice', on_delete=models.SET_NULL, null=True, blank=True, related_name='time_entries'
+    )
 
-    def duration_minutes(self):
+    def compute_duration_seconds(self):
         if self.end_time and self.start_time:
-            return int((self.end_time - self.start_time).total_seconds() / 60)
+            # Subtracting datetimes that share a zoneinfo tzinfo ignores their UTC
+            # offsets, so an entry crossing a DST change would be an hour off
+            return int(self.end_time.timestamp() - self.start_time.timestamp())
         return 0
 
+    def duration_minutes(self):
+        return int(self.duration_seconds / 60)
+
+    def save(self, *args, **kwargs):
+        # Keep the stored duration in step with start/end on every save path
+        self.duration_seconds = self.compute_duration_seconds()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'duration_seconds'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         project_name = self.project.name if self.project else "No Project"
         return f"{project_name} - {self.start_time} to {self.end_time}"
 
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Date ranges and recent entries: filter(deleted=False, start_time__gte=...).
+            # Partial rather than (deleted, start_time) because deleted=False compiles
+            # to NOT "deleted", which SQLite cannot match against a leading column.
+            models.Index(
+                fields=['start_time'],
+                name='timeentry_live_start_idx',
+                condition=models.Q(deleted=False),
+            ),
+            # Longest live entry, the lookback bound of overlap checks
+            models.Index(
+                fields=['duration_seconds'],
+                name='timeentry_live_duration_idx',
+                condition=models.Q(deleted=False),
+            ),
+            # Deleted entries page, filter(deleted=True).order_by('-deleted_at')
+            models.Index(
+                fields=['deleted_at'],
+                name='timeentry_deleted_at_idx',
+                condition=models.Q(deleted=True),
+            ),
+        ]
+        constraints = [
+            # At most one running timer. Every running row has deleted=False, so a
+            # unique partial index on it allows a single row; it also serves the
+            # filter(end_time__isnull=True, deleted=False) lookup.
+            models.UniqueConstraint(
+                fields=['deleted'],
+                name='single_running_timer',
+                condition=models.Q(end_time__isnull=True, deleted=False),
+                violation_error_message="Another timer is already running.",
+            ),
+        ]
 
 
 class TimeEntryAuditLog(models.Model):
@@ -45,7 +97,8 @@ class TimeEntryAuditLog(models.Model):
     time_entry = models.ForeignKey(TimeEntry, on_delete=models.CASCADE, related_name='audit_logs')
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the action happens; created_at records when the row was written
+    timestamp = models.DateTimeField(default=timezone.now)
 
     # IP Address and User Agent for security
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -54,9 +107,19 @@ class TimeEntryAuditLog(models.Model):
     # Session information
     session_key = models.CharField(max_length=40, blank=True)
 
-    # Previous and current values (JSON field to store changes)
+    # Previous and current values (JSON field to store changes). Rows without
+    # a snapshot hold the full current state; rows pointing at a snapshot hold
+    # only the fields that differ from it. previous_values only holds fields
+    # that differ from the full current state. Use get_current_values() and
+    # get_previous_values() to read them back.
     previous_values = models.JSONField(null=True, blank=True)
     current_values = models.JSONField(null=True, blank=True)
+    # A snapshot is only ever deleted together with its time entry's other
+    # records, so the database constraint alone guards it; DO_NOTHING keeps
+    # the cascade from TimeEntry a single DELETE
+    snapshot = models.ForeignKey(
+        'self', on_delete=models.DO_NOTHING, null=True, blank=True, related_name='deltas'
+    )
 
     # Additional context/notes
     notes = models.TextField(blank=True)
@@ -64,11 +127,124 @@ class TimeEntryAuditLog(models.Model):
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # True on records read back from an archive segment (see timetracker.archive)
+    archived = False
+
+    def get_current_values(self):
+        """Full state of the time entry after the action"""
+        if self.snapshot_id is None or self.current_values is None:
+            return self.current_values
+        return {**self.snapshot.current_values, **self.current_values}
+
+    def get_previous_values(self):
+        """Full state of the time entry before the action, if it was recorded"""
+        if self.previous_values is None:
+            return None
+        return {**(self.get_current_values() or {}), **self.previous_values}
+
+    def get_changed_fields(self):
+        """Names of the fields the action changed"""
+        previous = self.get_previous_values()
+        if previous is None:
+            return []
+        current = self.get_current_values() or {}
+        return [field for field, value in previous.items() if current.get(field) != value]
+
     def __str__(self):
         user_info = f"by {self.user.username}" if self.user else "by anonymous user"
         return f"{self.get_action_display()} TimeEntry #{self.time_entry.id} {user_info} at {self.timestamp}"
 
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
         verbose_name = "Time Entry Audit Log"
-        verbose_name_plural = "Time Entry Audit Logs"
\ No newline at end of file
+        verbose_name_plural = "Time Entry Audit Logs"
+        indexes = [
+            # The audit log page lists newest first on (timestamp, id), optionally
+            # filtered by action and/or user, and pages with keyset cursors
+            models.Index(fields=['timestamp', 'id'], name='auditlog_timestamp_idx'),
+            models.Index(fields=['action', 'timestamp', 'id'], name='auditlog_action_ts_idx'),
+            models.Index(fields=['user', 'timestamp', 'id'], name='auditlog_user_ts_idx'),
+            models.Index(fields=['user', 'action', 'timestamp', 'id'], name='auditlog_user_action_ts_idx'),
+        ]
+
+
+class AuditLogActor(models.Model):
+    """
+    Distinct (user, action) pairs that appear in the audit log.
+
+    Maintained as records are written (see timetracker.audit.record_actors) so
+    the audit filter dropdowns never have to scan the log itself. Pairs are
+    never removed when records are deleted or archived.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    action = models.CharField(max_length=20, choices=TimeEntryAuditLog.ACTION_CHOICES)
+
+    class Meta:
+        verbose_name = "Audit Log Actor"
+        verbose_name_plural = "Audit Log Actors"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'action'], name='unique_audit_log_actor'),
+            # NULLs are distinct in unique indexes, so anonymous pairs need their own
+            models.UniqueConstraint(
+                fields=['action'],
+                name='unique_anonymous_audit_log_actor',
+                condition=models.Q(user__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        user_info = self.user.username if self.user else "anonymous user"
+        return f"{self.get_action_display()} by {user_info}"
+
+
+class DailyTimeRollup(models.Model):
+    """Per-day totals of completed time entries, maintained incrementally"""
+
+    day = models.DateField()
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True)
+    # A deleted task's rows are merged into the rows without one (see
+    # timetracker.rollups.merge_task_rollups) instead of set to NULL
+    task = models.ForeignKey(Task, on_delete=models.DO_NOTHING, null=True, blank=True)
+    billable = models.BooleanField(default=True)
+
+    tracked_seconds = models.BigIntegerField(default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    billable_amount = models.DecimalField(max_digits=14, decimal_places=4, default=0)
+
+    def __str__(self):
+        project_name = self.project.name if self.project else "No Project"
+        return f"{self.day} - {project_name} ({self.entry_count} entries)"
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = "Daily Time Rollup"
+        verbose_name_plural = "Daily Time Rollups"
+        indexes = [
+            # Tracked time per task or project (progress against estimates) is
+            # summed from the index alone, without visiting the table
+            models.Index(fields=['task', 'tracked_seconds'], name='rollup_task_tracked_idx'),
+            models.Index(fields=['project', 'tracked_seconds'], name='rollup_project_tracked_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'project', 'task', 'billable'],
+                name='unique_daily_time_rollup',
+            ),
+            # NULLs are distinct in unique indexes, so keys without a task or project need their own
+            models.UniqueConstraint(
+                fields=['day', 'project', 'billable'],
+                name='unique_daily_time_rollup_no_task',
+                condition=models.Q(task__isnull=True, project__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'task', 'billable'],
+                name='unique_daily_time_rollup_no_project',
+                condition=models.Q(project__isnull=True, task__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'billable'],
+                name='unique_daily_time_rollup_unassigned',
+                condition=models.Q(project__isnull=True, task__isnull=True),
+            ),
+        ]
@@ -0,0 +1,112 @@
+# timetracker/overlaps.py
+"""
+Detection of time entries that cover the same time.
+
+Single saves are checked with an indexed range query: an entry can only
+overlap entries that start before it ends and at most the longest stored
+duration before it starts, so both bounds fall on the live start_time index
+(the longest duration itself is read from the live duration index).
+Full history reports use a sort-and-sweep pass over rows streamed in start
+order, keeping the entries still open in a heap ordered by end time; it runs
+in O(n log n) plus the number of pairs reported and holds only the open
+entries in memory.
+"""
+import heapq
+from datetime import timedelta
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.utils.timezone import localtime
+from core.workspace import get_workspace_timezone
+from .models import TimeEntry
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def find_overlaps(time_entry):
+    """
+    Return the live entries overlapping `time_entry`'s time range, other than
+    the entry itself, in start order. A running timer overlaps everything
+    after its start. Entries without a start time overlap nothing.
+    """
+    if not time_entry.start_time:
+        return []
+    start, end = time_entry.start_time, time_entry.end_time
+
+    live = TimeEntry.objects.filter(deleted=False).select_related('project')
+    # Served from the duration index; the entry itself may be the longest
+    longest = live.aggregate(longest=Max('duration_seconds'))['longest'] or 0
+    if time_entry.pk:
+        live = live.exclude(pk=time_entry.pk)
+
+    completed = live.filter(end_time__gt=start, start_time__gte=start - timedelta(seconds=longest))
+    if end is not None:
+        completed = completed.filter(start_time__lt=end)
+    # The running timer is found through its own unique index and checked
+    # here; folding it into the range query as an OR makes it scan the index
+    running = [
+        entry for entry in live.filter(end_time__isnull=True)
+        if end is None or entry.start_time < end
+    ]
+    return sorted([*completed, *running], key=lambda entry: (entry.start_time, entry.pk))
+
+
+def _describe(entry, tz):
+    project = entry.project.name if entry.project else "No project"
+    end = f"{localtime(entry.end_time, tz):%H:%M}" if entry.end_time else "now"
+    return f"{project}, {localtime(entry.start_time, tz):%Y-%m-%d %H:%M}-{end}"
+
+
+def validate_no_overlap(time_entry, limit=3):
+    """
+    Raise ValidationError naming up to `limit` entries that overlap
+    `time_entry`; the validation hook of the manual, edit and duplicate paths
+    """
+    overlapping = find_overlaps(time_entry)
+    if not overlapping:
+        return
+    tz = get_workspace_timezone()
+    described = "; ".join(_describe(entry, tz) for entry in overlapping[:limit])
+    if len(overlapping) > limit:
+        described += "; and more"
+    raise ValidationError(
+        "This entry overlaps existing time: %(entries)s.",
+        code='overlap',
+        params={'entries': described},
+    )
+
+
+def sweep_overlaps(rows):
+    """
+    Yield (earlier, later) pairs of overlapping intervals.
+
+    `rows` are (pk, start, end) tuples sorted by start; entries that touch
+    (one ends exactly when the next starts) and empty entries do not overlap.
+    """
+    open_entries = []  # (end, pk, start) heap of entries that may still overlap
+    for pk, start, end in rows:
+        if end <= start:
+            continue
+        while open_entries and open_entries[0][0] <= start:
+            heapq.heappop(open_entries)
+        # Everything still open started no later and ends after this start
+        for other_end, other_pk, other_start in open_entries:
+            yield (other_pk, other_start, other_end), (pk, start, end)
+        heapq.heappush(open_entries, (end, pk, start))
+
+
+def overlapping_pairs(start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield (earlier, later) (pk, start, end) pairs of live, completed entries
+    that overlap within [start, end); either bound may be None. Rows are
+    streamed in start order from the start_time index.
+    """
+    entries = TimeEntry.objects.filter(deleted=False, end_time__isnull=False)
+    if start is not None:
+        # Entries that started earlier and run into the range count too; as in
+        # find_overlaps(), the longest duration bounds how much earlier
+        longest = entries.aggregate(longest=Max('duration_seconds'))['longest'] or 0
+        entries = entries.filter(end_time__gt=start, start_time__gte=start - timedelta(seconds=longest))
+    if end is not None:
+        entries = entries.filter(start_time__lt=end)
+    rows = entries.order_by('start_time', 'id').values_list('id', 'start_time', 'end_time')
+    return sweep_overlaps(rows.iterator(chunk_size=chunk_size))
@@ -0,0 +1,115 @@
+# timetracker/pagination.py
+"""
+Keyset (cursor) pagination for querysets listed newest first.
+
+Pages are ordered on (field, id) descending and each page links to its
+neighbours with opaque cursor tokens holding the boundary row's key, so a
+deep page costs the same index range scan as the first one and no COUNT(*)
+is needed.
+"""
+import base64
+import binascii
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, value, pk):
+    payload = json.dumps([direction, value.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (direction, value, pk) for a cursor token, or None if it is missing or invalid"""
+    if not token:
+        return None
+    try:
+        direction, value, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        value = parse_datetime(value)
+    except (binascii.Error, TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or value is None or not isinstance(pk, int):
+        return None
+    return direction, value, pk
+
+
+class KeysetPage:
+    """One page of results plus the cursors of the pages around it"""
+
+    def __init__(self, object_list, field, has_next, has_previous):
+        self.object_list = object_list
+        self.next_cursor = None
+        self.previous_cursor = None
+        if object_list and has_next:
+            last = object_list[-1]
+            self.next_cursor = encode_cursor(NEXT, getattr(last, field), last.pk)
+        if object_list and has_previous:
+            first = object_list[0]
+            self.previous_cursor = encode_cursor(PREVIOUS, getattr(first, field), first.pk)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _merge(rows, sources, position, limit, field, descending):
+    seen = {row.pk for row in rows}
+    merged = list(rows)
+    for source in sources:
+        for row in source(position, limit):
+            if row.pk not in seen:
+                seen.add(row.pk)
+                merged.append(row)
+    merged.sort(key=lambda row: (getattr(row, field), row.pk), reverse=descending)
+    return merged[:limit]
+
+
+def keyset_paginate(queryset, cursor=None, per_page=50, field='timestamp', sources=()):
+    """
+    Return the KeysetPage of `queryset` that `cursor` points at.
+
+    Rows are ordered by (field, id) descending. Without a cursor, or with an
+    invalid one, the first (newest) page is returned. One extra row is
+    fetched to tell whether there is a page beyond this one.
+
+    `sources` are extra callables taking (position, limit), where position
+    is None for the first page or a decoded (direction, value, pk) cursor.
+    They return up to `limit` rows past the position in page order, which
+    are merged with the queryset's rows (rows already in the queryset win).
+    """
+    position = decode_cursor(cursor)
+    limit = per_page + 1
+    if position is None:
+        rows = list(queryset.order_by(f'-{field}', '-id')[:limit])
+        if sources:
+            rows = _merge(rows, sources, position, limit, field, descending=True)
+        return KeysetPage(rows[:per_page], field, has_next=len(rows) > per_page, has_previous=False)
+
+    direction, value, pk = position
+    if direction == NEXT:
+        # The leading range on `field` lets the database seek in the index
+        older = Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(id__lt=pk))
+        rows = list(queryset.filter(older).order_by(f'-{field}', '-id')[:limit])
+        if sources:
+            rows = _merge(rows, sources, position, limit, field, descending=True)
+        return KeysetPage(rows[:per_page], field, has_next=len(rows) > per_page, has_previous=True)
+
+    newer = Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(id__gt=pk))
+    rows = list(queryset.filter(newer).order_by(field, 'id')[:limit])
+    if sources:
+        rows = _merge(rows, sources, position, limit, field, descending=False)
+    return KeysetPage(rows[:per_page][::-1], field, has_next=True, has_previous=len(rows) > per_page)
@@ -0,0 +1,328 @@
+# timetracker/rollups.py
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils.timezone import localtime
+from core.versions import bump_on_commit
+from core.workspace import get_workspace_timezone
+from .models import DailyTimeRollup, TimeEntry
+
+AMOUNT_PRECISION = Decimal('0.0001')
+
+# Data version of the rollup table; results cached from it are keyed on it
+ROLLUP_VERSION = 'rollups'
+
+# Per-month data versions of the time entries themselves, e.g. 'time-entries:2025-02'
+ENTRY_MONTH_VERSION = 'time-entries:{:%Y-%m}'
+
+
+def entry_amount(seconds, hourly_rate, billable):
+    """Billable amount of a single entry, rounded the same way everywhere"""
+    if not billable:
+        return Decimal('0')
+    return (Decimal(seconds) * Decimal(str(hourly_rate)) / 3600).quantize(AMOUNT_PRECISION)
+
+
+def _fk(value):
+    # Views assign raw POST values to *_id fields, so normalise before keying
+    return int(value) if value not in (None, '') else None
+
+
+def entry_contribution(time_entry):
+    """
+    Return what a time entry contributes to the rollup table.
+
+    Running and soft-deleted entries do not count, so None is returned for them.
+    Otherwise the result is a (key, seconds, amount) tuple where key is
+    (day, project_id, task_id, billable) and day is the start date in the
+    workspace timezone.
+    """
+    if time_entry is None or time_entry.deleted or not time_entry.end_time or not time_entry.start_time:
+        return None
+
+    seconds = time_entry.compute_duration_seconds()
+    key = (
+        localtime(time_entry.start_time, get_workspace_timezone()).date(),
+        _fk(time_entry.project_id),
+        _fk(time_entry.task_id),
+        bool(time_entry.billable),
+    )
+    return key, seconds, entry_amount(seconds, time_entry.hourly_rate, time_entry.billable)
+
+
+def rollups_changed():
+    """Bump the rollup data version once the current transaction commits"""
+    bump_on_commit(ROLLUP_VERSION)
+
+
+def month_versions(first_day, last_day):
+    """Data version names of the months from first_day to last_day inclusive"""
+    month = first_day.replace(day=1)
+    names = []
+    while month <= last_day:
+        names.append(ENTRY_MONTH_VERSION.format(month))
+        month = (month + timedelta(days=31)).replace(day=1)
+    return names
+
+
+def entries_changed(*contributions):
+    """
+    Bump the data versions of the months the given entry contributions can
+    touch once the current transaction commits. An entry ends at most
+    seconds // 86400 + 2 local days after its start day, allowing for a DST
+    change along the way.
+    """
+    names = set()
+    for contribution in contributions:
+        if contribution:
+            (day, *_), seconds, _ = contribution
+            names.update(month_versions(day, day + timedelta(days=seconds // 86400 + 2)))
+    for name in sorted(names):
+        bump_on_commit(name)
+
+
+def _increment(lookup, seconds, count, amount):
+    return DailyTimeRollup.objects.filter(**lookup).update(
+        tracked_seconds=F('tracked_seconds') + seconds,
+        entry_count=F('entry_count') + count,
+        billable_amount=F('billable_amount') + amount,
+    )
+
+
+def _apply(key, seconds, count, amount):
+    day, project_id, task_id, billable = key
+    lookup = {'day': day, 'project_id': project_id, 'task_id': task_id, 'billable': billable}
+
+    if _increment(lookup, seconds, count, amount):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyTimeRollup.objects.create(
+                tracked_seconds=seconds, entry_count=count, billable_amount=amount, **lookup
+            )
+    except IntegrityError:
+        # Another request created the row first; fold our delta into it
+        _increment(lookup, seconds, count, amount)
+
+
+def apply_rollup_change(previous, current):
+    """
+    Move a time entry's contribution from `previous` to `current`.
+
+    Both arguments are results of entry_contribution() (or None), captured
+    before and after the entry was changed.
+    """
+    # Contributions have no time of day: an entry moved within its day still changed
+    entries_changed(previous, current)
+    if previous == current:
+        return
+
+    rollups_changed()
+    # Both halves of a move commit together; callers' own transactions need no extra savepoint
+    with transaction.atomic(savepoint=False):
+        if previous and current and previous[0] == current[0]:
+            key, seconds, amount = current
+            _apply(key, seconds - previous[1], 0, amount - previous[2])
+            return
+
+        if previous:
+            key, seconds, amount = previous
+            _apply(key, -seconds, -1, -amount)
+        if current:
+            key, seconds, amount = current
+            _apply(key, seconds, 1, amount)
+
+
+# The fields entry_contribution() reads
+CONTRIBUTION_FIELDS = ('deleted', 'start_time', 'end_time', 'project_id', 'task_id', 'billable', 'hourly_rate')
+
+
+def entry_state(time_entry):
+    """Capture the fields a time entry's contribution depends on, before changing it"""
+    return {field: getattr(time_entry, field) for field in CONTRIBUTION_FIELDS}
+
+
+def save_entry_change(time_entry, state):
+    """
+    Save a changed time entry and move its rollup contribution, as long as
+    its row still holds `state` (from entry_state() before the change).
+
+    The save is a single UPDATE conditional on that state, so when two
+    requests change the same entry at once only the first one matches and
+    keeps its delta; the other's writes roll back and it gets False back.
+    """
+    previous = entry_contribution(TimeEntry(**state))
+    time_entry.duration_seconds = time_entry.compute_duration_seconds()
+    fields = {
+        field.attname: getattr(time_entry, field.attname)
+        for field in TimeEntry._meta.concrete_fields if not field.primary_key
+    }
+    # The entry and its rollups commit or roll back together, in a savepoint
+    # of their own so a constraint violation leaves the caller's usable. The
+    # rollups are written first: the entry row is the contended one, so it is
+    # locked only for the end of the transaction.
+    with transaction.atomic():
+        apply_rollup_change(previous, entry_contribution(time_entry))
+        updated = TimeEntry.objects.filter(pk=time_entry.pk, **state).update(**fields)
+        if not updated:
+            transaction.set_rollback(True)
+    return bool(updated)
+
+
+def add_to_rollups(time_entry):
+    """Record a newly created time entry in the rollup table"""
+    apply_rollup_change(None, entry_contribution(time_entry))
+
+
+def _increment_many(changes):
+    """
+    Apply (seconds, count, amount, rollup_id) increments with one prepared
+    UPDATE; building a queryset update per row costs more than running it.
+    """
+    if not changes:
+        return
+    table = connection.ops.quote_name(DailyTimeRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET tracked_seconds = tracked_seconds + %s, "
+            f"entry_count = entry_count + %s, billable_amount = billable_amount + %s WHERE id = %s",
+            changes,
+        )
+
+
+def add_many_to_rollups(time_entries, batch_size=1000):
+    """
+    Record many newly created time entries, e.g. from an import.
+
+    Contributions are summed per rollup key and added with _add_totals().
+    """
+    totals = {}
+    contributions = []
+    for time_entry in time_entries:
+        contribution = entry_contribution(time_entry)
+        if contribution:
+            contributions.append(contribution)
+            key, seconds, amount = contribution
+            row = totals.setdefault(key, [0, 0, Decimal('0')])
+            row[0] += seconds
+            row[1] += 1
+            row[2] += amount
+    if not totals:
+        return
+
+    rollups_changed()
+    entries_changed(*contributions)
+    _add_totals(totals, batch_size)
+
+
+def _add_totals(totals, batch_size=1000):
+    """
+    Add {key: [seconds, count, amount]} totals to the rollup table: existing
+    rows are read in one query and incremented with one prepared UPDATE, and
+    missing rows are bulk created; if another writer creates one of them
+    first, the keys fall back to the one-by-one path.
+    """
+    days = [key[0] for key in totals]
+    with transaction.atomic():
+        existing = {
+            (day, project_id, task_id, billable): pk
+            for pk, day, project_id, task_id, billable in DailyTimeRollup.objects.filter(
+                day__gte=min(days), day__lte=max(days)
+            ).values_list('id', 'day', 'project_id', 'task_id', 'billable')
+            if (day, project_id, task_id, billable) in totals
+        }
+        _increment_many([(*totals[key], pk) for key, pk in existing.items()])
+
+        missing = {key: row for key, row in totals.items() if key not in existing}
+        try:
+            with transaction.atomic():
+                DailyTimeRollup.objects.bulk_create([
+                    DailyTimeRollup(
+                        day=day, project_id=project_id, task_id=task_id, billable=billable,
+                        tracked_seconds=seconds, entry_count=count, billable_amount=amount,
+                    )
+                    for (day, project_id, task_id, billable), (seconds, count, amount) in missing.items()
+                ], batch_size=batch_size)
+        except IntegrityError:
+            for key, (seconds, count, amount) in missing.items():
+                _apply(key, seconds, count, amount)
+
+
+def merge_task_rollups(sender, instance, **kwargs):
+    """
+    pre_delete receiver for Task: the task's entries lose their task, so its
+    rollup rows are folded into the matching rows without one rather than
+    left behind as duplicates of them.
+    """
+    rows = DailyTimeRollup.objects.filter(task=instance)
+    totals = {}
+    for day, project_id, billable, seconds, count, amount in rows.values_list(
+        'day', 'project_id', 'billable', 'tracked_seconds', 'entry_count', 'billable_amount'
+    ):
+        row = totals.setdefault((day, project_id, None, billable), [0, 0, Decimal('0')])
+        row[0] += seconds
+        row[1] += count
+        row[2] += amount
+    if not totals:
+        return
+
+    rollups_changed()
+    with transaction.atomic():
+        rows.delete()
+        _add_totals(totals)
+
+
+def remove_from_rollups(time_entry):
+    """Remove a time entry that is about to be deleted from the rollup table"""
+    apply_rollup_change(entry_contribution(time_entry), None)
+
+
+def rebuild_rollups(chunk_size=5000, batch_size=1000):
+    """
+    Rebuild the rollup table from scratch.
+
+    Entries are streamed in primary key order, chunk_size rows at a time, and
+    accumulated in memory per rollup key; the rollup table itself stays small.
+    Returns a (entries_scanned, rollup_rows) tuple.
+    """
+    totals = {}
+    scanned = 0
+    last_pk = 0
+    completed = TimeEntry.objects.filter(end_time__isnull=False, deleted=False).order_by('pk')
+    tz = get_workspace_timezone()
+
+    while True:
+        chunk = list(
+            completed.filter(pk__gt=last_pk).values_list(
+                'pk', 'start_time', 'duration_seconds', 'project_id', 'task_id', 'billable', 'hourly_rate'
+            )[:chunk_size]
+        )
+        if not chunk:
+            break
+
+        for pk, start_time, seconds, project_id, task_id, billable, hourly_rate in chunk:
+            key = (localtime(start_time, tz).date(), project_id, task_id, billable)
+            row = totals.setdefault(key, [0, 0, Decimal('0')])
+            row[0] += seconds
+            row[1] += 1
+            row[2] += entry_amount(seconds, hourly_rate, billable)
+
+        scanned += len(chunk)
+        last_pk = chunk[-1][0]
+
+    rollups = [
+        DailyTimeRollup(
+            day=day, project_id=project_id, task_id=task_id, billable=billable,
+            tracked_seconds=seconds, entry_count=count, billable_amount=amount,
+        )
+        for (day, project_id, task_id, billable), (seconds, count, amount) in totals.items()
+    ]
+
+    rollups_changed()
+    with transaction.atomic():
+        DailyTimeRollup.objects.all().delete()
+        DailyTimeRollup.objects.bulk_create(rollups, batch_size=batch_size)
+
+    return scanned, len(rollups)
@@ -0,0 +1,64 @@
+# timetracker/stats.py
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils.timezone import localtime, now
+from core.workspace import get_workspace_timezone
+from timetracker.models import TimeEntry
+from projects.models import Project
+
+
+def billable_amount():
+    """Expression for the billable amount (duration x hourly rate) of an entry"""
+    return ExpressionWrapper(
+        F('duration_seconds') * F('hourly_rate') / 3600,
+        output_field=DecimalField(max_digits=14, decimal_places=4),
+    )
+
+
+def get_period_bounds(reference=None):
+    """Return the (today_start, week_start) datetimes in the workspace timezone"""
+    local_now = localtime(reference or now(), get_workspace_timezone())
+    today_start = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=today_start.weekday())
+    return today_start, week_start
+
+
+def _hours(seconds):
+    return seconds / 3600 if seconds else 0
+
+
+def get_dashboard_stats():
+    """
+    Compute the dashboard statistics shared by the home and tracker pages.
+
+    All time entry totals come from a single conditional aggregate over the
+    stored duration_seconds column, plus a count of active projects.
+    """
+    today_start, week_start = get_period_bounds()
+    completed = TimeEntry.objects.filter(end_time__isnull=False, deleted=False)
+
+    today = Q(start_time__gte=today_start, start_time__lt=today_start + timedelta(days=1))
+    week = Q(start_time__gte=week_start)
+    week_billable = week & Q(billable=True)
+
+    totals = completed.aggregate(
+        today_seconds=Sum('duration_seconds', filter=today),
+        today_count=Count('id', filter=today),
+        week_seconds=Sum('duration_seconds', filter=week),
+        week_count=Count('id', filter=week),
+        week_billable_seconds=Sum('duration_seconds', filter=week_billable),
+        week_billable_amount=Sum(billable_amount(), filter=week_billable),
+        total_count=Count('id'),
+    )
+
+    return {
+        'today_hours': _hours(totals['today_seconds']),
+        'today_entries_count': totals['today_count'],
+        'week_hours': _hours(totals['week_seconds']),
+        'week_entries_count': totals['week_count'],
+        'week_billable_hours': _hours(totals['week_billable_seconds']),
+        'week_billable_amount': (totals['week_billable_amount'] or Decimal('0')).quantize(Decimal('0.01')),
+        'total_entries_count': totals['total_count'],
+        'active_projects_count': Project.objects.filter(archived=False).count(),
+    }
@@ -1,3 +1,1423 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client as TestClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from core.models import Client, Workspace
+from core.workspace import clear_workspace_cache, get_workspace_timezone
+from projects.models import Project, Task
+from timetracker.audit import (
+    BufferedAuditSink, OnCommitAuditSink, clear_actor_cache, compact_audit_history, expand_audit_history,
+    get_actor_choices, get_audit_sink, rebuild_actor_index,
+)
+from timetracker.archive import Segment, archive_horizon, archive_month, archive_source, closed_months, list_segments
+from timetracker.exports import ExportFilters, export_lines
+from timetracker.imports import TimeEntryImporter, read_rows
+from timetracker.overlaps import find_overlaps, overlapping_pairs, sweep_overlaps
+from timetracker.models import AuditLogActor, DailyTimeRollup, TimeEntry, TimeEntryAuditLog
+from timetracker.pagination import NEXT, keyset_paginate
+from timetracker import rollups
+from timetracker.rollups import (
+    add_to_rollups, apply_rollup_change, entry_contribution, entry_state, rebuild_rollups, remove_from_rollups,
+    save_entry_change,
+)
+from timetracker.stats import get_dashboard_stats, get_period_bounds
+from timetracker.utils import log_bulk_action, log_time_entry_action, serialize_time_entry
 
-# Create your tests here.
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class TimeEntryIndexTests(TestCase):
+    """The hot TimeEntry querysets must be served by an index, not a table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        project = Project.objects.create(client=client, name="Project")
+
+        start = now()
+        entries = []
+        for i in range(1, 2000):
+            entry_start = start - timedelta(hours=i)
+            entries.append(TimeEntry(
+                project=project,
+                start_time=entry_start,
+                end_time=entry_start + timedelta(minutes=30),
+                deleted=i % 10 == 0,
+                deleted_at=start if i % 10 == 0 else None,
+            ))
+        entries.append(TimeEntry(project=project, start_time=start))
+        TimeEntry.objects.bulk_create(entries)
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        table = TimeEntry._meta.db_table
+        for line in plan.splitlines():
+            if table in line:
+                self.assertIn("INDEX", line, f"Full table scan in plan:\n{plan}")
+
+    def test_running_timer_lookup(self):
+        self.assertUsesIndex(TimeEntry.objects.filter(end_time__isnull=True, deleted=False)[:1])
+
+    def test_recent_entries(self):
+        self.assertUsesIndex(
+            TimeEntry.objects.filter(end_time__isnull=False, deleted=False).order_by('-start_time')[:20]
+        )
+        self.assertUsesIndex(TimeEntry.objects.filter(deleted=False).order_by('-start_time')[:5])
+
+    def test_date_range_filters(self):
+        today_start, week_start = get_period_bounds()
+        completed = TimeEntry.objects.filter(end_time__isnull=False, deleted=False)
+        self.assertUsesIndex(completed.filter(start_time__gte=week_start))
+        self.assertUsesIndex(completed.filter(
+            start_time__gte=today_start, start_time__lt=today_start + timedelta(days=1)
+        ))
+
+    def test_overlap_range(self):
+        start = now() - timedelta(hours=5)
+        self.assertUsesIndex(TimeEntry.objects.filter(
+            deleted=False, end_time__gt=start,
+            start_time__gte=start - timedelta(hours=1), start_time__lt=start + timedelta(hours=1),
+        ))
+
+    def test_deleted_entries_ordering(self):
+        self.assertUsesIndex(TimeEntry.objects.filter(deleted=True).order_by('-deleted_at'))
+
+
+class DashboardStatsTests(TestCase):
+    # Wednesday noon in New York; the local day starts at 05:00 UTC
+    NOW = datetime(2025, 1, 15, 17, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.workspace = Workspace.objects.create(name="Workspace", timezone="America/New_York")
+        client = Client.objects.create(workspace=cls.workspace, name="Client")
+        project = Project.objects.create(client=client, name="Website")
+        Project.objects.create(client=client, name="Old site", archived=True)
+
+        def entry(start, minutes, rate, billable=True, **fields):
+            start = datetime.fromisoformat(start).replace(tzinfo=dt_timezone.utc)
+            TimeEntry.objects.create(
+                project=project, start_time=start, end_time=start + timedelta(minutes=minutes),
+                hourly_rate=rate, billable=billable, **fields
+            )
+
+        entry('2025-01-15 04:30', 60, '60.00')  # Tuesday 23:30 locally: this week, not today
+        entry('2025-01-15 05:00', 30, '40.00')  # today, from local midnight
+        entry('2025-01-15 14:00', 120, '100.00', billable=False)
+        entry('2025-01-13 04:59', 60, '50.00')  # Sunday 23:59 locally: last week
+        entry('2025-01-13 05:00', 15, '20.00')  # Monday, from local midnight
+        entry('2025-01-15 15:00', 60, '10.00', deleted=True)
+        TimeEntry.objects.create(project=project, start_time=cls.NOW - timedelta(minutes=5))
+
+    def setUp(self):
+        clear_workspace_cache()
+        self.addCleanup(clear_workspace_cache)
+
+    def stats(self):
+        with mock.patch('timetracker.stats.now', return_value=self.NOW):
+            return get_dashboard_stats()
+
+    def per_entry_stats(self):
+        """The totals the views summed entry by entry before get_dashboard_stats(), in UTC days"""
+        today = self.NOW.date()
+        week_start = today - timedelta(days=today.weekday())
+        completed = TimeEntry.objects.filter(end_time__isnull=False, deleted=False)
+        today_entries = completed.filter(start_time__date=today)
+        week_entries = completed.filter(start_time__date__gte=week_start)
+        billable = [entry for entry in week_entries if entry.billable]
+
+        def hours(entries):
+            return sum((entry.end_time - entry.start_time).total_seconds() for entry in entries) / 3600
+
+        return {
+            'today_hours': hours(today_entries),
+            'today_entries_count': today_entries.count(),
+            'week_hours': hours(week_entries),
+            'week_entries_count': week_entries.count(),
+            'week_billable_hours': hours(billable),
+            'week_billable_amount': sum(
+                Decimal(str((entry.end_time - entry.start_time).total_seconds())) * entry.hourly_rate / 3600
+                for entry in billable
+            ).quantize(Decimal('0.01')),
+            'total_entries_count': completed.count(),
+            'active_projects_count': Project.objects.filter(archived=False).count(),
+        }
+
+    def test_totals_follow_the_workspace_day_and_week(self):
+        self.assertEqual(self.stats(), {
+            'today_hours': 2.5,
+            'today_entries_count': 2,
+            'week_hours': 3.75,
+            'week_entries_count': 4,
+            'week_billable_hours': 1.75,
+            'week_billable_amount': Decimal('85.00'),
+            'total_entries_count': 5,
+            'active_projects_count': 1,
+        })
+
+    def test_matches_per_entry_totals_in_utc(self):
+        self.workspace.timezone = "UTC"
+        self.workspace.save()
+        expected = self.per_entry_stats()
+        # In UTC the boundary entries swap sides: 04:30 is today, 04:59 Monday is this week
+        self.assertEqual((expected['today_entries_count'], expected['week_entries_count']), (3, 5))
+        self.assertEqual(self.stats(), expected)
+
+
+class SingleRunningTimerTests(TransactionTestCase):
+    """Concurrent start/stop requests must never leave two timers running"""
+
+    THREADS = 8
+    ITERATIONS = 15
+
+    def setUp(self):
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        self.project = Project.objects.create(client=client, name="Project")
+
+    def test_constraint_rejects_second_running_timer(self):
+        TimeEntry.objects.create(start_time=now())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TimeEntry.objects.create(start_time=now())
+
+    def test_continue_is_rejected_while_timer_runs(self):
+        done = TimeEntry.objects.create(project=self.project, start_time=now(), end_time=now())
+        self.client.post(reverse('start_timer'))
+        response = self.client.post(reverse('continue_entry', args=[done.pk]), follow=True)
+
+        self.assertContains(response, "Please stop your current timer")
+        self.assertEqual(TimeEntry.objects.filter(end_time__isnull=True, deleted=False).count(), 1)
+
+    def test_concurrent_start_stop(self):
+        barrier = threading.Barrier(self.THREADS)
+        max_running = []
+        errors = []
+
+        def hammer():
+            client = TestClient()
+            try:
+                barrier.wait()
+                for _ in range(self.ITERATIONS):
+                    self._retry(client.post, reverse('start_timer'))
+                    running = self._retry(list, TimeEntry.objects.filter(end_time__isnull=True, deleted=False))
+                    max_running.append(len(running))
+                    for entry in running:
+                        self._retry(client.post, reverse('stop_timer', args=[entry.pk]),
+                                    {'project': self.project.pk})
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=hammer) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(max(max_running), 1)
+        self.assertLessEqual(TimeEntry.objects.filter(end_time__isnull=True, deleted=False).count(), 1)
+        self.assertGreater(TimeEntry.objects.filter(end_time__isnull=False).count(), 0)
+
+    @staticmethod
+    def _retry(method, *args):
+        # SQLite reports lock contention between threads as OperationalError;
+        # a retried request can collide again, so allow a couple of seconds
+        for _ in range(200):
+            try:
+                return method(*args)
+            except OperationalError:
+                time.sleep(0.01)
+        raise AssertionError("database stayed locked")
+
+
+class QueryCountTests(TestCase):
+    """Every view runs a fixed number of queries, whatever the amount of data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("auditor", password="secret")
+        cls.workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+
+    def seed(self, count):
+        """Add `count` projects, each with a task, entries and audit logs"""
+        client = Client.objects.create(workspace=self.workspace, name=f"Client {count}")
+        start = now() - timedelta(days=1)
+        for i in range(count):
+            project = Project.objects.create(client=client, name=f"Project {count}-{i}")
+            task = Task.objects.create(project=project, name=f"Task {count}-{i}")
+            for deleted in (False, True):
+                entry = TimeEntry.objects.create(
+                    project=project, task=task, description="Work",
+                    start_time=start - timedelta(hours=i), end_time=start - timedelta(hours=i) + timedelta(minutes=30),
+                    deleted=deleted, deleted_at=now() if deleted else None,
+                )
+                TimeEntryAuditLog.objects.create(
+                    time_entry=entry, action='CREATE', user=self.user,
+                    current_values=serialize_time_entry(entry),
+                )
+        self.project, self.task = project, task
+        self.size = count
+
+    def completed_entry(self):
+        # Each dataset size gets its own day, so entries of both runs never overlap
+        entry = TimeEntry.objects.create(
+            project=self.project, task=self.task,
+            start_time=now() - timedelta(days=self.size, hours=2), end_time=now() - timedelta(days=self.size, hours=1),
+        )
+        add_to_rollups(entry)
+        return entry
+
+    def running_entry(self):
+        TimeEntry.objects.filter(end_time__isnull=True).delete()
+        return TimeEntry.objects.create(project=self.project, task=self.task, start_time=now())
+
+    def deleted_entry(self):
+        entry = self.completed_entry()
+        remove_from_rollups(entry)
+        entry.deleted = True
+        entry.save()
+        return entry
+
+    def assertQueryBudget(self, budget, request, prepare=None):
+        """
+        Run `request` on a small and a larger dataset; both must use `budget` queries.
+
+        Budgets of views that write audit records include the actor index
+        insert: a TestCase never commits, so the pair is never cached.
+        """
+        for size in (2, 20):
+            self.seed(size)
+            argument = prepare() if prepare else None
+            cache.clear()  # measure with cold fragments
+            # and a warm workspace cache, checked against the cleared version
+            # so a version check during the request finds nothing new
+            clear_workspace_cache()
+            get_workspace_timezone()
+            with self.subTest(size=size), self.assertNumQueries(budget):
+                response = request(argument) if prepare else request()
+            self.assertLess(response.status_code, 400)
+
+    def test_home(self):
+        self.assertQueryBudget(7, lambda _: self.client.get(reverse('home')), self.running_entry)
+
+    def test_tracker_home(self):
+        self.assertQueryBudget(7, lambda _: self.client.get(reverse('tracker_home')), self.running_entry)
+
+    def test_deleted_entries(self):
+        self.assertQueryBudget(1, lambda: self.client.get(reverse('deleted_entries')))
+
+    def test_audit_logs(self):
+        self.assertQueryBudget(2, lambda: self.client.get(reverse('audit_logs')))
+
+    def test_edit_entry_form(self):
+        self.assertQueryBudget(
+            3, lambda entry: self.client.get(reverse('edit_entry', args=[entry.pk])), self.completed_entry
+        )
+
+    def test_task_dropdowns(self):
+        self.assertQueryBudget(
+            1, lambda: self.client.get(reverse('tasks_by_project'), {'project': self.project.pk})
+        )
+        self.assertQueryBudget(
+            1, lambda: self.client.get(reverse('tasks_by_project_edit'), {'project': self.project.pk})
+        )
+
+    def test_start_timer(self):
+        self.assertQueryBudget(
+            6, lambda _: self.client.post(reverse('start_timer')),
+            lambda: TimeEntry.objects.filter(end_time__isnull=True).delete(),
+        )
+
+    def test_stop_timer(self):
+        self.assertQueryBudget(
+            12, lambda entry: self.client.post(reverse('stop_timer', args=[entry.pk]), {'project': self.project.pk}),
+            self.running_entry,
+        )
+
+    def test_discard_timer(self):
+        self.assertQueryBudget(
+            6, lambda entry: self.client.post(reverse('discard_timer', args=[entry.pk])), self.running_entry
+        )
+
+    def test_continue_entry(self):
+        def prepare():
+            TimeEntry.objects.filter(end_time__isnull=True).delete()
+            return self.completed_entry()
+
+        self.assertQueryBudget(
+            7, lambda entry: self.client.post(reverse('continue_entry', args=[entry.pk])), prepare
+        )
+
+    def test_duplicate_entry(self):
+        self.assertQueryBudget(
+            9, lambda entry: self.client.post(reverse('duplicate_entry', args=[entry.pk])), self.completed_entry
+        )
+
+    def test_edit_entry(self):
+        def data():
+            day = f'2025-01-{self.size:02d}'
+            return {
+                'start_date': day, 'start_time': '09:00', 'end_date': day, 'end_time': '10:30',
+                'billable': 'on', 'hourly_rate': '20', 'project': self.project.pk,
+            }
+
+        self.assertQueryBudget(
+            16, lambda entry: self.client.post(reverse('edit_entry', args=[entry.pk]), data()), self.completed_entry,
+        )
+
+    def test_delete_and_restore_entry(self):
+        self.assertQueryBudget(
+            8, lambda entry: self.client.post(reverse('delete_entry', args=[entry.pk])), self.completed_entry
+        )
+        self.assertQueryBudget(
+            8, lambda entry: self.client.post(reverse('restore_entry', args=[entry.pk])), self.deleted_entry
+        )
+
+    def test_submit_manual_entry(self):
+        self.assertQueryBudget(15, lambda: self.client.post(reverse('submit_manual_entry'), {
+            'project': self.project.pk, 'task': self.task.pk, 'description': 'Manual',
+            'start_time': f'2025-01-{self.size:02d} 10:00', 'end_time': f'2025-01-{self.size:02d} 12:00',
+            'billable': 'on', 'hourly_rate': '30',
+        }))
+
+    def test_ajax_add_project_and_task(self):
+        self.assertQueryBudget(2, lambda: self.client.post(
+            reverse('ajax_add_project'), {'name': 'New', 'client_id': self.project.client_id}
+        ))
+        self.assertQueryBudget(2, lambda: self.client.post(
+            reverse('ajax_add_task'), {'name': 'New', 'project_id': str(self.project.pk)}
+        ))
+
+
+class AuditSinkTests(TransactionTestCase):
+    def setUp(self):
+        clear_actor_cache()  # the flush between tests bypasses its invalidation
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        self.project = Project.objects.create(client=client, name="Project")
+        self.entries = [
+            TimeEntry.objects.create(project=self.project, start_time=now(), end_time=now())
+            for _ in range(5)
+        ]
+
+    def records(self):
+        return [TimeEntryAuditLog(time_entry=entry, action='UPDATE') for entry in self.entries]
+
+    def test_on_commit_sink_inserts_once_at_commit(self):
+        sink = OnCommitAuditSink()
+        with transaction.atomic():
+            for record in self.records():
+                sink.write(record)
+            self.assertEqual(TimeEntryAuditLog.objects.count(), 0)
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 5)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            sink.write(self.records()[0])
+            raise RuntimeError("rolled back")
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 5)
+
+        # The rolled back batch is dropped; the next transaction gets its own
+        with transaction.atomic():
+            sink.write(self.records()[1])
+            sink.write(self.records()[2])
+            self.assertEqual(TimeEntryAuditLog.objects.count(), 5)
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 7)
+        sink.write(self.records()[3])
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 8)
+
+    def test_on_commit_sink_drops_records_of_rolled_back_savepoints(self):
+        sink = OnCommitAuditSink()
+        records = self.records()
+        with transaction.atomic():
+            sink.write(records[0])
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                sink.write(records[1])
+                with transaction.atomic():
+                    sink.write(records[2])
+                raise RuntimeError("rolled back")
+            with transaction.atomic():
+                sink.write(records[3])
+            sink.write(records[4])
+        self.assertEqual(
+            set(TimeEntryAuditLog.objects.values_list('time_entry_id', flat=True)),
+            {self.entries[0].pk, self.entries[3].pk, self.entries[4].pk},
+        )
+
+    def test_buffered_sink_flushes_on_size_and_close(self):
+        sink = BufferedAuditSink(batch_size=5, flush_interval=60)
+        try:
+            for record in self.records():
+                sink.write(record)
+            for _ in range(100):
+                if TimeEntryAuditLog.objects.count() == 5:
+                    break
+                time.sleep(0.02)
+            self.assertEqual(TimeEntryAuditLog.objects.count(), 5)
+
+            sink.write(self.records()[0])
+        finally:
+            sink.close()
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 6)
+
+    def test_records_for_deleted_entries_are_dropped(self):
+        sink = BufferedAuditSink(batch_size=100, flush_interval=60)
+        records = self.records()
+        for record in records:
+            sink.write(record)
+        self.entries[0].delete()
+        sink.close()
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 4)
+
+    @override_settings(AUDIT_LOG_MODE='on_commit')
+    def test_views_use_configured_sink(self):
+        self.assertIsInstance(get_audit_sink(), OnCommitAuditSink)
+        self.client.post(reverse('delete_entry', args=[self.entries[0].pk]))
+        self.assertEqual(TimeEntryAuditLog.objects.filter(action='DELETE').count(), 1)
+
+    def test_log_bulk_action_uses_constant_queries(self):
+        request = RequestFactory().post('/tracker/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+
+        # One SELECT for the entries with their project and task, one for the
+        # latest audit snapshots, then a single INSERT and the actor index
+        # insert wrapped in BEGIN/COMMIT
+        with self.assertNumQueries(6):
+            logs = log_bulk_action(request, TimeEntry.objects.all(), 'UPDATE', notes="Bulk")
+        self.assertEqual(len(logs), 5)
+        self.assertEqual(
+            set(TimeEntryAuditLog.objects.values_list('time_entry_id', flat=True)),
+            {entry.pk for entry in self.entries},
+        )
+
+        # Entries that already carry their project are not fetched again, and
+        # the committed actor pair is cached
+        with self.assertNumQueries(4):
+            log_bulk_action(request, self.entries, 'UPDATE')
+
+
+class CompactAuditStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        cls.project = Project.objects.create(client=client, name="Project")
+
+    def setUp(self):
+        self.request = RequestFactory().post('/tracker/')
+        self.request.user = AnonymousUser()
+        self.request.session = SessionStore()
+        self.entry = TimeEntry.objects.create(project=self.project, start_time=now(), end_time=now())
+
+    def edit(self, count):
+        """Change the description `count` times, logging each change; returns the expected states"""
+        states = []
+        for i in range(count):
+            previous = serialize_time_entry(self.entry)
+            self.entry.description = f"Edit {i}"
+            self.entry.save()
+            log_time_entry_action(self.request, self.entry, 'UPDATE', previous_values=previous)
+            states.append((previous, serialize_time_entry(self.entry)))
+        return states
+
+    def assertStates(self, states):
+        logs = TimeEntryAuditLog.objects.filter(time_entry=self.entry).select_related('snapshot').order_by('id')
+        self.assertEqual([(log.get_previous_values(), log.get_current_values()) for log in logs], states)
+        for log in logs:
+            self.assertEqual(log.get_changed_fields(), ['description'])
+
+    @override_settings(AUDIT_LOG_SNAPSHOT_INTERVAL=3)
+    def test_records_store_changes_and_periodic_snapshots(self):
+        states = self.edit(9)
+
+        logs = list(TimeEntryAuditLog.objects.filter(time_entry=self.entry).order_by('id'))
+        self.assertEqual([log.snapshot_id is None for log in logs], [True, False, False, False] * 2 + [True])
+        self.assertEqual(logs[1].current_values, {'description': "Edit 1"})
+        self.assertEqual(logs[1].previous_values, {'description': "Edit 0"})
+        self.assertStates(states)
+
+    @override_settings(AUDIT_LOG_STORAGE='full')
+    def test_existing_records_are_compacted_and_expanded(self):
+        states = self.edit(5)
+        self.assertFalse(TimeEntryAuditLog.objects.filter(snapshot__isnull=False).exists())
+
+        rewritten, before, after = compact_audit_history(chunk_size=1, snapshot_interval=2)
+        self.assertEqual(rewritten, 5)
+        self.assertLess(after, before)
+        self.assertEqual(TimeEntryAuditLog.objects.filter(snapshot__isnull=True).count(), 2)
+        self.assertStates(states)
+        self.assertEqual(compact_audit_history(snapshot_interval=2)[0], 0)
+
+        rewritten, before, after = expand_audit_history(chunk_size=2)
+        self.assertEqual(rewritten, 5)
+        self.assertGreater(after, before)
+        self.assertFalse(TimeEntryAuditLog.objects.filter(snapshot__isnull=False).exists())
+        self.assertStates(states)
+
+
+class AuditLogPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="America/New_York")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        project = Project.objects.create(client=client, name="Project")
+        cls.entry = TimeEntry.objects.create(project=project, start_time=now(), end_time=now())
+        cls.user = User.objects.create_user("auditor")
+
+        # Groups of three records share a timestamp so the id tiebreak matters
+        start = datetime(2025, 3, 1, tzinfo=dt_timezone.utc)
+        TimeEntryAuditLog.objects.bulk_create(
+            TimeEntryAuditLog(
+                time_entry=cls.entry, action='UPDATE' if i % 2 else 'CREATE',
+                user=cls.user if i % 3 else None, timestamp=start + timedelta(hours=i // 3),
+            )
+            for i in range(50)
+        )
+
+    def walk(self, queryset, per_page):
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(queryset, cursor, per_page=per_page)
+            pages.append([log.pk for log in page])
+            if not page.has_next():
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_cursors_walk_every_record_once_in_both_directions(self):
+        logs = TimeEntryAuditLog.objects.all()
+        expected = list(logs.order_by('-timestamp', '-id').values_list('pk', flat=True))
+
+        pages, last = self.walk(logs, per_page=7)
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertTrue(all(len(page) == 7 for page in pages[:-1]))
+
+        backwards, page = [], last
+        while page.has_previous():
+            page = keyset_paginate(logs, page.previous_cursor, per_page=7)
+            backwards.append([log.pk for log in page])
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_invalid_cursor_returns_first_page(self):
+        first = [log.pk for log in keyset_paginate(TimeEntryAuditLog.objects.all(), per_page=5)]
+        for cursor in ("garbage", "W10", "WyJ4IiwgMSwgMl0"):
+            page = keyset_paginate(TimeEntryAuditLog.objects.all(), cursor, per_page=5)
+            self.assertEqual([log.pk for log in page], first)
+            self.assertFalse(page.has_previous())
+
+    def test_date_filters_use_workspace_days(self):
+        TimeEntryAuditLog.objects.all().delete()
+        # 2025-03-09 starts at 05:00 UTC in New York
+        before, inside, after = TimeEntryAuditLog.objects.bulk_create(
+            TimeEntryAuditLog(time_entry=self.entry, action='UPDATE', timestamp=timestamp)
+            for timestamp in (
+                datetime(2025, 3, 9, 4, 59, tzinfo=dt_timezone.utc),
+                datetime(2025, 3, 9, 5, 0, tzinfo=dt_timezone.utc),
+                datetime(2025, 3, 10, 4, 0, tzinfo=dt_timezone.utc),
+            )
+        )
+        response = self.client.get(reverse('audit_logs'), {'date_from': '2025-03-09', 'date_to': '2025-03-09'})
+        self.assertEqual([log.pk for log in response.context['page_obj']], [inside.pk])
+
+        response = self.client.get(reverse('audit_logs'), {'date_from': 'not-a-date', 'date_to': '2025-02-30'})
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+    @skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+    def test_filter_combinations_use_indexes(self):
+        page = keyset_paginate(TimeEntryAuditLog.objects.all(), per_page=5)
+        logs = TimeEntryAuditLog.objects.filter(timestamp__gte=now() - timedelta(days=30))
+        cases = [
+            (logs, 'auditlog_timestamp_idx'),
+            (logs.filter(action='UPDATE'), 'auditlog_action_ts_idx'),
+            (logs.filter(user=self.user), 'auditlog_user_ts_idx'),
+            (logs.filter(user=self.user, action='UPDATE'), 'auditlog_user_action_ts_idx'),
+        ]
+        for queryset, index in cases:
+            with self.subTest(index=index):
+                queryset = queryset.filter(timestamp__lte=page.object_list[-1].timestamp).order_by('-timestamp', '-id')
+                self.assertIn(index, queryset[:51].explain())
+
+
+class AuditArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        project = Project.objects.create(client=client, name="Project")
+        cls.entry = TimeEntry.objects.create(project=project, start_time=now(), end_time=now())
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def setUp(self):
+        cache.clear()
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        settings = override_settings(AUDIT_ARCHIVE_DIR=archive_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        request = RequestFactory().post('/tracker/')
+        request.user = self.admin
+        request.session = SessionStore()
+        self.logs = []
+        for i in range(3):
+            previous = serialize_time_entry(self.entry)
+            self.entry.description = f"Edit {i}"
+            self.entry.save()
+            self.logs.append(log_time_entry_action(request, self.entry, 'UPDATE', previous, notes=f"Edit {i}"))
+        self.states = [(log.get_previous_values(), log.get_current_values()) for log in self.logs]
+
+        # The snapshot and first delta fall in a closed month, the last delta stays live
+        january = datetime(2025, 1, 15, tzinfo=dt_timezone.utc)
+        for offset, log in enumerate(self.logs[:2]):
+            TimeEntryAuditLog.objects.filter(pk=log.pk).update(timestamp=january + timedelta(hours=offset))
+
+    def archive(self):
+        results = [archive_month(*month) for month in closed_months()]
+        return [result for result in results if result != (0, None, 0)]
+
+    def test_closed_months_are_archived_and_read_through(self):
+        (archived, segment, deleted), = self.archive()
+        self.assertEqual((archived, deleted), (2, 2))
+        self.assertEqual(segment.name, 'audit-2025-01-0001.jsonl.gz')
+
+        live = TimeEntryAuditLog.objects.get()
+        self.assertIsNone(live.snapshot_id)
+        self.assertEqual((live.get_previous_values(), live.get_current_values()), self.states[2])
+
+        response = self.client.get(reverse('audit_logs'))
+        self.assertEqual([log.pk for log in response.context['page_obj']], [self.logs[2].pk])
+
+        response = self.client.get(reverse('audit_logs'), {'date_from': '2025-01-01', 'user': self.admin.pk})
+        page = list(response.context['page_obj'])
+        self.assertEqual([log.pk for log in page], [log.pk for log in reversed(self.logs)])
+        self.assertEqual([log.archived for log in page], [False, True, True])
+        self.assertEqual([(log.get_previous_values(), log.get_current_values()) for log in page], self.states[::-1])
+        self.assertContains(response, "Archived")
+
+        self.client.force_login(self.admin)
+        url = reverse('admin:timetracker_timeentryauditlog_change', args=[self.logs[0].pk])
+        response = self.client.get(url)
+        self.assertContains(response, "Edit 0")
+        self.assertNotContains(response, 'name="_save"')
+
+    def test_late_records_get_a_new_segment(self):
+        self.archive()
+        TimeEntryAuditLog.objects.filter(pk=self.logs[2].pk).update(timestamp=datetime(2025, 1, 20, tzinfo=dt_timezone.utc))
+        (archived, segment, deleted), = self.archive()
+        self.assertEqual(segment.name, 'audit-2025-01-0002.jsonl.gz')
+        self.assertEqual([segment.count for segment in list_segments()], [2, 1])
+        self.assertFalse(TimeEntryAuditLog.objects.exists())
+
+    def test_pages_only_read_the_segments_they_need(self):
+        for month in (2, 3, 4):
+            for day in (1, 2, 3):
+                TimeEntryAuditLog.objects.create(
+                    time_entry=self.entry, action='UPDATE', user=self.admin,
+                    current_values=serialize_time_entry(self.entry),
+                    timestamp=datetime(2025, month, day, tzinfo=dt_timezone.utc),
+                )
+        self.assertIsNone(archive_horizon())
+        self.archive()
+        self.assertEqual(archive_horizon(), datetime(2025, 4, 3, tzinfo=dt_timezone.utc))
+        expected = sorted(
+            (log for segment in list_segments() for log in segment.records()),
+            key=lambda log: (log.timestamp, log.pk), reverse=True,
+        )
+
+        live = TimeEntryAuditLog.objects.filter(timestamp__lt=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        source = archive_source(start=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        with mock.patch.object(Segment, 'records', autospec=True, side_effect=Segment.records) as records:
+            page = keyset_paginate(live, per_page=2, sources=[source])
+        # April alone holds the first page and one more record
+        self.assertEqual(records.call_count, 1)
+
+        pages = [list(page)]
+        while page.has_next():
+            page = keyset_paginate(live, page.next_cursor, per_page=2, sources=[source])
+            pages.append(list(page))
+        self.assertEqual([log.pk for log in sum(pages, [])], [log.pk for log in expected])
+        page = keyset_paginate(live, page.previous_cursor, per_page=2, sources=[source])
+        self.assertEqual(list(page), pages[-2])
+        self.assertEqual(source((NEXT, expected[-1].timestamp, expected[-1].pk), 3), [])
+
+    def test_interrupted_run_only_deletes_on_retry(self):
+        with mock.patch('timetracker.archive._delete_live', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self.archive()
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 3)
+
+        (archived, segment, deleted), = self.archive()
+        self.assertEqual((archived, segment, deleted), (0, None, 2))
+        self.assertEqual(len(list_segments()), 1)
+        self.assertEqual(TimeEntryAuditLog.objects.count(), 1)
+
+
+class AuditActorIndexTests(TransactionTestCase):
+    def setUp(self):
+        clear_actor_cache()
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Client")
+        self.project = Project.objects.create(client=client, name="Project")
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+    def test_index_follows_writes_and_feeds_the_filters(self):
+        self.client.post(reverse('start_timer'))
+        self.client.force_login(self.user)
+        entry = TimeEntry.objects.get()
+        self.client.post(reverse('stop_timer', args=[entry.pk]), {'project': self.project.pk})
+
+        self.assertEqual(
+            set(AuditLogActor.objects.values_list('user__username', 'action')),
+            {(None, 'START_TIMER'), ('admin', 'STOP_TIMER')},
+        )
+        users, actions = get_actor_choices()
+        self.assertEqual(users, [self.user])
+        self.assertEqual(actions, [('START_TIMER', 'Started Timer'), ('STOP_TIMER', 'Stopped Timer')])
+
+        # The filters read the index only, however large the log grows
+        with self.assertNumQueries(1):
+            get_actor_choices()
+
+        response = self.client.get(reverse('admin:timetracker_timeentryauditlog_changelist'))
+        self.assertContains(response, 'data-name="action" value="STOP_TIMER"')
+        self.assertNotContains(response, 'data-name="action" value="DUPLICATE"')
+        self.assertContains(response, f'data-name="user" value="{self.user.pk}"')
+
+        # A rebuild restores a cleared table
+        AuditLogActor.objects.all().delete()
+        self.assertEqual(rebuild_actor_index(), 2)
+        self.assertEqual(AuditLogActor.objects.count(), 2)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        acme = Client.objects.create(workspace=workspace, name="Acme")
+        globex = Client.objects.create(workspace=workspace, name="Globex")
+        cls.website = Project.objects.create(client=acme, name="Website")
+        cls.app = Project.objects.create(client=globex, name="App")
+        cls.design = Task.objects.create(project=cls.website, name="Design")
+        cls.staff = User.objects.create_superuser("admin", "admin@example.com", "password")
+
+        # 2025-01-01 starts at 2024-12-31 23:00 UTC in Berlin
+        start = datetime(2024, 12, 31, 23, 0, tzinfo=dt_timezone.utc)
+        for i in range(12):
+            entry = TimeEntry.objects.create(
+                project=cls.website if i % 2 else cls.app, task=cls.design if i % 2 else None,
+                description=f"Work {i}", start_time=start + timedelta(days=i),
+                end_time=start + timedelta(days=i, minutes=90), billable=i % 3 != 0, hourly_rate=40,
+            )
+        TimeEntry.objects.create(project=cls.website, start_time=start, end_time=start, deleted=True)
+        TimeEntry.objects.create(project=cls.website, start_time=start)
+        cls.last_entry = entry
+
+    def export(self, kind, fmt, chunk_size=5, **filters):
+        return ''.join(export_lines(kind, ExportFilters(**filters), fmt, chunk_size=chunk_size))
+
+    def test_time_entry_csv_uses_workspace_time_and_names(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('time_entries', 'csv'))))
+        self.assertEqual(len(rows), 12)
+        first, second = rows[0], rows[1]
+        self.assertEqual(first['date'], '2025-01-01')
+        self.assertEqual(first['start_time'], '2025-01-01T00:00:00+01:00')
+        self.assertEqual((first['client'], first['project'], first['task']), ('Globex', 'App', ''))
+        self.assertEqual((second['client'], second['project'], second['task']), ('Acme', 'Website', 'Design'))
+        self.assertEqual((second['hours'], second['amount']), ('1.5', '60.0000'))
+
+    def test_filters(self):
+        def ids(**filters):
+            return [json.loads(line)['id'] for line in self.export('time_entries', 'jsonl', **filters).splitlines()]
+
+        self.assertEqual(len(ids(date_from='2025-01-03', date_to='2025-01-04')), 2)
+        self.assertEqual(len(ids(project=self.website.pk)), 6)
+        self.assertEqual(len(ids(client=self.app.client_id, billable='false')), 2)
+        with self.assertRaises(ValueError):
+            ExportFilters(billable='maybe')
+
+    def test_queries_do_not_grow_with_rows(self):
+        # One query for the rows, then one per related model for the names
+        with self.assertNumQueries(4):
+            self.export('time_entries', 'csv', chunk_size=2)
+
+    def test_audit_log_jsonl_has_full_values(self):
+        request = RequestFactory().post('/tracker/')
+        request.user = self.staff
+        request.session = SessionStore()
+        entry = self.last_entry
+        for description in ("First", "Second"):
+            previous = serialize_time_entry(entry)
+            entry.description = description
+            entry.save()
+            log_time_entry_action(request, entry, 'UPDATE', previous_values=previous)
+
+        rows = [json.loads(line) for line in self.export('audit_logs', 'jsonl', project=self.website.pk).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]['current_values'], serialize_time_entry(entry))
+        self.assertEqual(rows[1]['previous_values']['description'], "First")
+        self.assertEqual(rows[1]['changed_fields'], ['description'])
+        self.assertEqual((rows[1]['user'], rows[1]['client']), ('admin', 'Acme'))
+
+    def test_endpoints_stream_for_staff_only(self):
+        url = reverse('export_time_entries', args=['csv'])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'billable': 'true'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 9)
+
+        self.assertEqual(self.client.get(url, {'date_from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_audit_logs', args=['xml'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_audit_logs', args=['jsonl'])).status_code, 200)
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="Europe/Berlin")
+        acme = Client.objects.create(workspace=workspace, name="Acme")
+        cls.website = Project.objects.create(client=acme, name="Website")
+        cls.design = Task.objects.create(project=cls.website, name="Design")
+
+    def test_command_resolves_names_and_reports_rejects(self):
+        rows = [
+            ['client', 'project', 'task', 'description', 'start_time', 'end_time', 'billable', 'hourly_rate'],
+            ['acme', 'Website', 'design', 'Existing names', '2025-01-01 09:00', '2025-01-01 10:30', 'true', '40'],
+            ['Globex', 'App', 'Backend', 'New names', '2025-01-02T09:00:00+00:00', '2025-01-02T10:00:00+00:00', 'no', ''],
+            ['Globex', 'App', 'Backend', 'Same new names', '2025-01-03 09:00', '2025-01-03 09:30', '', '10'],
+            ['', 'Website', '', 'Project by name', '2025-01-03 12:00', '2025-01-03 13:00', '1', '40'],
+            ['Acme', 'Website', '', 'Backwards', '2025-01-04 10:00', '2025-01-04 09:00', '', ''],
+            ['Acme', 'Website', '', 'Running', '2025-01-04 10:00', '', '', ''],
+            ['Acme', '', '', 'No project', '2025-01-04 10:00', '2025-01-04 11:00', '', ''],
+            ['Acme', 'Website', '', 'Bad rate', '2025-01-04 10:00', '2025-01-04 11:00', '', 'lots'],
+            ['', 'Unknown', '', 'No client', '2025-01-04 10:00', '2025-01-04 11:00', '', ''],
+            ['Initech', 'Portal', 'Frontend', 'Bad billable', '2025-01-04 10:00', '2025-01-04 11:00', 'maybe', ''],
+        ]
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path, rejects = f'{directory}/entries.csv', f'{directory}/rejects.csv'
+        with open(path, 'w', newline='') as output:
+            csv.writer(output).writerows(rows)
+
+        stdout = io.StringIO()
+        call_command('import_time_entries', path, batch_size=2, chunk_size=3, rejects=rejects,
+                     stdout=stdout, stderr=io.StringIO())
+
+        self.assertIn("Imported 4 time entries, rejected 6 rows", stdout.getvalue())
+        self.assertEqual(Client.objects.filter(name="Globex").count(), 1)
+        self.assertEqual(Task.objects.filter(name="Backend").count(), 1)
+        # Rejected rows create no names
+        self.assertFalse(Client.objects.filter(name="Initech").exists())
+        self.assertFalse(Project.objects.filter(name__in=["Portal", "Unknown"]).exists())
+
+        first = TimeEntry.objects.get(description="Existing names")
+        self.assertEqual((first.project, first.task), (self.website, self.design))
+        self.assertEqual(first.start_time, datetime(2025, 1, 1, 8, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(first.duration_seconds, 5400)
+        self.assertFalse(TimeEntry.objects.get(description="New names").billable)
+
+        self.assertEqual(TimeEntryAuditLog.objects.filter(action='CREATE').count(), 4)
+        self.assertEqual(TimeEntryAuditLog.objects.first().notes, f"Imported from {path}")
+        self.assertEqual(sum(DailyTimeRollup.objects.values_list('entry_count', flat=True)), 4)
+
+        with open(rejects, newline='') as reject_file:
+            reasons = {row['line']: row['reason'] for row in csv.DictReader(reject_file)}
+        self.assertEqual(reasons, {
+            '6': 'end_time is not after start_time',
+            '7': 'missing end_time',
+            '8': 'missing project',
+            '9': 'invalid hourly_rate',
+            '10': 'unknown project and no client given',
+            '11': 'invalid billable',
+        })
+
+    def test_export_imports_back_in_batched_queries(self):
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        for i in range(30):
+            TimeEntry.objects.create(project=self.website, task=self.design, description=f"Work {i}",
+                                     start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=45),
+                                     hourly_rate=40)
+        rebuild_rollups()
+        lines = ''.join(export_lines('time_entries', ExportFilters(), 'jsonl')).splitlines(keepends=True)
+        lines.append('not json\n')
+
+        importer = TimeEntryImporter(batch_size=10, chunk_size=100)
+        with CaptureQueriesContext(connection) as queries:
+            importer.run(read_rows(io.StringIO(''.join(lines)), 'jsonl'))
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        # 3 name lookups, then per batch of 10 an entry insert, a compaction
+        # lookup, an audit insert and an actor index insert (cached once the
+        # chunk commits, which TestCase never does); rollups read the existing
+        # rows once and increment them with one prepared UPDATE
+        self.assertEqual(len(statements), 3 + 3 * 4 + 2)
+
+        self.assertEqual((importer.imported, importer.rejected), (30, 1))
+        self.assertEqual(importer.reasons, {'invalid JSON': 1})
+        self.assertEqual(TimeEntry.objects.filter(description="Work 7").count(), 2)
+        self.assertEqual(sum(DailyTimeRollup.objects.values_list('tracked_seconds', flat=True)), 2 * 30 * 45 * 60)
+        self.assertEqual(DailyTimeRollup.objects.count(), 2)
+
+
+class OverlapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="UTC")
+        client = Client.objects.create(workspace=workspace, name="Acme")
+        cls.project = Project.objects.create(client=client, name="Website")
+        cls.start = datetime(2025, 3, 3, 9, 0, tzinfo=dt_timezone.utc)
+
+    def entry(self, start_hours, end_hours, **fields):
+        return TimeEntry.objects.create(
+            project=self.project, start_time=self.start + timedelta(hours=start_hours),
+            end_time=self.start + timedelta(hours=end_hours) if end_hours is not None else None, **fields
+        )
+
+    def candidate(self, start_hours, end_hours):
+        return TimeEntry(start_time=self.start + timedelta(hours=start_hours),
+                         end_time=self.start + timedelta(hours=end_hours))
+
+    def test_single_save_lookup(self):
+        long_entry = self.entry(-10, 1)
+        morning = self.entry(0, 2)
+        self.entry(2, 3)
+        self.entry(0, 1, deleted=True)
+
+        self.assertEqual(find_overlaps(self.candidate(1.5, 2)), [morning])
+        self.assertEqual(find_overlaps(self.candidate(0.5, 1.5)), [long_entry, morning])
+        self.assertEqual(find_overlaps(self.candidate(3, 4)), [])  # touching is fine
+        self.assertEqual(find_overlaps(morning), [long_entry])
+
+        running = self.entry(5, None)
+        self.assertEqual(find_overlaps(self.candidate(6, 7)), [running])
+        self.assertEqual(find_overlaps(self.candidate(4, 5)), [])
+
+        # Longest duration, the range and the running timer
+        with self.assertNumQueries(3):
+            find_overlaps(self.candidate(1, 2))
+
+    def test_save_paths_reject_overlaps(self):
+        original = self.entry(0, 2)
+        self.client.post(reverse('submit_manual_entry'), {
+            'project': self.project.pk, 'start_time': '2025-03-03 10:00', 'end_time': '2025-03-03 12:00',
+            'hourly_rate': '0',
+        })
+        self.assertEqual(TimeEntry.objects.count(), 1)
+
+        self.client.post(reverse('duplicate_entry', args=[original.pk]))
+        copy = TimeEntry.objects.exclude(pk=original.pk).get()
+        self.assertEqual((copy.start_time, copy.end_time), (original.end_time, original.end_time + timedelta(hours=2)))
+
+        response = self.client.post(reverse('edit_entry', args=[copy.pk]), {
+            'project': self.project.pk, 'start_date': '2025-03-03', 'start_time': '10:30',
+            'end_date': '2025-03-03', 'end_time': '11:30', 'hourly_rate': '0',
+        }, follow=True)
+        self.assertIn("overlaps existing time", [str(message) for message in response.context['messages']][0])
+        copy.refresh_from_db()
+        self.assertEqual(copy.start_time, original.end_time)
+
+        # A second copy would start where the first one already is
+        self.client.post(reverse('duplicate_entry', args=[original.pk]))
+        self.assertEqual(TimeEntry.objects.count(), 2)
+
+    def test_sweep_matches_brute_force_and_command(self):
+        generator = random.Random(7)
+        for _ in range(60):
+            begin = generator.randrange(0, 96) / 4
+            self.entry(begin, begin + generator.randrange(1, 12) / 4)
+
+        rows = list(TimeEntry.objects.order_by('start_time', 'id').values_list('id', 'start_time', 'end_time'))
+        expected = {
+            frozenset((a[0], b[0])) for i, a in enumerate(rows) for b in rows[i + 1:] if a[1] < b[2] and b[1] < a[2]
+        }
+        found = [frozenset((a[0], b[0])) for a, b in overlapping_pairs(chunk_size=7)]
+        self.assertEqual(len(found), len(expected))
+        self.assertEqual(set(found), expected)
+        self.assertEqual(list(sweep_overlaps([(1, 0, 2), (2, 2, 3), (3, 2, 2)])), [])
+
+        stdout = io.StringIO()
+        call_command('find_overlapping_entries', date_from='2025-03-03', date_to='2025-03-03', stdout=stdout)
+        self.assertIn("overlapping pairs", stdout.getvalue())
+        self.assertEqual(len(stdout.getvalue().splitlines()) - 1, sum(
+            1 for a, b in overlapping_pairs(*ExportFilters(date_from='2025-03-03', date_to='2025-03-03').range())
+        ))
+
+
+    def test_range_includes_entries_running_into_it(self):
+        started_before = self.entry(-10, 1)
+        inside = self.entry(0.5, 2)
+        # A pair overlapping before the range, one ending as it starts and a pair overlapping after it
+        for start_hours, end_hours in ((-5, -3), (-4, -2), (-1, 0), (3, 6), (5, 7)):
+            self.entry(start_hours, end_hours)
+
+        pairs = overlapping_pairs(self.start, self.start + timedelta(hours=4))
+        self.assertEqual([(earlier[0], later[0]) for earlier, later in pairs], [(started_before.pk, inside.pk)])
+
+class TaskDropdownCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(workspace=Workspace.objects.create(name="Workspace", timezone="UTC"), name="Client")
+        cls.website = Project.objects.create(client=client, name="Website")
+        cls.app = Project.objects.create(client=client, name="App")
+        cls.design = Task.objects.create(project=cls.website, name="Design")
+        cls.build = Task.objects.create(project=cls.app, name="Build")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name='tasks_by_project', project=None, **headers):
+        return self.client.get(reverse(name), {'project': (project or self.website).pk}, headers=headers)
+
+    def test_cached_and_revalidated_with_etags(self):
+        response = self.get()
+        self.assertContains(response, "Design")
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().content, response.content)
+            revalidated = self.get(if_none_match=etag)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+        # A task in another project leaves this one's options alone
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.app, name="Deploy")
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.website, name="Copy")
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Copy")
+
+    def test_moved_task_refreshes_both_projects(self):
+        app_etag = self.get(project=self.app)['ETag']
+        website_etag = self.get()['ETag']
+        task = Task.objects.get(pk=self.build.pk)
+        task.project = self.website
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertNotContains(self.get(project=self.app, if_none_match=app_etag), "Build")
+        self.assertContains(self.get(if_none_match=website_etag), "Build")
+
+    def test_edit_dropdown_per_selection(self):
+        response = self.client.get(reverse('tasks_by_project_edit'), {
+            'project': self.website.pk, 'selected_task_id': self.design.pk,
+        })
+        self.assertContains(response, "selected")
+        unselected = self.client.get(reverse('tasks_by_project_edit'), {'project': self.website.pk})
+        self.assertNotContains(unselected, "selected")
+        self.assertNotEqual(unselected['ETag'], response['ETag'])
+        self.assertEqual(self.client.get(reverse('tasks_by_project'), {'project': 'new'}).status_code, 200)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = Client.objects.create(workspace=Workspace.objects.create(name="Workspace", timezone="UTC"), name="Client")
+        cls.project = Project.objects.create(client=client, name="Website")
+        cls.start = datetime(2025, 3, 3, 9, tzinfo=dt_timezone.utc)
+
+    def entry(self, hours, **fields):
+        entry = TimeEntry.objects.create(
+            project=self.project, start_time=self.start, end_time=self.start + timedelta(hours=hours), **fields
+        )
+        add_to_rollups(entry)
+        return entry
+
+    def assertMatchesEntries(self):
+        live = TimeEntry.objects.filter(end_time__isnull=False, deleted=False)
+        self.assertEqual(
+            sum(DailyTimeRollup.objects.values_list('tracked_seconds', flat=True)),
+            sum(live.values_list('duration_seconds', flat=True)),
+        )
+
+    def test_deleted_task_merges_into_rows_without_a_task(self):
+        untasked = self.entry(1)
+        self.entry(2, task=Task.objects.create(project=self.project, name="Design"))
+        Task.objects.get().delete()
+        self.assertEqual(DailyTimeRollup.objects.count(), 1)
+        self.assertEqual(DailyTimeRollup.objects.get().entry_count, 2)
+
+        previous = entry_contribution(untasked)
+        untasked.end_time += timedelta(hours=1)
+        untasked.save()
+        apply_rollup_change(previous, entry_contribution(untasked))
+        self.assertEqual(DailyTimeRollup.objects.count(), 1)
+        self.assertMatchesEntries()
+
+        Task.objects.create(project=self.project, name="Build")
+        self.entry(1, task=Task.objects.get())
+        self.project.delete()
+        self.assertFalse(DailyTimeRollup.objects.exists())
+
+    def test_keys_with_nulls_are_unique(self):
+        self.entry(1)
+        for project, task in ((self.project, None), (None, None)):
+            DailyTimeRollup.objects.create(day=self.start.date(), project=project, task=task, billable=False)
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                DailyTimeRollup.objects.create(day=self.start.date(), project=project, task=task, billable=False)
+
+    def test_concurrent_stops_count_once(self):
+        running = TimeEntry.objects.create(project=self.project, start_time=self.start, hourly_rate='25.50')
+        first, second = TimeEntry.objects.get(pk=running.pk), TimeEntry.objects.get(pk=running.pk)
+        states = [entry_state(first), entry_state(second)]
+        first.end_time = self.start + timedelta(hours=1)
+        second.end_time = self.start + timedelta(hours=2)
+        self.assertTrue(save_entry_change(first, states[0]))
+        self.assertFalse(save_entry_change(second, states[1]))
+        self.assertEqual(TimeEntry.objects.get().duration_seconds, 3600)
+        self.assertMatchesEntries()
+
+        response = self.client.post(reverse('stop_timer', args=[running.pk]), {'project': self.project.pk})
+        self.assertRedirects(response, reverse('tracker_home'), fetch_redirect_response=False)
+        self.assertMatchesEntries()
+
+    def rollup_rows(self):
+        """Rows by key; incremental maintenance can leave emptied rows that a rebuild drops"""
+        return {
+            (row.day, row.project_id, row.task_id, row.billable): (row.tracked_seconds, row.entry_count, row.billable_amount)
+            for row in DailyTimeRollup.objects.all()
+            if (row.tracked_seconds, row.entry_count, row.billable_amount) != (0, 0, 0)
+        }
+
+    def test_views_and_admin_match_a_rebuild(self):
+        task = Task.objects.create(project=self.project, name="Design")
+        self.client.post(reverse('start_timer'))
+        running = TimeEntry.objects.get(end_time__isnull=True)
+        self.client.post(reverse('stop_timer', args=[running.pk]), {'project': self.project.pk, 'task': task.pk})
+        self.client.post(reverse('submit_manual_entry'), {
+            'project': self.project.pk, 'start_time': '2025-03-03 09:00', 'end_time': '2025-03-03 11:30',
+            'billable': 'on', 'hourly_rate': '40',
+        })
+        manual = TimeEntry.objects.get(start_time=self.start)
+        self.client.post(reverse('edit_entry', args=[manual.pk]), {
+            'project': self.project.pk, 'task': task.pk, 'start_date': '2025-03-04', 'start_time': '23:00',
+            'end_date': '2025-03-05', 'end_time': '01:15', 'billable': 'on', 'hourly_rate': '55.50',
+        })
+        self.client.post(reverse('duplicate_entry', args=[manual.pk]))
+        self.client.post(reverse('delete_entry', args=[running.pk]))
+        self.client.post(reverse('restore_entry', args=[running.pk]))
+        self.client.post(reverse('delete_entry', args=[manual.pk]))
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        fields = {
+            'project': self.project.pk, 'description': "Admin", 'start_time_0': '2025-03-06', 'start_time_1': '08:00',
+            'end_time_0': '2025-03-06', 'end_time_1': '12:00', 'billable': 'on', 'hourly_rate': '30',
+        }
+        self.client.post(reverse('admin:timetracker_timeentry_add'), fields)
+        added = TimeEntry.objects.get(description="Admin")
+        self.client.post(reverse('admin:timetracker_timeentry_change', args=[added.pk]), {
+            **fields, 'task': task.pk, 'end_time_0': '2025-03-07', 'end_time_1': '09:00', 'hourly_rate': '35',
+        })
+        for description, day in (("Removed", '2025-03-08'), ("Bulk removed", '2025-03-09')):
+            self.client.post(reverse('admin:timetracker_timeentry_add'), {
+                **fields, 'description': description, 'start_time_0': day, 'end_time_0': day,
+            })
+        removed, bulk_removed = TimeEntry.objects.filter(description__endswith="emoved").order_by('pk')
+        self.client.post(reverse('admin:timetracker_timeentry_delete', args=[removed.pk]), {'post': 'yes'})
+        # Entries with audit records cannot be deleted in the admin, so this one has none
+        self.client.post(reverse('admin:timetracker_timeentry_changelist'), {
+            'action': 'delete_selected', 'index': 0, 'post': 'yes', '_selected_action': [bulk_removed.pk],
+        })
+
+        # The manual entry is soft deleted; the timer, duplicate and admin entry remain
+        self.assertEqual(TimeEntry.objects.filter(deleted=False).count(), 3)
+        self.assertFalse(TimeEntry.objects.filter(pk__in=[removed.pk, bulk_removed.pk]).exists())
+        incremental = self.rollup_rows()
+        self.assertEqual(len(incremental), 3)
+        rebuild_rollups()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_failed_rollup_write_leaves_the_entry_unchanged(self):
+        entry = self.entry(1)
+        state = entry_state(entry)
+        entry.start_time += timedelta(days=1)
+        entry.end_time += timedelta(days=1)
+
+        increment = rollups._increment
+        calls = []
+
+        def fail_second_increment(*args):
+            # The old day's row is decremented, then writing the new day's fails
+            calls.append(args)
+            if len(calls) == 2:
+                raise OperationalError("database is locked")
+            return increment(*args)
+
+        with mock.patch('timetracker.rollups._increment', side_effect=fail_second_increment):
+            with self.assertRaises(OperationalError):
+                save_entry_change(entry, state)
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.start_time, self.start)
+        self.assertEqual(DailyTimeRollup.objects.get().day, self.start.date())
+        self.assertMatchesEntries()
+
+
+class DaylightSavingDurationTests(TestCase):
+    """Durations are elapsed time, also for entries entered across a DST change"""
+
+    # (start, end) in New York wall-clock time and the elapsed seconds between them
+    SPRING_FORWARD = ('2024-03-10 01:00', '2024-03-10 04:00', 7200)
+    # Forms reject the repeated 01:00-02:00 hour as ambiguous, so start before it
+    FALL_BACK = ('2024-11-03 00:30', '2024-11-03 03:00', 12600)
+
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="America/New_York")
+        cls.project = Project.objects.create(client=Client.objects.create(workspace=workspace, name="Client"), name="Website")
+
+    def assertDuration(self, entry, seconds):
+        entry.refresh_from_db()
+        self.assertEqual(entry.duration_seconds, seconds)
+        self.assertEqual((entry.end_time - entry.start_time).total_seconds(), seconds)
+        self.assertEqual(sum(DailyTimeRollup.objects.values_list('tracked_seconds', flat=True)), seconds)
+
+    def test_manual_entries(self):
+        for start, end, seconds in (self.SPRING_FORWARD, self.FALL_BACK):
+            DailyTimeRollup.objects.all().delete()
+            self.client.post(reverse('submit_manual_entry'), {
+                'project': self.project.pk, 'start_time': start, 'end_time': end, 'hourly_rate': '0',
+            })
+            self.assertDuration(TimeEntry.objects.get(start_time__date=start[:10]), seconds)
+
+    def test_edited_entries(self):
+        for start, end, seconds in (self.SPRING_FORWARD, self.FALL_BACK):
+            DailyTimeRollup.objects.all().delete()
+            day = datetime.fromisoformat(start[:10]).replace(tzinfo=dt_timezone.utc)
+            entry = TimeEntry.objects.create(project=self.project, start_time=day, end_time=day + timedelta(hours=1))
+            add_to_rollups(entry)
+            self.client.post(reverse('edit_entry', args=[entry.pk]), {
+                'project': self.project.pk, 'start_date': start[:10], 'start_time': start[11:],
+                'end_date': end[:10], 'end_time': end[11:], 'hourly_rate': '0',
+            })
+            self.assertDuration(entry, seconds)
+            entry.delete()
+
+    def test_imported_entries(self):
+        for start, end, seconds in (self.SPRING_FORWARD, self.FALL_BACK):
+            DailyTimeRollup.objects.all().delete()
+            TimeEntryImporter().run([(2, {'project': 'Website', 'start_time': start, 'end_time': end})])
+            self.assertDuration(TimeEntry.objects.get(start_time__date=start[:10]), seconds)
+
+    def utc_entry(self, start, end, **fields):
+        start, end = (
+            datetime.fromisoformat(value).replace(tzinfo=ZoneInfo("America/New_York")).astimezone(dt_timezone.utc)
+            for value in (start, end)
+        )
+        return TimeEntry.objects.create(project=self.project, start_time=start, end_time=end, **fields)
+
+    def test_stopped_entries(self):
+        for start, end, seconds in (self.SPRING_FORWARD, self.FALL_BACK):
+            DailyTimeRollup.objects.all().delete()
+            entry = self.utc_entry(start, end)
+            stopped_at = entry.end_time
+            TimeEntry.objects.filter(pk=entry.pk).update(end_time=None, duration_seconds=0)
+            with mock.patch('timetracker.views.now', return_value=stopped_at):
+                self.client.post(reverse('stop_timer', args=[entry.pk]), {'project': self.project.pk})
+            self.assertDuration(entry, seconds)
+            entry.delete()
+
+    def test_duplicated_entries(self):
+        for start, end, seconds in (self.SPRING_FORWARD, self.FALL_BACK):
+            DailyTimeRollup.objects.all().delete()
+            original = self.utc_entry(start, end)
+            self.client.post(reverse('duplicate_entry', args=[original.pk]))
+            self.assertDuration(TimeEntry.objects.exclude(pk=original.pk).get(), seconds)
+            TimeEntry.objects.all().delete()
+
+    def test_admin_entries(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        for start, end, seconds in (self.SPRING_FORWARD, self.FALL_BACK):
+            DailyTimeRollup.objects.all().delete()
+            self.client.post(reverse('admin:timetracker_timeentry_add'), {
+                'project': self.project.pk, 'start_time_0': start[:10], 'start_time_1': start[11:],
+                'end_time_0': end[:10], 'end_time_1': end[11:], 'hourly_rate': '0',
+            })
+            self.assertDuration(TimeEntry.objects.get(start_time__date=start[:10]), seconds)
+
+
+class DurationBackfillTests(TestCase):
+    """The migrations that fill duration_seconds for existing entries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        project = Project.objects.create(
+            client=Client.objects.create(workspace=Workspace.objects.create(name="Workspace"), name="Client"), name="Website"
+        )
+        # 01:00 to 04:00 in New York across the spring-forward change, stored in UTC
+        start = datetime(2024, 3, 10, 6, tzinfo=dt_timezone.utc)
+        cls.entries = [
+            TimeEntry.objects.create(project=project, start_time=start, end_time=start + timedelta(hours=2)),
+            TimeEntry.objects.create(project=project, start_time=start, end_time=start + timedelta(minutes=90, seconds=30)),
+            TimeEntry.objects.create(project=project, start_time=start + timedelta(hours=3)),
+        ]
+
+    def migration(self, name):
+        return import_module(f'timetracker.migrations.{name}')
+
+    def assertDurations(self, expected):
+        self.assertEqual(list(TimeEntry.objects.order_by('pk').values_list('duration_seconds', flat=True)), expected)
+
+    def test_backfill_fills_completed_entries(self):
+        TimeEntry.objects.update(duration_seconds=0)
+        self.migration('0006_backfill_duration_seconds').backfill_duration_seconds(apps, None)
+        self.assertDurations([7200, 5430, 0])
+
+    def test_recompute_fixes_durations_and_rollups(self):
+        TimeEntry.objects.filter(pk=self.entries[0].pk).update(duration_seconds=10800)
+        migration = self.migration('0019_recompute_duration_seconds')
+        migration.recompute_durations(apps, None)
+        migration.rebuild_rollups(apps, None)
+        self.assertDurations([7200, 5430, 0])
+        self.assertEqual(list(DailyTimeRollup.objects.values_list('tracked_seconds', 'entry_count')), [(12630, 2)])
+
+
+class EditEntryTimezoneTests(TestCase):
+    """edit_entry reads workspace wall-clock times and stores them in UTC"""
+
+    @classmethod
+    def setUpTestData(cls):
+        workspace = Workspace.objects.create(name="Workspace", timezone="America/New_York")
+        cls.project = Project.objects.create(client=Client.objects.create(workspace=workspace, name="Client"), name="Website")
+
+    def test_edit_across_spring_forward(self):
+        start = datetime(2024, 3, 10, tzinfo=dt_timezone.utc)
+        entry = TimeEntry.objects.create(project=self.project, start_time=start, end_time=start + timedelta(hours=1))
+        # Running the commit hooks caches the actor pair past this test's rollback
+        self.addCleanup(clear_actor_cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_entry', args=[entry.pk]), {
+                'project': self.project.pk, 'start_date': '2024-03-10', 'start_time': '01:30',
+                'end_date': '2024-03-10', 'end_time': '03:30', 'hourly_rate': '0',
+            })
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.start_time, datetime(2024, 3, 10, 6, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(entry.end_time, datetime(2024, 3, 10, 7, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(entry.duration_seconds, 3600)
+        logged = TimeEntryAuditLog.objects.get(time_entry=entry, action='UPDATE').get_current_values()
+        self.assertEqual((logged['start_time'], logged['end_time'], logged['duration_minutes']),
+                         ('2024-03-10T06:30:00+00:00', '2024-03-10T07:30:00+00:00', 60))
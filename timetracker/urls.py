@@ -14,6 +14,8 @@ urlpatterns = [
     path('restore/<int:entry_id>/', views.restore_entry, name='restore_entry'),
     path('deleted/', views.deleted_entries, name='deleted_entries'),
     path('logs/', views.audit_logs, name='audit_logs'),
+    path('export/entries.<str:fmt>', views.export_time_entries, name='export_time_entries'),
+    path('export/logs.<str:fmt>', views.export_audit_logs, name='export_audit_logs'),
     path('submit/', views.submit_manual_entry, name='submit_manual_entry'),
     path('tasks/by-project/', views.tasks_by_project, name='tasks_by_project'),
     path('tasks/by-project-edit/', views.tasks_by_project_edit, name='tasks_by_project_edit'),
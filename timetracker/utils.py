@@ -1,6 +1,8 @@
 # timetracker/utils.py
 from django.contrib.auth.models import User
+from django.db.models import QuerySet, prefetch_related_objects
 from .models import TimeEntryAuditLog
+from .audit import get_audit_sink
 import json
 
 
@@ -19,13 +21,29 @@ def get_user_agent(request):
     return request.META.get('HTTP_USER_AGENT', '')
 
 
+def get_request_metadata(request):
+    """
+    Collect the request details stored on every audit log record; request is
+    None for changes made outside a request, e.g. by a management command
+    """
+    if request is None:
+        return {'user': None, 'ip_address': None, 'user_agent': '', 'session_key': ''}
+    return {
+        # Get user (handle anonymous users)
+        'user': request.user if request.user.is_authenticated else None,
+        'ip_address': get_client_ip(request),
+        'user_agent': get_user_agent(request),
+        'session_key': request.session.session_key or '',
+    }
+
+
 def serialize_time_entry(time_entry):
     """Serialize time entry data for logging"""
     return {
         'id': time_entry.id,
-        'project_id': time_entry.project.id if time_entry.project else None,
+        'project_id': time_entry.project_id,
         'project_name': time_entry.project.name if time_entry.project else None,
-        'task_id': time_entry.task.id if time_entry.task else None,
+        'task_id': time_entry.task_id,
         'task_name': time_entry.task.name if time_entry.task else None,
         'description': time_entry.description,
         'start_time': time_entry.start_time.isoformat() if time_entry.start_time else None,
@@ -49,32 +67,55 @@ def log_time_entry_action(request, time_entry, action, previous_values=None, not
         previous_values: Previous state of the time entry (for updates)
         notes: Additional notes about the action
     """
-    # Get user (handle anonymous users)
-    user = request.user if request.user.is_authenticated else None
-
     # Get current state
     current_values = serialize_time_entry(time_entry)
 
-    # Create audit log entry
-    audit_log = TimeEntryAuditLog.objects.create(
+    # Create audit log entry; the configured sink decides when it is written
+    audit_log = TimeEntryAuditLog(
         time_entry=time_entry,
         action=action,
-        user=user,
-        ip_address=get_client_ip(request),
-        user_agent=get_user_agent(request),
-        session_key=request.session.session_key or '',
         previous_values=previous_values,
         current_values=current_values,
-        notes=notes
+        notes=notes,
+        **get_request_metadata(request)
     )
 
-    return audit_log
+    return get_audit_sink().write(audit_log)
+
+
+def log_bulk_action(request, time_entries, action, notes='', previous_values=None):
+    """
+    Log an action that affects multiple time entries
+
+    Request metadata is computed once, project and task names are loaded in
+    one query each (or joined, for a queryset), and the records are handed to
+    the audit sink together so they are written with batched bulk_create.
+
+    Args:
+        request: Django request object, or None outside a request
+        time_entries: TimeEntry queryset or iterable of instances
+        action: Action type (CREATE, UPDATE, DELETE, RESTORE, etc.)
+        notes: Additional notes, shared by every record
+        previous_values: Optional mapping of time entry id to its previous state
+    """
+    if isinstance(time_entries, QuerySet):
+        time_entries = time_entries.select_related('project', 'task')
+    else:
+        time_entries = list(time_entries)
+        prefetch_related_objects(time_entries, 'project', 'task')
 
+    metadata = get_request_metadata(request)
+    previous_values = previous_values or {}
 
-def log_bulk_action(request, time_entries, action, notes=''):
-    """Log actions that affect multiple time entries"""
-    logs = []
-    for entry in time_entries:
-        log = log_time_entry_action(request, entry, action, notes=notes)
-        logs.append(log)
-    return logs
\ No newline at end of file
+    logs = [
+        TimeEntryAuditLog(
+            time_entry=entry,
+            action=action,
+            previous_values=previous_values.get(entry.id),
+            current_values=serialize_time_entry(entry),
+            notes=notes,
+            **metadata
+        )
+        for entry in time_entries
+    ]
+    return get_audit_sink().write_many(logs)
\ No newline at end of file
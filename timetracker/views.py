@@ -1,50 +1,46 @@
 # timetracker/views.py - Enhanced version with modern statistics
 from django.shortcuts import render, redirect, get_object_or_404
-from django.utils.timezone import now
+from django.utils.dateparse import parse_date
+from django.utils.timezone import make_aware, now
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Sum, Count
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from timetracker.models import TimeEntry, TimeEntryAuditLog
 from projects.models import Project, Task
-from core.models import Client, Workspace
+from projects.tables import task_options
+from core.fragments import fragment_etag, render_cached
+from core.models import Client
+from core.workspace import get_active_workspace, get_workspace_timezone
 from timetracker.forms import ManualEntryForm, StopTimerForm
+from timetracker.archive import archive_horizon, archive_source
+from timetracker.audit import get_actor_choices
+from timetracker.exports import FORMATS, ExportFilters, export_lines
+from timetracker.overlaps import validate_no_overlap
+from timetracker.pagination import keyset_paginate
 from timetracker.utils import log_time_entry_action, serialize_time_entry
-import pytz
+from timetracker.stats import get_dashboard_stats
+from timetracker.rollups import add_to_rollups, entry_state, remove_from_rollups, save_entry_change
+
+# Shown when save_entry_change() finds the entry changed since it was read
+CHANGED_MESSAGE = "This time entry was changed at the same time by another request. Please check it and try again."
 
 
 def tracker_home(request):
     # Get current time entries
-    running_entry = TimeEntry.objects.filter(end_time__isnull=True, deleted=False).first()
-    past_entries = TimeEntry.objects.filter(end_time__isnull=False, deleted=False).order_by('-start_time')
+    entries = TimeEntry.objects.select_related('project', 'task')
+    running_entry = entries.filter(end_time__isnull=True, deleted=False).first()
+    past_entries = entries.filter(end_time__isnull=False, deleted=False).order_by('-start_time')
 
     # Calculate statistics
-    today = now().date()
-    week_start = today - timedelta(days=today.weekday())
-
-    # Today's time
-    today_entries = TimeEntry.objects.filter(
-        start_time__date=today,
-        end_time__isnull=False,
-        deleted=False
-    )
-    today_minutes = sum([(e.end_time - e.start_time).total_seconds() / 60 for e in today_entries])
-    today_hours = today_minutes / 60
-
-    # This week's time
-    week_entries = TimeEntry.objects.filter(
-        start_time__date__gte=week_start,
-        end_time__isnull=False,
-        deleted=False
-    )
-    week_minutes = sum([(e.end_time - e.start_time).total_seconds() / 60 for e in week_entries])
-    week_hours = week_minutes / 60
-
-    # Active projects count
-    active_projects = Project.objects.filter(archived=False)
-    active_projects_count = active_projects.count()
+    stats = get_dashboard_stats()
 
     # Form and data for templates
     form = ManualEntryForm()
@@ -55,8 +51,7 @@ def tracker_home(request):
     # Progress calculation for running timer
     progress_percent = 0
     if running_entry:
-        workspace = Workspace.objects.first()
-        if workspace:
+        if get_active_workspace():
             duration = (now() - running_entry.start_time).total_seconds() / 3600
             progress_percent = min(100, int((duration / 8) * 100))  # 8 hours = 100%
 
@@ -71,22 +66,24 @@ def tracker_home(request):
         'stop_form': StopTimerForm() if running_entry else None,
 
         # Enhanced statistics
-        'today_hours': today_hours,
-        'week_hours': week_hours,
-        'active_projects_count': active_projects_count,
-        'total_entries_count': past_entries.count(),
-
-        # Additional context for better UX
-        'today_entries_count': today_entries.count(),
-        'week_entries_count': week_entries.count(),
+        **stats,
     }
 
     return render(request, 'timetracker/tracker.html', context)
 
 
+def create_running_entry(**fields):
+    """Start a new timer, or return None if another timer is already running"""
+    try:
+        with transaction.atomic():
+            return TimeEntry.objects.create(start_time=now(), **fields)
+    except IntegrityError:
+        return None
+
+
 def discard_timer(request, entry_id):
     """Discard a running timer without saving it"""
-    entry = get_object_or_404(TimeEntry, pk=entry_id, end_time__isnull=True, deleted=False)
+    entry = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, end_time__isnull=True, deleted=False)
 
     if request.method == "POST":
         # Store entry info for logging before deletion
@@ -103,6 +100,7 @@ def discard_timer(request, entry_id):
         )
 
         # Permanently delete the entry (not soft delete since it was never "completed")
+        remove_from_rollups(entry)
         entry.delete()
 
         messages.info(request, f"Timer discarded. No time was saved from your {duration_minutes}-minute session.")
@@ -113,17 +111,12 @@ def discard_timer(request, entry_id):
 
 def start_timer(request):
     if request.method == "POST":
-        # Check if there's already a running timer
-        existing_timer = TimeEntry.objects.filter(end_time__isnull=True, deleted=False).first()
-        if existing_timer:
+        # The single_running_timer constraint rejects a second running timer
+        time_entry = create_running_entry(description=request.POST.get("description", ""))
+        if time_entry is None:
             messages.warning(request, "You already have a timer running. Please stop it first.")
             return redirect('tracker_home')
 
-        time_entry = TimeEntry.objects.create(
-            description=request.POST.get("description", ""),
-            start_time=now()
-        )
-
         # Log the action
         log_time_entry_action(
             request,
@@ -138,10 +131,11 @@ def start_timer(request):
 
 
 def stop_timer(request, entry_id):
-    entry = get_object_or_404(TimeEntry, pk=entry_id, deleted=False)
+    entry = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, deleted=False)
 
     # Store previous state for logging
     previous_values = serialize_time_entry(entry)
+    previous_state = entry_state(entry)
 
     if request.method == "POST":
         project_id = request.POST.get('project')
@@ -188,7 +182,9 @@ def stop_timer(request, entry_id):
         entry.task_id = task_id if task_id and task_id != 'new' else None
         entry.description = description
         entry.end_time = now()
-        entry.save()
+        if not save_entry_change(entry, previous_state):
+            messages.warning(request, CHANGED_MESSAGE)
+            return redirect('tracker_home')
 
         # Calculate duration for success message
         duration_minutes = entry.duration_minutes()
@@ -208,7 +204,9 @@ def stop_timer(request, entry_id):
 
     # Handle GET request (shouldn't happen in normal flow)
     entry.end_time = now()
-    entry.save()
+    if not save_entry_change(entry, previous_state):
+        messages.warning(request, CHANGED_MESSAGE)
+        return redirect('tracker_home')
 
     log_time_entry_action(
         request,
@@ -222,20 +220,17 @@ def stop_timer(request, entry_id):
 
 
 def continue_entry(request, entry_id):
-    old = get_object_or_404(TimeEntry, pk=entry_id, deleted=False)
+    old = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, deleted=False)
 
-    # Check if there's already a running timer
-    existing_timer = TimeEntry.objects.filter(end_time__isnull=True, deleted=False).first()
-    if existing_timer:
-        messages.warning(request, "Please stop your current timer before starting a new one.")
-        return redirect('tracker_home')
-
-    new_entry = TimeEntry.objects.create(
+    # The single_running_timer constraint rejects a second running timer
+    new_entry = create_running_entry(
         project=old.project,
         task=old.task,
         description=old.description,
-        start_time=now()
     )
+    if new_entry is None:
+        messages.warning(request, "Please stop your current timer before starting a new one.")
+        return redirect('tracker_home')
 
     # Log both the original entry reference and new entry creation
     log_time_entry_action(
@@ -250,16 +245,28 @@ def continue_entry(request, entry_id):
 
 
 def duplicate_entry(request, entry_id):
-    old = get_object_or_404(TimeEntry, pk=entry_id, deleted=False)
-    new_entry = TimeEntry.objects.create(
+    old = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, deleted=False)
+    if not old.end_time:
+        messages.error(request, "A running timer cannot be duplicated.")
+        return redirect('tracker_home')
+
+    # An exact copy would bill the same time twice, so the copy follows the original
+    new_entry = TimeEntry(
         project=old.project,
         task=old.task,
         description=old.description,
-        start_time=old.start_time,
-        end_time=old.end_time,
+        start_time=old.end_time,
+        end_time=old.end_time + (old.end_time - old.start_time),
         billable=old.billable,
         hourly_rate=old.hourly_rate
     )
+    try:
+        validate_no_overlap(new_entry)
+    except ValidationError as error:
+        messages.error(request, error.messages[0])
+        return redirect('tracker_home')
+    new_entry.save()
+    add_to_rollups(new_entry)
 
     # Log the duplication
     log_time_entry_action(
@@ -275,16 +282,19 @@ def duplicate_entry(request, entry_id):
 
 def delete_entry(request, entry_id):
     """Soft delete a time entry with comprehensive logging"""
-    entry = get_object_or_404(TimeEntry, pk=entry_id, deleted=False)
+    entry = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, deleted=False)
 
     if request.method == "POST":
         # Store previous state for logging
         previous_values = serialize_time_entry(entry)
+        previous_state = entry_state(entry)
 
         # Perform soft delete
         entry.deleted = True
         entry.deleted_at = now()
-        entry.save()
+        if not save_entry_change(entry, previous_state):
+            messages.warning(request, CHANGED_MESSAGE)
+            return redirect('tracker_home')
 
         # Log the deletion with detailed information
         log_time_entry_action(
@@ -303,16 +313,24 @@ def delete_entry(request, entry_id):
 
 def restore_entry(request, entry_id):
     """Restore a soft-deleted time entry with comprehensive logging"""
-    entry = get_object_or_404(TimeEntry, pk=entry_id, deleted=True)
+    entry = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, deleted=True)
 
     if request.method == "POST":
         # Store previous state for logging
         previous_values = serialize_time_entry(entry)
+        previous_state = entry_state(entry)
 
         # Perform restore
         entry.deleted = False
         entry.deleted_at = None
-        entry.save()
+        try:
+            saved = save_entry_change(entry, previous_state)
+        except IntegrityError:
+            messages.warning(request, "This entry is an unfinished timer and another timer is running. Stop it before restoring.")
+            return redirect('deleted_entries')
+        if not saved:
+            messages.warning(request, CHANGED_MESSAGE)
+            return redirect('deleted_entries')
 
         # Log the restoration with detailed information
         log_time_entry_action(
@@ -331,16 +349,29 @@ def restore_entry(request, entry_id):
 
 def deleted_entries(request):
     """Show all deleted entries with restore option"""
-    deleted_entries = TimeEntry.objects.filter(deleted=True).order_by('-deleted_at')
+    deleted_entries = TimeEntry.objects.filter(deleted=True).select_related('project', 'task').order_by('-deleted_at')
 
     return render(request, 'timetracker/deleted_entries.html', {
         'deleted_entries': deleted_entries,
     })
 
 
+def _parse_day(value):
+    """Parse a YYYY-MM-DD query parameter, returning None if it is missing or invalid"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _day_start(day):
+    """Start of a calendar day in the workspace timezone"""
+    return make_aware(datetime.combine(day, datetime.min.time()), get_workspace_timezone())
+
+
 def audit_logs(request):
     """Show audit logs for time entries"""
-    logs = TimeEntryAuditLog.objects.select_related('user', 'time_entry').order_by('-timestamp')
+    logs = TimeEntryAuditLog.objects.select_related('user', 'snapshot')
 
     # Filter by action if specified
     action_filter = request.GET.get('action')
@@ -352,24 +383,32 @@ def audit_logs(request):
     if user_filter:
         logs = logs.filter(user_id=user_filter)
 
-    # Filter by date range if specified
+    # Filter by date range if specified, as timestamp ranges so the indexes apply
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
-    if date_from:
-        logs = logs.filter(timestamp__date__gte=date_from)
-    if date_to:
-        logs = logs.filter(timestamp__date__lte=date_to)
-
-    # Pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(logs, 50)  # Show 50 logs per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    # Get unique users and actions for filters
-    from django.contrib.auth.models import User
-    users = User.objects.filter(timeentryauditlog__isnull=False).distinct()
-    actions = TimeEntryAuditLog.ACTION_CHOICES
+    day_from = _parse_day(date_from)
+    day_to = _parse_day(date_to)
+    if day_from:
+        logs = logs.filter(timestamp__gte=_day_start(day_from))
+    if day_to:
+        logs = logs.filter(timestamp__lt=_day_start(day_to + timedelta(days=1)))
+
+    # Read through to archived months when the date range reaches back to them
+    sources = []
+    if day_from:
+        horizon = archive_horizon()
+        if horizon and _day_start(day_from) <= horizon:
+            sources.append(archive_source(
+                action=action_filter, user_id=user_filter,
+                start=_day_start(day_from),
+                end=_day_start(day_to + timedelta(days=1)) if day_to else None,
+            ))
+
+    # Keyset pagination, 50 logs per page
+    page_obj = keyset_paginate(logs, request.GET.get('cursor'), per_page=50, sources=sources)
+
+    # Users and actions for the filters come from the maintained actor index
+    users, actions = get_actor_choices()
 
     return render(request, 'timetracker/audit_logs.html', {
         'page_obj': page_obj,
@@ -389,6 +428,7 @@ def submit_manual_entry(request):
         form = ManualEntryForm(request.POST)
         if form.is_valid():
             entry = form.save()
+            add_to_rollups(entry)
 
             # Log manual entry creation
             log_time_entry_action(
@@ -403,17 +443,19 @@ def submit_manual_entry(request):
             messages.success(request,
                              f"Manual entry saved! {duration_text} tracked for {entry.project.name if entry.project else 'your task'}.")
         else:
-            messages.error(request, "Please correct the errors in the form.")
+            for error in form.non_field_errors() or ["Please correct the errors in the form."]:
+                messages.error(request, error)
 
     return redirect('tracker_home')
 
 
 def edit_entry(request, entry_id):
-    entry = get_object_or_404(TimeEntry, pk=entry_id, deleted=False)
+    entry = get_object_or_404(TimeEntry.objects.select_related('project', 'task'), pk=entry_id, deleted=False)
 
     if request.method == "POST":
         # Store previous state for logging
         previous_values = serialize_time_entry(entry)
+        previous_state = entry_state(entry)
 
         # Update entry
         entry.project_id = request.POST.get('project')
@@ -425,22 +467,31 @@ def edit_entry(request, entry_id):
         end_date = request.POST.get('end_date')
         end_time = request.POST.get('end_time')
 
-        workspace = Workspace.objects.first()
-        tz = pytz.timezone(workspace.timezone) if workspace and hasattr(workspace, 'timezone') else pytz.UTC
+        tz = get_workspace_timezone()
 
+        # Stored in UTC, so the duration, overlap check and audit record use
+        # elapsed time rather than the workspace's wall clock
         if start_date and start_time:
             naive_start = datetime.strptime(f"{start_date} {start_time}", "%Y-%m-%d %H:%M")
-            entry.start_time = tz.localize(naive_start)
+            entry.start_time = naive_start.replace(tzinfo=tz).astimezone(dt_timezone.utc)
 
         if end_date and end_time:
             naive_end = datetime.strptime(f"{end_date} {end_time}", "%Y-%m-%d %H:%M")
-            entry.end_time = tz.localize(naive_end)
+            entry.end_time = naive_end.replace(tzinfo=tz).astimezone(dt_timezone.utc)
 
         entry.billable = request.POST.get('billable') == 'on'
         hourly_rate = request.POST.get('hourly_rate', '0')
         entry.hourly_rate = float(hourly_rate) if hourly_rate else 0
 
-        entry.save()
+        try:
+            validate_no_overlap(entry)
+        except ValidationError as error:
+            messages.error(request, error.messages[0])
+            return redirect('tracker_home')
+
+        if not save_entry_change(entry, previous_state):
+            messages.warning(request, CHANGED_MESSAGE)
+            return redirect('tracker_home')
 
         # Log the update
         log_time_entry_action(
@@ -466,29 +517,46 @@ def edit_entry(request, entry_id):
 
 
 # Keep existing utility functions unchanged
-def tasks_by_project(request):
-    project_id = request.GET.get("project")
+TASK_DROPDOWN = 'timetracker/partials/task_dropdown.html'
+EDIT_TASK_DROPDOWN = 'timetracker/partials/edit_task_dropdown.html'
 
-    if project_id == 'new':
-        # Return empty task list for new projects
-        return render(request, 'timetracker/partials/task_dropdown.html', {'tasks': []})
 
-    tasks = Task.objects.filter(project_id=project_id, is_active=True).order_by('name') if project_id else []
+def _id_param(request, name):
+    try:
+        return int(request.GET.get(name))
+    except (TypeError, ValueError):
+        # Missing, or 'new' while a project is being created: no tasks
+        return None
 
-    return render(request, 'timetracker/partials/task_dropdown.html', {'tasks': tasks})
 
+def _task_dropdown_etag(request):
+    return fragment_etag(TASK_DROPDOWN, task_options(_id_param(request, 'project'))[0])
 
-def tasks_by_project_edit(request):
-    """Separate endpoint for edit form task loading"""
-    project_id = request.GET.get("project")
-    selected_task_id = request.GET.get("selected_task_id")
 
-    tasks = Task.objects.filter(project_id=project_id, is_active=True).order_by('name') if project_id else []
+def _edit_task_dropdown_etag(request):
+    selected_task_id = _id_param(request, 'selected_task_id')
+    return fragment_etag(EDIT_TASK_DROPDOWN, task_options(_id_param(request, 'project'))[0], selected_task_id)
+
+
+# Called on every project change, so served from the per-project fragment
+# cache, and revalidated by the browser with If-None-Match for a bodiless 304
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_task_dropdown_etag)
+def tasks_by_project(request):
+    versions, get_context = task_options(_id_param(request, 'project'))
+    return HttpResponse(render_cached(request, TASK_DROPDOWN, versions, get_context))
 
-    return render(request, 'timetracker/partials/edit_task_dropdown.html', {
-        'tasks': tasks,
-        'selected_task_id': int(selected_task_id) if selected_task_id else None
-    })
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_edit_task_dropdown_etag)
+def tasks_by_project_edit(request):
+    """Separate endpoint for edit form task loading"""
+    selected_task_id = _id_param(request, 'selected_task_id')
+    versions, get_context = task_options(_id_param(request, 'project'))
+    return HttpResponse(render_cached(
+        request, EDIT_TASK_DROPDOWN, versions,
+        lambda: {**get_context(), 'selected_task_id': selected_task_id}, vary=selected_task_id,
+    ))
 
 
 @csrf_exempt
@@ -515,4 +583,29 @@ def ajax_add_task(request):
     return render(request, "timetracker/partials/task_options.html", {
         "tasks": Task.objects.filter(project_id=project_id,
                                      is_active=True).order_by('name') if project_id and project_id.isdigit() else []
-    })
\ No newline at end of file
+    })
+
+
+def _export(request, kind, fmt):
+    if fmt not in FORMATS:
+        raise Http404(f"Unknown export format {fmt}")
+    try:
+        filters = ExportFilters.from_query(request.GET)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    response = StreamingHttpResponse(export_lines(kind, filters, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}-{now():%Y%m%d-%H%M%S}.{fmt}"'
+    return response
+
+
+@staff_member_required
+def export_time_entries(request, fmt):
+    """Stream completed time entries as CSV or JSONL"""
+    return _export(request, 'time_entries', fmt)
+
+
+@staff_member_required
+def export_audit_logs(request, fmt):
+    """Stream audit records as CSV or JSONL"""
+    return _export(request, 'audit_logs', fmt)